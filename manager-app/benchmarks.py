@@ -0,0 +1,279 @@
+"""
+Offline benchmarks for video_manager.py.
+
+Times the startup, update and server-control paths of ManagerCore against a
+throwaway repository in the temp folder, with no network and no Node needed:
+
+    python benchmarks.py > before.json
+    python benchmarks.py --baseline before.json > after.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from video_manager import (
+    APP_VERSION, AppState, ManagerCore, WorkIndex, find_repo_root, format_seconds, free_port
+)
+
+
+class BenchmarkFixture:
+    """Throwaway site repo for offline benchmarks.
+    
+    `origin.git` is a bare repository, `upstream/` a clone that pushes new
+    commits to it and `site/` the clone the manager works on. The server is
+    a small Python HTTP stand-in saved as video-manager-server.js and run
+    with this interpreter in place of node, so the timings are the
+    manager's own and do not depend on Node or the network.
+    """
+    
+    VIDEOS_PER_SECTION = 50
+    SERVER = '''# Benchmark stand-in for the Node server, run by Python (see BenchmarkFixture)
+import http.server
+import json
+import os
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({'status': 'ok', 'message': 'Video Manager Server is running!'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+http.server.ThreadingHTTPServer(('127.0.0.1', int(os.environ['PORT'])), Handler).serve_forever()
+'''
+
+    def __init__(self):
+        import tempfile
+        self.root = Path(tempfile.mkdtemp(prefix='video-manager-bench-'))
+        self.origin = self.root / 'origin.git'
+        self.upstream = self.root / 'upstream'
+        self.site = self.root / 'site'
+        self.version = 0
+        
+        self.git(self.root, 'init', '-q', '--bare', str(self.origin))
+        self.git(self.root, 'clone', '-q', str(self.origin), str(self.upstream))
+        pr = self.upstream / 'pr'
+        (pr / 'src' / 'components').mkdir(parents=True)
+        (pr / 'vendor' / 'bench-dep').mkdir(parents=True)
+        (pr / 'vendor' / 'bench-dep' / 'package.json').write_text(
+            json.dumps({'name': 'bench-dep', 'version': '1.0.0'}), encoding='utf-8')
+        (self.upstream / '.gitignore').write_text("node_modules/\n.video-manager/\n", encoding='utf-8')
+        (pr / 'video-manager-server.js').write_text(self.SERVER, encoding='utf-8')
+        (pr / 'src' / 'components' / 'Work.tsx').write_text(self.work_source(), encoding='utf-8')
+        self.write_package()
+        (self.upstream / 'README.md').write_text("benchmark fixture\n", encoding='utf-8')
+        self.git(self.upstream, 'add', '-A')
+        self.git(self.upstream, 'commit', '-q', '-m', 'Initial commit')
+        self.git(self.upstream, 'push', '-q', 'origin', 'HEAD')
+        self.git(self.root, 'clone', '-q', str(self.origin), str(self.site))
+    
+    def git(self, cwd, *args):
+        result = subprocess.run(
+            ['git', '-c', 'user.name=benchmark', '-c', 'user.email=benchmark@localhost',
+             '-c', 'init.defaultBranch=main'] + list(args),
+            cwd=str(cwd), capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise Exception(f"git {' '.join(args)} failed:\n{result.stderr}")
+        return result.stdout
+    
+    def work_source(self):
+        lines = ["export default function Work() { return null; }", ""]
+        for name, _ in WorkIndex.SECTIONS:
+            lines.append(f"const {name} = [")
+            for index in range(self.VIDEOS_PER_SECTION):
+                embed_id = f"{name[:3]}{index:05d}"
+                lines += [
+                    "  {",
+                    f'    title: "{name} {index}",',
+                    f'    videoUrl: "https://streamable.com/{embed_id}",',
+                    f'    embedId: "{embed_id}",',
+                    f"    thumbnail: `https://cdn-cf-east.streamable.com/image/{embed_id}.jpg`,",
+                    '    platform: "streamable",',
+                    "  },",
+                ]
+            lines += ["];", ""]
+        return "\n".join(lines)
+    
+    def write_package(self):
+        """package.json and lockfile with one local file: dependency, so `npm ci` works offline."""
+        pr = self.upstream / 'pr'
+        version = f"1.0.{self.version}"
+        dependencies = {'bench-dep': 'file:vendor/bench-dep'}
+        (pr / 'package.json').write_text(json.dumps(
+            {'name': 'bench-site', 'version': version, 'private': True, 'dependencies': dependencies},
+            indent=2), encoding='utf-8')
+        (pr / 'package-lock.json').write_text(json.dumps({
+            'name': 'bench-site', 'version': version, 'lockfileVersion': 3, 'requires': True,
+            'packages': {
+                '': {'name': 'bench-site', 'version': version, 'dependencies': dependencies},
+                'node_modules/bench-dep': {'resolved': 'vendor/bench-dep', 'link': True},
+                'vendor/bench-dep': {'version': '1.0.0'},
+            }
+        }, indent=2), encoding='utf-8')
+    
+    def push_change(self, lockfile=False):
+        """Publish one upstream commit: README only, or a new package version (npm has to run)."""
+        self.version += 1
+        if lockfile:
+            self.write_package()
+        with open(self.upstream / 'README.md', 'a', encoding='utf-8') as f:
+            f.write(f"change {self.version}\n")
+        self.git(self.upstream, 'commit', '-q', '-am', f'Change {self.version}')
+        self.git(self.upstream, 'push', '-q', 'origin', 'HEAD')
+    
+    def close(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def run_benchmarks(runs=5, output=None, baseline=None, threshold=0.25):
+    """Time the startup, update and server-control paths offline; return the exit code.
+    
+    Each case runs once as a warm-up and then `runs` times, with its setup
+    (pushing an upstream commit, starting the server to be stopped, ...)
+    outside the timed part. A JSON report goes to `output` (stdout if None)
+    and a table to stderr. With a baseline report, a case whose median
+    is more than `threshold` (and 5 ms) slower is a regression: exit code 1.
+    """
+    import platform
+    if not shutil.which('git'):
+        raise Exception("Git is not installed.")
+    npm = shutil.which('npm') or shutil.which('npm.cmd')
+    
+    fixture = BenchmarkFixture()
+    app_state = AppState(path=fixture.root / 'launch-state.json')
+    # The stand-in runs on this interpreter; npm is only run by the npm case
+    app_state.set('tools', {'node': sys.executable, 'npm': npm or sys.executable, 'git': shutil.which('git')})
+    core = ManagerCore(fixture.site, app_state=app_state, port=free_port())
+    saved_env = os.environ.get('npm_config_offline')
+    os.environ['npm_config_offline'] = 'true'
+    if npm:
+        core.ensure_dependencies()
+    else:
+        (core.pr_path / 'node_modules').mkdir()
+        core.dependencies.save(core.dependencies.lock_hash(), core.dependencies.node_version())
+    
+    def stopped():
+        if core.server_pid():
+            core.stop_server()
+    
+    def started():
+        if not core.server_pid():
+            core.start_server()
+    
+    def behind(lockfile=False):
+        stopped()
+        fixture.push_change(lockfile)
+    
+    # (name, untimed setup, timed call, calls per run: fast paths are averaged over many calls)
+    cases = [
+        ('find_repo_root_cached', None, lambda: find_repo_root(str(fixture.site)), 1000),
+        ('find_repo_root_walk', None, find_repo_root, 100),
+        ('check_updates_cached', None, core.check_updates, 20),
+        ('check_updates_uptodate', None, lambda: core.check_updates(force=True), 1),
+        ('check_updates_behind', fixture.push_change, lambda: core.check_updates(force=True), 1),
+        ('startup_checks', None, core.startup_checks, 1),
+        ('start_server', stopped, core.start_server, 1),
+        ('stop_server', started, core.stop_server, 1),
+        ('apply_update', behind, core.apply_update, 1),
+        ('apply_update_npm', lambda: behind(lockfile=True), core.apply_update, 1),
+    ]
+    
+    report = {
+        'schema': 1,
+        'app_version': APP_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'git': fixture.git(fixture.root, '--version').strip(),
+        'npm': npm,
+        'runs': runs,
+        'cases': {},
+    }
+    try:
+        for name, setup, func, per_run in cases:
+            if name == 'apply_update_npm' and not npm:
+                report['cases'][name] = {'skipped': "npm not found"}
+                continue
+            timings = []
+            for index in range(runs + 1):
+                if setup:
+                    setup()
+                started_at = time.perf_counter()
+                for _ in range(per_run):
+                    func()
+                if index:
+                    timings.append((time.perf_counter() - started_at) / per_run)
+            timings.sort()
+            report['cases'][name] = {
+                'median': timings[len(timings) // 2],
+                'min': timings[0],
+                'max': timings[-1],
+                'mean': sum(timings) / len(timings),
+                'samples': timings,
+            }
+    finally:
+        stopped()
+        core.close()
+        if saved_env is None:
+            os.environ.pop('npm_config_offline', None)
+        else:
+            os.environ['npm_config_offline'] = saved_env
+        fixture.close()
+    
+    previous = {}
+    if baseline:
+        previous = json.loads(Path(baseline).read_text(encoding='utf-8')).get('cases', {})
+    regressions = []
+    print(f"{'case':<26}{'median':>11}{'min':>11}{'max':>11}" + (f"{'baseline':>11}{'change':>9}" if baseline else ""),
+          file=sys.stderr)
+    for name, result in report['cases'].items():
+        if 'skipped' in result:
+            print(f"{name:<26}  skipped: {result['skipped']}", file=sys.stderr)
+            continue
+        line = f"{name:<26}" + "".join(f"{format_seconds(result[key]):>11}" for key in ('median', 'min', 'max'))
+        old = previous.get(name, {}).get('median')
+        if old:
+            change = result['median'] / old - 1
+            line += f"{format_seconds(old):>11}{change:>+9.0%}"
+            if change > threshold and result['median'] - old > 0.005:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line, file=sys.stderr)
+    report['regressions'] = regressions
+    
+    text = json.dumps(report, indent=2)
+    if output:
+        Path(output).write_text(text, encoding='utf-8')
+    else:
+        print(text)
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='benchmarks.py', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, metavar='N', help="timed runs per benchmark case")
+    parser.add_argument('--out', metavar='FILE', help="write the JSON report here instead of stdout")
+    parser.add_argument('--baseline', metavar='FILE',
+                        help="compare with an earlier report; exit 1 if a case got more than 25%% slower")
+    args = parser.parse_args()
+    try:
+        sys.exit(run_benchmarks(args.runs, args.out, args.baseline))
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
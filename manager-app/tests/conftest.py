@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+GIT_ENV = dict(
+    os.environ,
+    GIT_AUTHOR_NAME='test', GIT_AUTHOR_EMAIL='test@localhost',
+    GIT_COMMITTER_NAME='test', GIT_COMMITTER_EMAIL='test@localhost',
+    GIT_CONFIG_NOSYSTEM='1', GIT_CONFIG_GLOBAL=os.devnull,
+)
+
+
+def git(cwd, *args, text=True):
+    """Run git with a fixed identity and no user config; return stdout (bytes unless text)."""
+    result = subprocess.run(['git', '-c', 'init.defaultBranch=main'] + list(args),
+                            cwd=str(cwd), capture_output=True, text=text, env=GIT_ENV)
+    if result.returncode != 0:
+        raise AssertionError(f"git {' '.join(args)} failed:\n{result.stderr!r}")
+    return result.stdout
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / 'repo'
+    root.mkdir()
+    git(root, 'init', '-q')
+    return root
@@ -0,0 +1,98 @@
+"""GitRepoReader against repositories written by the real git executable."""
+
+import pytest
+from conftest import GIT_ENV, git
+
+from video_manager import GitRepoReader
+
+
+def commit_versions(repo, count, name='notes.txt'):
+    """Commit `count` small edits of one large text file, so repacking produces deltas."""
+    lines = [f"line {index} of a file that changes a little in every commit" for index in range(400)]
+    for version in range(count):
+        lines[version * 7 % len(lines)] = f"edited in version {version}"
+        (repo / name).write_text("\n".join(lines) + "\n", encoding='utf-8')
+        git(repo, 'add', name)
+        git(repo, 'commit', '-q', '-m', f"version {version}")
+
+
+def all_objects(repo):
+    return git(repo, 'cat-file', '--batch-all-objects', '--batch-check=%(objectname) %(objecttype)').split('\n')[:-1]
+
+
+def pack_entry_types(reader):
+    """Raw pack entry type of every object in every pack (6 = OFS_DELTA, 7 = REF_DELTA)."""
+    types = set()
+    for idx_path in reader.refresh_packs():
+        fanout, data, shas_start, _, _ = reader.load_index(idx_path)
+        with open(idx_path.with_suffix('.pack'), 'rb') as pack:
+            for index in range(fanout[255]):
+                sha = data[shas_start + 20 * index:shas_start + 20 * index + 20]
+                pack.seek(reader.find_in_pack(idx_path, sha))
+                types.add((pack.read(1)[0] >> 4) & 7)
+    return types
+
+
+def assert_objects_match_git(repo):
+    reader = GitRepoReader(repo)
+    for line in all_objects(repo):
+        sha, obj_type = line.split()
+        expected = git(repo, 'cat-file', obj_type, sha, text=False)
+        assert reader.read_object(sha) == (obj_type, expected), sha
+    return reader
+
+
+def test_loose_objects(repo):
+    commit_versions(repo, 3)
+    assert not list((repo / '.git' / 'objects' / 'pack').glob('*.pack'))
+    assert_objects_match_git(repo)
+
+
+def test_ofs_deltas(repo):
+    commit_versions(repo, 12)
+    git(repo, 'repack', '-a', '-d', '-f', '-q')
+    reader = assert_objects_match_git(repo)
+    assert GitRepoReader.OFS_DELTA in pack_entry_types(reader)
+
+
+def test_ref_deltas(repo):
+    commit_versions(repo, 12)
+    git(repo, '-c', 'repack.useDeltaBaseOffset=false', 'repack', '-a', '-d', '-f', '-q')
+    reader = assert_objects_match_git(repo)
+    types = pack_entry_types(reader)
+    assert GitRepoReader.REF_DELTA in types
+    assert GitRepoReader.OFS_DELTA not in types
+
+
+def test_refs_and_packed_refs(repo):
+    commit_versions(repo, 2)
+    git(repo, 'branch', 'packed')
+    git(repo, 'pack-refs', '--all')
+    commit_versions(repo, 1, name='other.txt')
+    reader = GitRepoReader(repo)
+    assert reader.head_branch() == 'refs/heads/main'
+    assert reader.read_ref('HEAD') == git(repo, 'rev-parse', 'HEAD').strip()
+    assert reader.read_ref('refs/heads/packed') == git(repo, 'rev-parse', 'packed').strip()
+    assert reader.read_ref('refs/heads/missing') is None
+
+
+@pytest.mark.parametrize('same_date', [False, True])
+def test_ahead_behind_matches_rev_list(repo, monkeypatch, same_date):
+    if same_date:
+        # Equal commit dates leave the newest-first walk no real order to follow
+        monkeypatch.setitem(GIT_ENV, 'GIT_COMMITTER_DATE', '1700000000 +0000')
+    commit_versions(repo, 3)
+    git(repo, 'checkout', '-q', '-b', 'topic')
+    commit_versions(repo, 4, name='topic.txt')
+    git(repo, 'checkout', '-q', 'main')
+    commit_versions(repo, 2, name='main.txt')
+    git(repo, 'merge', '-q', '--no-edit', 'topic~2')
+    commit_versions(repo, 1, name='after.txt')
+    git(repo, 'repack', '-a', '-d', '-q')
+
+    reader = GitRepoReader(repo)
+    for left, right in (('main', 'topic'), ('topic', 'main'), ('main', 'main'), ('topic~3', 'main')):
+        expected = git(repo, 'rev-list', '--left-right', '--count', f'{left}...{right}').split()
+        left_sha = git(repo, 'rev-parse', left).strip()
+        right_sha = git(repo, 'rev-parse', right).strip()
+        assert reader.ahead_behind(left_sha, right_sha) == tuple(map(int, expected)), (left, right)
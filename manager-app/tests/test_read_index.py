@@ -0,0 +1,111 @@
+"""GitRepoReader.read_index and ChangeDetector against index files written by git."""
+
+import os
+
+import pytest
+from conftest import git
+
+from video_manager import ChangeDetector, GitReaderError, GitRepoReader
+
+FILES = ('pr/a.txt', 'pr/src/components/Work.tsx', 'pr/src/components/Workshop.tsx',
+         'pr/src/pages/Index.tsx', 'pr/src/pages/IndexOld.tsx', 'README.md')
+
+
+@pytest.fixture
+def tracked(repo):
+    for name in FILES:
+        path = repo / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"contents of {name}\n", encoding='utf-8')
+    if hasattr(os, 'symlink'):
+        os.symlink('a.txt', repo / 'pr' / 'link.txt')
+    git(repo, 'add', '-A')
+    git(repo, 'commit', '-q', '-m', 'initial')
+    return repo
+
+
+def index_version(repo):
+    return int.from_bytes((repo / '.git' / 'index').read_bytes()[4:8], 'big')
+
+
+def expected_entries(repo, prefix='pr/', exclude=()):
+    """{path: (blob sha, stage)} of regular files, from `git ls-files --stage`."""
+    entries = {}
+    for line in git(repo, 'ls-files', '--stage').splitlines():
+        meta, path = line.split('\t', 1)
+        mode, sha, stage = meta.split()
+        if path.startswith(prefix) and mode not in ('120000', '160000') and path not in exclude:
+            entries[path] = (sha, int(stage))
+    return entries
+
+
+def read(repo, prefix='pr/'):
+    return {path: (sha, stage) for path, (size, mtime_ns, sha, stage)
+            in GitRepoReader(repo).read_index(prefix).items()}
+
+
+def test_v2_entries_match_ls_files(tracked):
+    assert index_version(tracked) == 2
+    assert read(tracked) == expected_entries(tracked)
+    assert 'pr/link.txt' not in read(tracked)
+    assert set(read(tracked, '')) == set(expected_entries(tracked, ''))
+
+    entries = GitRepoReader(tracked).read_index('pr/')
+    stat = (tracked / 'pr' / 'a.txt').stat()
+    size, mtime_ns = entries['pr/a.txt'][:2]
+    assert size == stat.st_size
+    assert mtime_ns // 1_000_000_000 == stat.st_mtime_ns // 1_000_000_000
+
+
+def test_v3_skip_worktree_entries_are_left_out(tracked):
+    git(tracked, 'update-index', '--skip-worktree', 'pr/src/pages/Index.tsx')
+    assert index_version(tracked) == 3
+    assert read(tracked) == expected_entries(tracked, exclude=('pr/src/pages/Index.tsx',))
+
+
+def test_assume_unchanged_entries_are_left_out(tracked):
+    git(tracked, 'update-index', '--assume-unchanged', 'pr/a.txt')
+    assert read(tracked) == expected_entries(tracked, exclude=('pr/a.txt',))
+
+
+def test_v4_prefix_compressed_names(tracked):
+    git(tracked, 'update-index', '--index-version', '4')
+    assert index_version(tracked) == 4
+    assert read(tracked) == expected_entries(tracked)
+
+    git(tracked, 'update-index', '--skip-worktree', 'pr/src/components/Work.tsx')
+    assert read(tracked) == expected_entries(tracked, exclude=('pr/src/components/Work.tsx',))
+
+
+def test_conflicts_keep_their_stage(tracked):
+    git(tracked, 'checkout', '-q', '-b', 'other')
+    (tracked / 'pr' / 'a.txt').write_text("other\n", encoding='utf-8')
+    git(tracked, 'commit', '-q', '-am', 'other')
+    git(tracked, 'checkout', '-q', 'main')
+    (tracked / 'pr' / 'a.txt').write_text("main\n", encoding='utf-8')
+    git(tracked, 'commit', '-q', '-am', 'main')
+    with pytest.raises(AssertionError):
+        git(tracked, 'merge', '-q', 'other')
+    assert read(tracked)['pr/a.txt'][1] != 0
+
+
+def test_split_index_is_rejected(tracked):
+    git(tracked, 'update-index', '--split-index')
+    with pytest.raises(GitReaderError):
+        GitRepoReader(tracked).read_index('pr/')
+
+
+def test_change_detector_matches_git_status(tracked, tmp_path):
+    detector = ChangeDetector(tracked, tmp_path / 'hashes.json')
+    assert detector.scan() == []
+
+    (tracked / 'pr' / 'a.txt').write_text("edited\n", encoding='utf-8')
+    (tracked / 'pr' / 'src' / 'pages' / 'IndexOld.tsx').unlink()
+    # Same size and content as committed, only the mtime moved: still clean
+    os.utime(tracked / 'pr' / 'src' / 'pages' / 'Index.tsx')
+    expected = sorted(line[3:] for line in git(tracked, 'status', '--porcelain', '--', 'pr/').splitlines())
+    assert detector.scan() == expected == ['pr/a.txt', 'pr/src/pages/IndexOld.tsx']
+
+    git(tracked, 'add', '-A')
+    git(tracked, 'commit', '-q', '-m', 'edit')
+    assert detector.scan() == []
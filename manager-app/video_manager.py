@@ -3,118 +3,5396 @@ Video Manager Desktop Application
 A modern Python-based GUI for managing the video server and GitHub updates.
 """
 
+import time
+STARTUP_T0 = time.perf_counter()
+
 import os
 import sys
 import subprocess
 import threading
-import webbrowser
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import messagebox
 from pathlib import Path
 import shutil
 import json
-import time
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from itertools import islice
+import queue
+import math
+import re
+import struct
+import zlib
+import logging
+
+# Heavier modules that are not needed for the first frame (webbrowser,
+# http.client, urllib.request, hashlib, concurrent.futures, heapq) are
+# imported where they are used to keep cold start of the EXE fast.
 
 # Constants
-SERVER_URL = "http://localhost:3000/manage-videos.html"
-HEALTH_URL = "http://localhost:3000/health"
+SERVER_PORT = 3000                  # Default port; workspace sites each get their own
 APP_TITLE = "Video Manager Control Center"
 APP_VERSION = "2.0.0"
+STATE_DIR_NAME = ".video-manager"   # Per-repo cache/state folder
+SPARKLINE_WIDTH = 56                # Pixels of health latency history next to the indicator
+RESOURCE_GRAPH_WIDTH = 412          # Pixels of the server RSS/CPU strip under the status line
+
+# Defaults for <repo>/.video-manager/settings.json
+DEFAULT_SETTINGS = {
+    "log_buffer_lines": 2000,       # Server output lines kept in memory
+    "log_to_file": False,           # Also write server output to logs/server.log
+    "log_file_max_bytes": 1_000_000,
+    "log_file_backups": 3,
+    "health_interval": 2.0,         # Seconds between background health probes
+    "health_slow_ms": 500,          # p95 above this marks the server as degraded
+    "update_check_ttl": 300,        # Seconds a cached update check stays valid
+    "restart_on_crash": True,       # Restart the server when it exits unexpectedly
+    "restart_max_backoff": 30.0,    # Longest wait (seconds) between restart attempts
+    "crash_loop_limit": 5,          # This many crashes within crash_loop_window stops restarts
+    "crash_loop_window": 60.0,
+    "resource_interval": 5.0,       # Seconds between server RSS/CPU samples
+    "resource_history": 720,        # Samples kept for the resource graph (1h at 5s)
+    "proxy_enabled": False,         # Serve port 3000 from a caching proxy with Node behind it
+    "proxy_backend_port": 3001,     # Port Node listens on while the proxy is enabled
+    "proxy_cache_max_bytes": 32_000_000,
+    "proxy_cache_ttl": 300,         # Seconds a cached response is served (0 = until invalidated)
+    "import_batch_size": 250,       # Videos per /add-videos request (one Work.tsx write each)
+    "import_concurrency": 4,        # Parallel /add-video requests for servers without batching
+    "optimize_images": True,        # Recompress public/ images into dist after each build (needs Pillow)
+    "image_widths": [480, 960],     # Responsive variant widths (<name>-<width>w.<ext>)
+    "image_quality": 80,            # WebP/JPEG quality for recompressed images
+    "image_workers": 0,             # Worker processes (0 = one per CPU)
+    "precompress": True,            # Write .gz siblings for text assets in dist after each build
+    "precompress_min_bytes": 1024,  # Smaller files are not worth compressing
+    "precompress_brotli": False,    # Also write .br siblings (needs the brotli package)
+    "trace": True,                  # Record git/npm/HTTP timings and UI stalls in trace.jsonl
+    "trace_max_bytes": 5_000_000,   # Rotate the trace to trace.jsonl.1 past this size
+    "stall_threshold_ms": 250,      # Event-loop lag recorded as a UI stall
+    "reload_on_update": True,       # Hot-restart our server when a pull changes server files
+    "metrics": True,                # Keep git/npm/server/health timings in metrics.json and sessions.jsonl
+    "metrics_textfile_dir": "",     # Also write video_manager.prom here for node_exporter (default: state dir)
+    "metrics_sessions": 20,         # Sessions shown by the Stats panel and `stats`
+    "watch_changes": True,          # Track uncommitted changes under pr/ live (faster with watchdog)
+    "change_debounce_ms": 300,      # Quiet time after file events before rescanning
+}
+
+# Server readiness probe
+SERVER_START_TIMEOUT = 20.0     # Seconds to wait for /health before giving up
+PROBE_INITIAL_DELAY = 0.05      # First backoff step between health probes
+PROBE_MAX_DELAY = 0.25          # Backoff ceiling between health probes
+
+# Startup
+STARTUP_DEFER_MS = 300          # Delay before background work starts after the first frame
+
+# Workspace
+WORKSPACE_WORKERS = 8           # Sites checked concurrently by the dashboard and `sites`
+
+
+class Colors:
+    """Application color scheme matching the Deep Space website theme."""
+    # Base colors
+    BACKGROUND = "#030b1d"      # Main dark navy background
+    FOREGROUND = "#e1e7ef"      # Primary text color
+    CARD_BG = "#0a1628"         # Slightly lighter for cards/panels
+    SECONDARY = "#1e293b"       # Secondary backgrounds, borders
+    
+    # Text colors
+    MUTED = "#94a3b8"           # Subtitles, captions
+    PRIMARY_TEXT = "#f8fafc"    # Bright white text
+    DARK_TEXT = "#0f172a"       # Text on light buttons
+    
+    # Accent colors
+    PRIMARY = "#f8fafc"         # Main highlights, glows
+    ACCENT = "#1e293b"          # Hover states
+    RING = "#cbd5e1"            # Focus states
+    
+    # Status colors
+    SUCCESS = "#22c55e"         # Green for success
+    WARNING = "#f59e0b"         # Amber for warnings
+    ERROR = "#ef4444"           # Red for errors
+    INFO = "#38bdf8"            # Cyan/sky blue for info
+    
+    # Button colors (with glow effect feel)
+    BUTTON_PRIMARY = "#1e293b"  # Primary button bg
+    BUTTON_STOP = "#7f1d1d"     # Dark red for stop
+    BUTTON_OPEN = "#0c4a6e"     # Dark blue for open
+    BUTTON_HOVER = "#334155"    # Hover state
+
+
+# Core report levels -> status label colors
+LEVEL_COLORS = {
+    'info': Colors.INFO,
+    'success': Colors.SUCCESS,
+    'warning': Colors.WARNING,
+    'error': Colors.ERROR,
+    'muted': Colors.MUTED,
+}
+
+
+class DependencyCache:
+    """Decide whether `npm` needs to run by hashing the lockfile.
+    
+    The last successful install is recorded as a content hash of
+    package.json + package-lock.json together with the Node version.
+    Nothing runs while both match; a changed lockfile triggers `npm ci`.
+    """
+    
+    LOCK_FILES = ('package.json', 'package-lock.json')
+    
+    def __init__(self, pr_path, state_dir, subprocess_kwargs=None, tools=None, tracer=None):
+        self.pr_path = Path(pr_path)
+        self.cache_file = Path(state_dir) / 'deps.json'
+        self.subprocess_kwargs = subprocess_kwargs or {}
+        self.tools = tools if tools is not None else {}
+        self.tracer = tracer or TRACER
+        self.node_versions = {}
+    
+    def lock_hash(self):
+        """Return a sha256 over the manifest and lockfile contents."""
+        import hashlib
+        digest = hashlib.sha256()
+        for name in self.LOCK_FILES:
+            path = self.pr_path / name
+            digest.update(name.encode())
+            if path.exists():
+                digest.update(path.read_bytes())
+        return digest.hexdigest()
+    
+    def node_version(self):
+        """Return `node --version`, asked once per node binary per session."""
+        node = self.tools.get('node', 'node')
+        if node in self.node_versions:
+            return self.node_versions[node]
+        try:
+            result = subprocess.run(
+                [node, '--version'],
+                capture_output=True,
+                text=True,
+                shell=False,
+                **self.subprocess_kwargs
+            )
+        except OSError:
+            return ""
+        self.node_versions[node] = result.stdout.strip()
+        return self.node_versions[node]
+    
+    def load(self):
+        try:
+            return json.loads(self.cache_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+    
+    def save(self, lock_hash, node_version):
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_file.write_text(json.dumps({
+            'lock_hash': lock_hash,
+            'node_version': node_version,
+            'installed_at': time.time()
+        }, indent=2), encoding='utf-8')
+    
+    def plan(self):
+        """Return (action, reason, state) where action is None, 'ci' or 'install'."""
+        state = (self.lock_hash(), self.node_version())
+        cached = self.load()
+        has_lockfile = (self.pr_path / 'package-lock.json').exists()
+        clean_install = 'ci' if has_lockfile else 'install'
+        
+        if not (self.pr_path / 'node_modules').exists():
+            return clean_install, "node_modules missing", state
+        if not cached:
+            # Trust an existing node_modules the first time we see it
+            self.save(*state)
+            return None, "existing node_modules recorded", state
+        if cached.get('lock_hash') != state[0]:
+            return clean_install, "lockfile changed", state
+        if cached.get('node_version') != state[1]:
+            return clean_install, f"Node changed {cached.get('node_version') or '?'} -> {state[1] or '?'}", state
+        return None, "lockfile unchanged", state
+    
+    def install(self, action, state, task=None, progress=None):
+        """Run npm ci/install and record the new state on success."""
+        # Security: Find npm executable to avoid shell=True
+        npm_cmd = self.tools.get('npm') or shutil.which('npm')
+        if not npm_cmd:
+            # Fallback for Windows if 'npm' not in PATH but 'npm.cmd' is
+            npm_cmd = shutil.which('npm.cmd')
+        
+        if not npm_cmd:
+            raise Exception("npm executable not found")
+        
+        result = self.run_npm(npm_cmd, action, task, progress)
+        if result.returncode != 0 and action == 'ci':
+            # package.json and the lockfile disagree; let npm reconcile them
+            result = self.run_npm(npm_cmd, 'install', task, progress)
+        
+        if result.returncode != 0:
+            raise Exception(f"npm {action} failed:\n{result.stderr}")
+        
+        self.save(self.lock_hash(), state[1])
+    
+    def run_npm(self, npm_cmd, action, task=None, progress=None):
+        return run_streaming(
+            [npm_cmd, action, '--no-audit', '--no-fund', '--loglevel=http'],
+            self.pr_path, task, progress,
+            parse=NpmProgress(action, self.pr_path / 'package-lock.json'),
+            log_dir=self.cache_file.parent / 'logs', tracer=self.tracer,
+            **self.subprocess_kwargs
+        )
+
+
+class FileHashCache:
+    """sha256 of files, re-hashed only when their size or mtime changes.
+    
+    Entries persist in a JSON file keyed by path, so hashing a large,
+    mostly unchanged tree costs one stat per file. `hasher(path)` replaces
+    the sha256 for callers that need a different digest.
+    """
+    
+    def __init__(self, cache_file, hasher=None):
+        self.cache_file = Path(cache_file)
+        self.hasher = hasher
+        try:
+            self.entries = json.loads(self.cache_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            self.entries = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+    
+    def digest(self, path):
+        import hashlib
+        path = Path(path)
+        stat = path.stat()
+        key = str(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[:2] == signature:
+                return entry[2]
+        
+        if self.hasher:
+            value = self.hasher(path)
+        else:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            value = digest.hexdigest()
+        with self.lock:
+            self.entries[key] = signature + [value]
+            self.dirty = True
+        return value
+    
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            try:
+                self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+                self.cache_file.write_text(json.dumps(self.entries), encoding='utf-8')
+                self.dirty = False
+            except OSError:
+                pass
+
+
+def iter_files(root, skip_dirs=('node_modules', '.git')):
+    """Yield every file under root (or root itself if it is a file) in a stable order."""
+    root = Path(root)
+    if root.is_file():
+        yield root
+        return
+    for folder, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in skip_dirs)
+        for name in sorted(files):
+            yield Path(folder) / name
+
+
+class BuildCache:
+    """Skip `npm run build` when nothing that feeds the Vite build changed.
+    
+    The build inputs (sources, public assets, index.html and config files)
+    are hashed together with the Node version; a build whose input hash
+    matches the last successful one reuses the existing dist. Every real
+    build is appended to build-history.jsonl with its wall time and
+    output size.
+    """
+    
+    INPUTS = ('src', 'public', 'index.html', 'package.json', 'package-lock.json', 'vite.config.ts',
+              'tsconfig.json', 'tsconfig.app.json', 'tsconfig.node.json', 'tailwind.config.ts',
+              'postcss.config.js', 'components.json')
+    
+    def __init__(self, pr_path, state_dir, dependencies, subprocess_kwargs=None, tracer=None):
+        self.pr_path = Path(pr_path)
+        self.dist_path = self.pr_path / 'dist'
+        self.state_file = Path(state_dir) / 'build.json'
+        self.history_file = Path(state_dir) / 'build-history.jsonl'
+        self.hashes = FileHashCache(Path(state_dir) / 'build-hashes.json')
+        self.dependencies = dependencies
+        self.subprocess_kwargs = subprocess_kwargs or {}
+        self.tracer = tracer or TRACER
+    
+    def input_hash(self):
+        """Return (sha256 over every build input, number of files hashed)."""
+        import hashlib
+        digest = hashlib.sha256()
+        count = 0
+        for name in self.INPUTS:
+            for path in iter_files(self.pr_path / name):
+                digest.update(path.relative_to(self.pr_path).as_posix().encode() + b"\0")
+                digest.update(self.hashes.digest(path).encode())
+                count += 1
+        digest.update(self.dependencies.node_version().encode())
+        # Decides whether components reference the image variants
+        digest.update(os.environ.get('VITE_IMAGE_WIDTHS', '').encode())
+        self.hashes.save()
+        return digest.hexdigest(), count
+    
+    def load(self):
+        try:
+            return json.loads(self.state_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+    
+    def plan(self, force=False):
+        """Return (build needed, reason, input hash)."""
+        input_hash, count = self.input_hash()
+        last = self.load()
+        if force:
+            return True, "forced", input_hash
+        if not (self.dist_path / 'index.html').exists():
+            return True, "dist missing", input_hash
+        if last.get('input_hash') != input_hash:
+            return True, f"inputs changed ({count} files hashed)", input_hash
+        return False, f"inputs unchanged since {time.strftime('%Y-%m-%d %H:%M', time.localtime(last.get('built_at', 0)))}", input_hash
+    
+    def build(self, npm_cmd, input_hash, task=None):
+        """Run `npm run build`; record and return the build's timing and size."""
+        import tempfile
+        # A failed or cancelled build may leave dist half-written; never reuse it
+        try:
+            self.state_file.unlink()
+        except OSError:
+            pass
+        
+        started = time.perf_counter()
+        with self.tracer.span('npm', args=['run build']) as span, tempfile.TemporaryFile() as output:
+            process = subprocess.Popen(
+                [npm_cmd, 'run', 'build'],
+                cwd=str(self.pr_path),
+                stdin=subprocess.DEVNULL,
+                stdout=output,
+                stderr=subprocess.STDOUT,
+                shell=False,
+                **self.subprocess_kwargs
+            )
+            try:
+                while process.poll() is None:
+                    if task:
+                        task.sleep(0.2)
+                    else:
+                        time.sleep(0.2)
+            except BaseException:
+                # npm runs vite in a child process; stopping npm alone would leave it building
+                kill_tree(process.pid, process)
+                raise
+            span['returncode'] = process.returncode
+            if process.returncode != 0:
+                output.seek(0)
+                tail = output.read().decode('utf-8', 'replace').strip().splitlines()[-15:]
+                raise Exception("npm run build failed:\n" + "\n".join(tail))
+        
+        files = list(iter_files(self.dist_path))
+        record = {
+            'input_hash': input_hash,
+            'built_at': time.time(),
+            'duration': round(time.perf_counter() - started, 3),
+            'output_bytes': sum(path.stat().st_size for path in files),
+            'output_files': len(files),
+        }
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        self.state_file.write_text(json.dumps(record, indent=2), encoding='utf-8')
+        with open(self.history_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+        return record
+    
+    def history(self, limit=20):
+        """The most recent build records, oldest first."""
+        try:
+            with open(self.history_file, encoding='utf-8') as f:
+                lines = deque(f, maxlen=limit)
+        except OSError:
+            return []
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records
+
+
+def optimize_image(source, targets, quality):
+    """Write a recompressed copy of one image plus narrower variants.
+    
+    targets is [(width or None, output path)]; None means full size and
+    widths not smaller than the image are skipped. Returns
+    {width: bytes written}. Runs in a worker process.
+    """
+    from PIL import Image
+    written = {}
+    original_size = os.path.getsize(source)
+    with Image.open(source) as image:
+        image.load()
+        image_format = image.format
+        animated = getattr(image, 'is_animated', False)
+        for width, output in targets:
+            if width is not None and (animated or image.width <= width):
+                continue
+            if animated:
+                shutil.copyfile(source, output)
+                written[width] = original_size
+                continue
+            
+            frame = image
+            if width is not None:
+                frame = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            if image_format == 'PNG':
+                frame.save(output, 'PNG', optimize=True)
+            elif image_format == 'JPEG':
+                frame.save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+            else:
+                frame.save(output, 'WEBP', quality=quality, method=6)
+            
+            # Never ship a full-size copy that is bigger than the original
+            if width is None and os.path.getsize(output) >= original_size:
+                shutil.copyfile(source, output)
+            written[width] = os.path.getsize(output)
+    return written
+
+
+class ImageOptimizer:
+    """Recompress pr/public images into dist and add responsive variants.
+    
+    Sources are never modified. Results live in a cache folder keyed by
+    each source's content hash (and the quality/width settings), so only
+    new or changed images reach the process pool and repeat runs just
+    copy cached bytes into dist. Variants are written next to the image
+    as <name>-<width>w.<ext> for use in srcset.
+    
+    The Pages workflow runs this (the `images` command) on its own build;
+    components only list the variants in srcset when the build was given
+    their widths in VITE_IMAGE_WIDTHS (see pr/src/lib/images.ts).
+    """
+    
+    EXTENSIONS = ('.webp', '.jpg', '.jpeg', '.png')
+    NO_VARIANTS = ('icons/',)   # Icons are referenced at fixed sizes
+    
+    def __init__(self, public_path, dist_path, state_dir, widths=(480, 960), quality=80, workers=None):
+        self.public_path = Path(public_path)
+        self.dist_path = Path(dist_path)
+        self.cache_dir = Path(state_dir) / 'image-cache'
+        self.manifest_file = self.cache_dir / 'manifest.json'
+        self.hashes = FileHashCache(Path(state_dir) / 'image-hashes.json')
+        self.widths = sorted(widths)
+        self.quality = quality
+        self.workers = workers or None
+    
+    def load_manifest(self):
+        try:
+            return json.loads(self.manifest_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+    
+    def cache_path(self, key, width, suffix):
+        return self.cache_dir / (f"{key}-{width}w{suffix}" if width else f"{key}{suffix}")
+    
+    def variant_name(self, relative, width):
+        path = Path(relative)
+        return (path.parent / f"{path.stem}-{width}w{path.suffix}").as_posix()
+    
+    def run(self, task=None):
+        """Optimise every image; return one report dict per source file."""
+        import hashlib
+        import importlib.util
+        if importlib.util.find_spec('PIL') is None:
+            raise Exception("Image optimisation needs Pillow (pip install Pillow).")
+        if not (self.dist_path / 'index.html').exists():
+            raise Exception("Build the site before optimising images (pr/dist is missing).")
+        
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self.load_manifest()
+        images, pending = [], []
+        for path in iter_files(self.public_path):
+            if path.suffix.lower() not in self.EXTENSIONS:
+                continue
+            relative = path.relative_to(self.public_path).as_posix()
+            widths = [] if relative.startswith(self.NO_VARIANTS) else self.widths
+            key = hashlib.sha256(
+                f"{self.hashes.digest(path)}:{self.quality}:{widths}".encode()
+            ).hexdigest()[:32]
+            entry = manifest.get(key)
+            cached = bool(entry) and all(
+                self.cache_path(key, int(width) if width != 'full' else None, path.suffix).exists()
+                for width in entry
+            )
+            images.append((path, relative, key, cached))
+            if not cached:
+                targets = [(width, str(self.cache_path(key, width, path.suffix))) for width in [None] + widths]
+                pending.append((key, str(path), targets))
+        self.hashes.save()
+        
+        if pending:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {pool.submit(optimize_image, source, targets, self.quality): key
+                           for key, source, targets in pending}
+                for future, key in futures.items():
+                    if task and task.cancel_event.is_set():
+                        pool.shutdown(cancel_futures=True)
+                        raise TaskCancelled()
+                    written = future.result()
+                    manifest[key] = {('full' if width is None else str(width)): size for width, size in written.items()}
+            self.manifest_file.write_text(json.dumps(manifest), encoding='utf-8')
+        
+        report = []
+        for path, relative, key, cached in images:
+            entry = manifest[key]
+            outputs = [(relative, self.cache_path(key, None, path.suffix))]
+            outputs += [(self.variant_name(relative, int(width)), self.cache_path(key, int(width), path.suffix))
+                        for width in entry if width != 'full']
+            for name, cache_file in outputs:
+                target = self.dist_path / name
+                # A rebuild copies the original back under the same name, often at the same size
+                if not target.exists() or self.hashes.digest(target) != self.hashes.digest(cache_file):
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(cache_file, target)
+            original = path.stat().st_size
+            report.append({
+                'path': relative,
+                'original': original,
+                'optimized': entry['full'],
+                'saved': original - entry['full'],
+                'variants': sorted(int(width) for width in entry if width != 'full'),
+                'cached': cached,
+            })
+        self.hashes.save()
+        return report
+
+
+def compress_file(data, encoding):
+    """Compress bytes with 'gzip' or 'br' at maximum level (deterministic output)."""
+    if encoding == 'br':
+        import brotli
+        return brotli.compress(data, quality=11)
+    import gzip
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+class DistCompressor:
+    """Write precompressed .gz (and optionally .br) siblings for text assets in dist.
+    
+    Compressed bytes are cached by the source's content hash, so after a
+    rebuild only assets whose content changed are compressed again. Files
+    below min_bytes, or that do not shrink, get no sibling. Cache entries
+    unused for CACHE_MAX_AGE seconds are pruned.
+    """
+    
+    EXTENSIONS = ('.html', '.js', '.mjs', '.css', '.svg', '.json', '.txt', '.xml', '.map', '.webmanifest')
+    SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+    CACHE_MAX_AGE = 14 * 86400
+    
+    def __init__(self, dist_path, state_dir, min_bytes=1024, brotli=False, workers=None):
+        self.dist_path = Path(dist_path)
+        self.cache_dir = Path(state_dir) / 'compress-cache'
+        self.hashes = FileHashCache(Path(state_dir) / 'dist-hashes.json')
+        self.min_bytes = min_bytes
+        self.brotli = brotli
+        self.workers = workers or min(8, (os.cpu_count() or 2))
+    
+    def encodings(self):
+        encodings = ['gzip']
+        if self.brotli:
+            import importlib.util
+            if importlib.util.find_spec('brotli') is None:
+                raise Exception("Brotli output needs the brotli package (pip install brotli).")
+            encodings.append('br')
+        return encodings
+    
+    def run(self, task=None):
+        """Compress every eligible asset; return one report dict per file."""
+        from concurrent.futures import ThreadPoolExecutor
+        if not (self.dist_path / 'index.html').exists():
+            raise Exception("Build the site before compressing it (pr/dist is missing).")
+        encodings = self.encodings()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Siblings of files that no longer exist would be served stale
+        for path in iter_files(self.dist_path):
+            if path.suffix in ('.gz', '.br') and not path.with_suffix('').exists():
+                path.unlink()
+        
+        files = [path for path in iter_files(self.dist_path)
+                 if path.suffix.lower() in self.EXTENSIONS and path.stat().st_size >= self.min_bytes]
+        
+        def process(path):
+            if task and task.cancel_event.is_set():
+                raise TaskCancelled()
+            digest = self.hashes.digest(path)
+            used.add(digest)
+            entry = {'path': path.relative_to(self.dist_path).as_posix(), 'original': path.stat().st_size,
+                     'cached': True}
+            data = None
+            for encoding in encodings:
+                suffix = self.SUFFIXES[encoding]
+                cache_file = self.cache_dir / f"{digest}{suffix}"
+                if not cache_file.exists():
+                    entry['cached'] = False
+                    if data is None:
+                        data = path.read_bytes()
+                    compressed = compress_file(data, encoding)
+                    # An empty marker records "does not shrink" so we do not retry
+                    cache_file.write_bytes(compressed if len(compressed) < len(data) else b'')
+                
+                size = cache_file.stat().st_size
+                target = path.with_name(path.name + suffix)
+                if size == 0:
+                    entry[encoding] = None
+                    if target.exists():
+                        target.unlink()
+                    continue
+                if not target.exists() or self.hashes.digest(target) != self.hashes.digest(cache_file):
+                    shutil.copyfile(cache_file, target)
+                elif target.stat().st_mtime < path.stat().st_mtime:
+                    # The server only trusts siblings at least as new as their source
+                    os.utime(target)
+                entry[encoding] = size
+            return entry
+        
+        used = set()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="compress") as pool:
+            report = list(pool.map(process, files))
+        self.hashes.save()
+        
+        cutoff = time.time() - self.CACHE_MAX_AGE
+        for cache_file in self.cache_dir.iterdir():
+            if cache_file.stem not in used and cache_file.stat().st_mtime < cutoff:
+                cache_file.unlink()
+        return report
+
+
+def load_settings(state_dir):
+    """Return DEFAULT_SETTINGS overlaid with <state_dir>/settings.json."""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with open(Path(state_dir) / 'settings.json', encoding='utf-8') as f:
+            settings.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    return settings
+
+
+class ServerLog:
+    """Drain a child process's stdout/stderr into a bounded ring buffer.
+    
+    One pump thread per stream reads lines as they arrive so the OS pipe
+    never fills up and stalls the server. Lines are numbered so viewers
+    can fetch only what they have not seen yet. When log_file is given
+    every line is also written to a size-rotated file.
+    """
+    
+    def __init__(self, max_lines=2000, log_file=None, max_bytes=1_000_000, backup_count=3):
+        self.lines = deque(maxlen=max_lines)
+        self.lock = threading.Lock()
+        self.sequence = 0
+        self.threads = []
+        self.file_handler = None
+        
+        if log_file:
+            from logging.handlers import RotatingFileHandler
+            Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+            self.file_handler = RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+            )
+            self.file_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    
+    def attach(self, process):
+        """Start pumping the process's stdout and stderr."""
+        self.append('app', f"--- server started (PID {process.pid}) ---")
+        self.threads = []
+        for stream, name in ((process.stdout, 'out'), (process.stderr, 'err')):
+            if stream is None:
+                continue
+            thread = threading.Thread(target=self.pump, args=(stream, name), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+    
+    def pump(self, stream, name):
+        try:
+            for raw in iter(stream.readline, b''):
+                self.append(name, raw.decode('utf-8', errors='replace').rstrip('\r\n'))
+        except (OSError, ValueError):
+            pass
+        finally:
+            try:
+                stream.close()
+            except OSError:
+                pass
+    
+    def append(self, name, text):
+        with self.lock:
+            self.sequence += 1
+            self.lines.append((self.sequence, name, text))
+        if self.file_handler:
+            # handle() takes the handler's lock, so the two pump threads cannot
+            # interleave a rollover with a write
+            self.file_handler.handle(logging.makeLogRecord({'msg': f"[{name}] {text}"}))
+    
+    def wait_drained(self, timeout=1.0):
+        """Give the pump threads a moment to read what a dead process left behind."""
+        deadline = time.perf_counter() + timeout
+        for thread in self.threads:
+            thread.join(max(0, deadline - time.perf_counter()))
+    
+    def since(self, sequence):
+        """Return (latest sequence, [(name, text), ...]) for lines after sequence."""
+        with self.lock:
+            if not self.lines or self.lines[-1][0] <= sequence:
+                return self.sequence, []
+            skip = max(0, sequence - self.lines[0][0] + 1)
+            return self.sequence, [(name, text) for _, name, text in islice(self.lines, skip, None)]
+    
+    def last_line(self, name):
+        with self.lock:
+            for _, line_name, text in reversed(self.lines):
+                if line_name == name and text.strip():
+                    return text
+        return ""
+    
+    def close(self):
+        if self.file_handler:
+            self.file_handler.close()
+
+
+class LatencyHistogram:
+    """Rolling window of request latencies (seconds) and failures."""
+    
+    def __init__(self, window=300):
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+    
+    def record(self, latency):
+        """Record a latency in seconds, or None for a failed request."""
+        with self.lock:
+            self.samples.append(latency)
+    
+    def recent(self, count):
+        with self.lock:
+            return list(self.samples)[-count:]
+    
+    def summary(self):
+        """Return dict with count, error_rate and p50/p95/p99 in milliseconds."""
+        with self.lock:
+            samples = list(self.samples)
+        latencies = sorted(s for s in samples if s is not None)
+        
+        def percentile(q):
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, max(0, math.ceil(q * len(latencies)) - 1))
+            return latencies[index] * 1000
+        
+        return {
+            'count': len(samples),
+            'error_rate': (len(samples) - len(latencies)) / len(samples) if samples else 0.0,
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+        }
+
+
+class HealthMonitor:
+    """Probe server endpoints on an interval over one keep-alive connection.
+    
+    Each probe's latency (or failure) goes into a per-path LatencyHistogram
+    (and Metrics, if given) and listeners are called after every round.
+    Only /health is probed by default: /videos re-parses Work.tsx on every
+    request. While active() returns False (no server running) rounds skip
+    the network and the state reads 'down'.
+    """
+    
+    def __init__(self, url, paths=('/health',), interval=2.0, timeout=2.0, metrics=None, active=None,
+                 tracer=None):
+        from urllib.parse import urlsplit
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.paths = paths
+        self.interval = interval
+        self.timeout = timeout
+        self.histograms = {path: LatencyHistogram() for path in paths}
+        self.metrics = metrics
+        self.active = active
+        self.tracer = tracer or TRACER
+        self.paused = False
+        self.listeners = []
+        self.connection = None
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="health-monitor", daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+    
+    def run(self):
+        while not self.stop_event.is_set():
+            self.paused = self.active is not None and not self.active()
+            if self.paused:
+                self.close()
+            else:
+                for path in self.paths:
+                    latency = self.probe(path)
+                    self.histograms[path].record(latency)
+                    if not self.metrics:
+                        continue
+                    if latency is not None:
+                        self.metrics.observe('health_check_seconds', latency, path=path)
+                    else:
+                        self.metrics.increment('health_check_failures_total', path=path)
+            for listener in list(self.listeners):
+                listener()
+            self.stop_event.wait(self.interval)
+        self.close()
+    
+    def probe(self, path):
+        """Return the request latency in seconds, or None on failure."""
+        import http.client
+        # A reused connection may have been closed by the server's idle
+        # keep-alive timeout; retry once on a fresh one before failing.
+        for attempt in range(2):
+            reused = self.connection is not None
+            if not reused:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            started = time.perf_counter()
+            try:
+                with self.tracer.span('http', method='GET', url=path, reused=reused) as span:
+                    self.connection.request('GET', path, headers={'Connection': 'keep-alive'})
+                    response = self.connection.getresponse()
+                    response.read()
+                    span['status'] = response.status
+                latency = time.perf_counter() - started
+                if response.will_close:
+                    self.close()
+                return latency if response.status == 200 else None
+            except (http.client.HTTPException, OSError):
+                self.close()
+                if not reused:
+                    return None
+        return None
+    
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+    
+    def state(self, slow_ms=500):
+        """Classify recent health as 'down', 'degraded' or 'healthy'."""
+        if self.paused:
+            return 'down'
+        summary = self.histograms[self.paths[0]].summary()
+        recent = self.histograms[self.paths[0]].recent(3)
+        if not recent or all(sample is None for sample in recent):
+            return 'down'
+        p95 = max((h.summary()['p95'] or 0) for h in self.histograms.values())
+        if summary['error_rate'] > 0 or p95 > slow_ms:
+            return 'degraded'
+        return 'healthy'
+
+
+class GitReaderError(Exception):
+    """Raised when GitRepoReader meets a repository layout it cannot handle."""
+
+
+class GitRepoReader:
+    """Minimal in-process reader for a plain `.git` directory.
+    
+    Resolves HEAD, loose refs and packed-refs, reads commits from loose
+    objects and v2 pack files (index lookups are cached per pack, deltas
+    are applied in Python) and computes ahead/behind counts without
+    spawning git. Anything unusual (worktrees, alternates, SHA-256 repos,
+    reftable, shallow clones missing parents) raises GitReaderError so the
+    caller can fall back to the git executable.
+    """
+    
+    OBJ_TYPES = {1: 'commit', 2: 'tree', 3: 'blob', 4: 'tag'}
+    OFS_DELTA = 6
+    REF_DELTA = 7
+    MAX_CACHED_COMMITS = 100_000
+    
+    def __init__(self, repo_root):
+        self.git_dir = Path(repo_root) / '.git'
+        if not self.git_dir.is_dir():
+            raise GitReaderError("not a plain .git directory")
+        self.objects_dir = self.git_dir / 'objects'
+        self.config = self.read_config()
+        if self.config.get('extensions', {}).get('objectformat', 'sha1') != 'sha1':
+            raise GitReaderError("unsupported object format")
+        if self.config.get('extensions', {}).get('refstorage', 'files') != 'files':
+            raise GitReaderError("unsupported ref storage")
+        self.packed_refs_key = None
+        self.packed_refs = {}
+        self.packs_key = None
+        self.packs = []
+        self.pack_indexes = {}
+        self.commits = {}
+    
+    # -- config -------------------------------------------------------------
+    
+    def read_config(self):
+        """Parse .git/config into {section: {key: value}} (subsections as 'branch "x"')."""
+        config = {}
+        section = None
+        try:
+            text = (self.git_dir / 'config').read_text(encoding='utf-8', errors='replace')
+        except OSError:
+            return config
+        for raw in text.splitlines():
+            line = raw.strip()
+            if not line or line[0] in '#;':
+                continue
+            if line.startswith('['):
+                header = line[1:line.index(']')].strip()
+                if ' ' in header:
+                    name, sub = header.split(' ', 1)
+                    header = f'{name.lower()} {sub.strip()}'
+                else:
+                    header = header.lower()
+                section = config.setdefault(header, {})
+                continue
+            if section is None:
+                continue
+            key, _, value = line.partition('=')
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] == '"':
+                value = value[1:-1]
+            section[key.strip().lower()] = value
+        if 'include' in config or any(name.startswith('includeif') for name in config):
+            raise GitReaderError("config includes are not supported")
+        return config
+    
+    # -- refs ---------------------------------------------------------------
+    
+    def load_packed_refs(self):
+        path = self.git_dir / 'packed-refs'
+        try:
+            stat = path.stat()
+        except OSError:
+            self.packed_refs_key, self.packed_refs = None, {}
+            return self.packed_refs
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key != self.packed_refs_key:
+            refs = {}
+            for line in path.read_text(encoding='utf-8', errors='replace').splitlines():
+                if not line or line[0] in '#^':
+                    continue
+                sha, _, name = line.partition(' ')
+                refs[name.strip()] = sha
+            self.packed_refs_key, self.packed_refs = key, refs
+        return self.packed_refs
+    
+    def read_ref(self, name, depth=0):
+        """Return the SHA for a full ref name (or HEAD), following symrefs."""
+        if depth > 5:
+            raise GitReaderError(f"symbolic ref loop at {name}")
+        try:
+            value = (self.git_dir / name).read_text(encoding='utf-8').strip()
+        except (OSError, UnicodeDecodeError):
+            value = self.load_packed_refs().get(name)
+        if not value:
+            return None
+        if value.startswith('ref: '):
+            return self.read_ref(value[5:].strip(), depth + 1)
+        if len(value) != 40:
+            raise GitReaderError(f"unexpected ref value for {name}")
+        return value
+    
+    def head_branch(self):
+        """Return the full ref HEAD points at, or None when detached."""
+        try:
+            value = (self.git_dir / 'HEAD').read_text(encoding='utf-8').strip()
+        except OSError:
+            raise GitReaderError("cannot read HEAD")
+        if value.startswith('ref: '):
+            return value[5:].strip()
+        return None
+    
+    def upstream(self, branch):
+        """Return (remote, remote_ref, tracking_ref) configured for a branch, or None."""
+        section = self.config.get(f'branch "{branch}"', {})
+        remote, merge = section.get('remote'), section.get('merge')
+        if not remote or not merge:
+            return None
+        if remote == '.' or not merge.startswith('refs/heads/'):
+            raise GitReaderError("unsupported upstream configuration")
+        refspec = self.config.get(f'remote "{remote}"', {}).get('fetch')
+        if refspec != f'+refs/heads/*:refs/remotes/{remote}/*':
+            raise GitReaderError("non-default fetch refspec")
+        return remote, merge, f"refs/remotes/{remote}/{merge[len('refs/heads/'):]}"
+    
+    # -- objects ------------------------------------------------------------
+    
+    def refresh_packs(self):
+        pack_dir = self.objects_dir / 'pack'
+        try:
+            key = pack_dir.stat().st_mtime_ns
+        except OSError:
+            self.packs = []
+            return self.packs
+        if key != self.packs_key:
+            self.packs = sorted(pack_dir.glob('*.idx'))
+            self.packs_key = key
+        return self.packs
+    
+    def load_index(self, idx_path):
+        """Return (fanout, shas, offsets, large_offsets) for a v2 pack index."""
+        index = self.pack_indexes.get(idx_path)
+        if index is None:
+            data = idx_path.read_bytes()
+            if data[:8] != b'\xfftOc\x00\x00\x00\x02':
+                raise GitReaderError(f"unsupported pack index {idx_path.name}")
+            fanout = struct.unpack_from('>256I', data, 8)
+            count = fanout[255]
+            shas_start = 8 + 1024
+            offsets_start = shas_start + 20 * count + 4 * count
+            large_start = offsets_start + 4 * count
+            index = (fanout, data, shas_start, offsets_start, large_start)
+            self.pack_indexes[idx_path] = index
+        return index
+    
+    def find_in_pack(self, idx_path, sha):
+        """Binary-search a pack index; return the object's offset or None."""
+        fanout, data, shas_start, offsets_start, large_start = self.load_index(idx_path)
+        first = sha[0]
+        lo = fanout[first - 1] if first else 0
+        hi = fanout[first]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = data[shas_start + 20 * mid:shas_start + 20 * mid + 20]
+            if candidate < sha:
+                lo = mid + 1
+            elif candidate > sha:
+                hi = mid
+            else:
+                offset = struct.unpack_from('>I', data, offsets_start + 4 * mid)[0]
+                if offset & 0x80000000:
+                    offset = struct.unpack_from('>Q', data, large_start + 8 * (offset & 0x7fffffff))[0]
+                return offset
+        return None
+    
+    def read_object(self, sha_hex):
+        """Return (type name, bytes) for an object."""
+        loose = self.objects_dir / sha_hex[:2] / sha_hex[2:]
+        try:
+            raw = zlib.decompress(loose.read_bytes())
+        except FileNotFoundError:
+            pass
+        except (OSError, zlib.error) as e:
+            raise GitReaderError(f"corrupt loose object {sha_hex}: {e}")
+        else:
+            header, _, body = raw.partition(b'\x00')
+            return header.split(b' ', 1)[0].decode(), body
+        
+        sha = bytes.fromhex(sha_hex)
+        for idx_path in self.refresh_packs():
+            offset = self.find_in_pack(idx_path, sha)
+            if offset is not None:
+                with open(idx_path.with_suffix('.pack'), 'rb') as pack:
+                    return self.read_packed(pack, offset)
+        raise GitReaderError(f"object {sha_hex} not found")
+    
+    def read_packed(self, pack, offset, depth=0):
+        """Read and (if needed) un-delta the pack entry at offset."""
+        if depth > 64:
+            raise GitReaderError("delta chain too deep")
+        pack.seek(offset)
+        header = pack.read(32)
+        pos = 0
+        byte = header[pos]
+        obj_type = (byte >> 4) & 7
+        while byte & 0x80:
+            pos += 1
+            byte = header[pos]
+        pos += 1
+        
+        if obj_type == self.OFS_DELTA:
+            byte = header[pos]
+            distance = byte & 0x7f
+            while byte & 0x80:
+                pos += 1
+                byte = header[pos]
+                distance = ((distance + 1) << 7) | (byte & 0x7f)
+            pos += 1
+            base_type, base = self.read_packed(pack, offset - distance, depth + 1)
+            return base_type, self.apply_delta(base, self.inflate(pack, offset + pos))
+        
+        if obj_type == self.REF_DELTA:
+            base_type, base = self.read_object(header[pos:pos + 20].hex())
+            return base_type, self.apply_delta(base, self.inflate(pack, offset + pos + 20))
+        
+        if obj_type not in self.OBJ_TYPES:
+            raise GitReaderError(f"unknown pack object type {obj_type}")
+        return self.OBJ_TYPES[obj_type], self.inflate(pack, offset + pos)
+    
+    def inflate(self, pack, offset):
+        pack.seek(offset)
+        decompressor = zlib.decompressobj()
+        chunks = []
+        while not decompressor.eof:
+            chunk = pack.read(16384)
+            if not chunk:
+                raise GitReaderError("truncated pack entry")
+            chunks.append(decompressor.decompress(chunk))
+        return b''.join(chunks)
+    
+    @staticmethod
+    def apply_delta(base, delta):
+        def varint(pos):
+            value = shift = 0
+            while True:
+                byte = delta[pos]
+                pos += 1
+                value |= (byte & 0x7f) << shift
+                shift += 7
+                if not byte & 0x80:
+                    return value, pos
+        
+        _, pos = varint(0)
+        _, pos = varint(pos)
+        out = bytearray()
+        while pos < len(delta):
+            op = delta[pos]
+            pos += 1
+            if op & 0x80:
+                copy_offset = copy_size = 0
+                for i in range(4):
+                    if op & (1 << i):
+                        copy_offset |= delta[pos] << (8 * i)
+                        pos += 1
+                for i in range(3):
+                    if op & (0x10 << i):
+                        copy_size |= delta[pos] << (8 * i)
+                        pos += 1
+                out += base[copy_offset:copy_offset + (copy_size or 0x10000)]
+            elif op:
+                out += delta[pos:pos + op]
+                pos += op
+            else:
+                raise GitReaderError("invalid delta opcode")
+        return bytes(out)
+    
+    def commit(self, sha):
+        """Return (parents, committer timestamp) for a commit, cached."""
+        cached = self.commits.get(sha)
+        if cached is not None:
+            return cached
+        obj_type, data = self.read_object(sha)
+        if obj_type != 'commit':
+            raise GitReaderError(f"{sha} is a {obj_type}, not a commit")
+        parents = []
+        timestamp = 0
+        for line in data.split(b'\n'):
+            if not line:
+                break
+            if line.startswith(b'parent '):
+                parents.append(line[7:47].decode())
+            elif line.startswith(b'committer '):
+                try:
+                    timestamp = int(line.rsplit(b' ', 2)[1])
+                except (IndexError, ValueError):
+                    pass
+        if len(self.commits) >= self.MAX_CACHED_COMMITS:
+            self.commits.clear()
+        self.commits[sha] = cached = (parents, timestamp)
+        return cached
+    
+    def ahead_behind(self, left, right):
+        """Return (ahead, behind) like `git rev-list --left-right --count left...right`.
+        
+        Walks newest-first from both tips, painting commits LEFT/RIGHT, and
+        stops once everything still queued is reachable from both sides and
+        older than every commit painted by one side only (a commit cannot
+        reach a newer one, so none of those can change any more). Commit
+        dates tie within a second, so stopping at the first all-BOTH queue
+        would leave shared ancestors counted as ahead or behind.
+        """
+        import heapq
+        LEFT, RIGHT, BOTH = 1, 2, 3
+        flags = {left: LEFT}
+        flags[right] = flags.get(right, 0) | RIGHT
+        queue = [(-self.commit(sha)[1], sha) for sha in {left, right}]
+        heapq.heapify(queue)
+        
+        while queue:
+            if all(flags[sha] == BOTH for _, sha in queue):
+                one_sided = [self.commit(sha)[1] for sha, flag in flags.items() if flag != BOTH]
+                if not one_sided or -queue[0][0] < min(one_sided):
+                    break
+            _, sha = heapq.heappop(queue)
+            flag = flags[sha]
+            for parent in self.commit(sha)[0]:
+                old = flags.get(parent, 0)
+                if old | flag != old:
+                    flags[parent] = old | flag
+                    heapq.heappush(queue, (-self.commit(parent)[1], parent))
+        
+        ahead = sum(1 for flag in flags.values() if flag == LEFT)
+        behind = sum(1 for flag in flags.values() if flag == RIGHT)
+        return ahead, behind
+
+    # -- index --------------------------------------------------------------
+    
+    def read_index(self, prefix=''):
+        """Tracked files under prefix from .git/index: {path: (size, mtime_ns, blob sha, stage)}.
+        
+        Versions 2-4 are parsed; split and sparse indexes raise GitReaderError.
+        Entries marked assume-unchanged or skip-worktree, symlinks and submodules are left out.
+        """
+        path = self.git_dir / 'index'
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return {}
+        if len(data) < 32 or data[:4] != b'DIRC':
+            raise GitReaderError("unrecognised index file")
+        version, count = struct.unpack('>II', data[4:12])
+        if version not in (2, 3, 4):
+            raise GitReaderError(f"unsupported index version {version}")
+        
+        entries = {}
+        pos = 12
+        name = b''
+        for _ in range(count):
+            start = pos
+            fields = struct.unpack('>10I', data[pos:pos + 40])
+            sha = data[pos + 40:pos + 60].hex()
+            flags, = struct.unpack('>H', data[pos + 60:pos + 62])
+            pos += 62
+            extended = 0
+            if version >= 3 and flags & 0x4000:
+                extended, = struct.unpack('>H', data[pos:pos + 2])
+                pos += 2
+            if version == 4:
+                strip = data[pos] & 0x7f
+                while data[pos] & 0x80:
+                    pos += 1
+                    strip = ((strip + 1) << 7) | (data[pos] & 0x7f)
+                pos += 1
+                end = data.index(b'\0', pos)
+                name = name[:len(name) - strip] + data[pos:end]
+                pos = end + 1
+            else:
+                end = data.index(b'\0', pos)
+                name = data[pos:end]
+                pos = start + ((end - start + 8) & ~7)
+            mode = fields[6]
+            if flags & 0x8000 or extended & 0x4000 or mode & 0o170000 in (0o120000, 0o160000):
+                continue
+            text = name.decode('utf-8', 'surrogateescape')
+            if text.startswith(prefix):
+                mtime_ns = fields[2] * 1_000_000_000 + fields[3]
+                entries[text] = (fields[9], mtime_ns, sha, (flags >> 12) & 3)
+        
+        while pos + 8 <= len(data) - 20:
+            signature = data[pos:pos + 4]
+            if signature in (b'link', b'sdir'):
+                raise GitReaderError("split and sparse indexes are not supported")
+            pos += 8 + struct.unpack('>I', data[pos + 4:pos + 8])[0]
+        return entries
+
+
+def open_git_reader(repo_root):
+    """Return a GitRepoReader for repo_root, or None if it cannot be used."""
+    try:
+        return GitRepoReader(repo_root)
+    except (GitReaderError, OSError):
+        return None
+
+
+def git_blob_sha(path, autocrlf=False):
+    """Git blob id of a working-tree file, plus its CRLF->LF normalised id when autocrlf applies."""
+    import hashlib
+    path = Path(path)
+    data = path.read_bytes()
+    digests = [hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()]
+    if autocrlf and b'\r\n' in data and b'\0' not in data[:8000]:
+        data = data.replace(b'\r\n', b'\n')
+        digests.append(hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest())
+    return ' '.join(digests)
+
+
+class ChangeDetector:
+    """Tracked files under a prefix (pr/) that differ from the git index, kept current cheaply.
+    
+    Tracked paths and blob ids come from .git/index, read in-process by
+    GitRepoReader (one `git ls-files` per index change otherwise). As in
+    git, a file whose size and mtime still match its index entry is clean;
+    anything else is hashed as a git blob through a FileHashCache, so only
+    files whose stat changed are ever read. With the optional watchdog
+    package, filesystem events queue a rescan of just the touched paths
+    once they have been quiet for `debounce` seconds; without it the tree
+    is stat-polled every poll_interval seconds. Listeners get the sorted
+    list of dirty paths whenever it changes.
+    """
+    
+    def __init__(self, repo_root, cache_file, prefix='pr/', debounce=0.3, poll_interval=3.0, run_git=None):
+        self.repo_root = Path(repo_root)
+        self.prefix = prefix
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.run_git = run_git
+        self.reader = open_git_reader(self.repo_root)
+        autocrlf = self.reader.config.get('core', {}).get('autocrlf', 'false') if self.reader else 'false'
+        self.autocrlf = autocrlf.lower() in ('true', 'input')
+        self.hashes = FileHashCache(cache_file, hasher=lambda path: git_blob_sha(path, self.autocrlf))
+        self.index_key = None
+        self.index_mtime_ns = 0
+        self.entries = {}
+        self.dirty = []
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.full_rescan = False
+        self.wake = threading.Event()
+        self.stop_event = threading.Event()
+        self.observer = None
+        self.thread = None
+    
+    def load_index(self):
+        """Re-read the index if it changed since the last scan; return True if it did."""
+        index = self.repo_root / '.git' / 'index'
+        try:
+            stat = index.stat()
+            key = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            key = None
+        if key == self.index_key:
+            return False
+        self.index_key = key
+        self.index_mtime_ns = key[0] if key else 0
+        try:
+            if self.reader is None:
+                raise GitReaderError("no in-process reader")
+            self.entries = self.reader.read_index(self.prefix)
+        except GitReaderError:
+            self.entries = {}
+            if self.run_git:
+                result = self.run_git(['ls-files', '--stage', '-z', '--', self.prefix])
+                for record in result.stdout.split('\0') if result.returncode == 0 else ():
+                    if '\t' in record:
+                        meta, path = record.split('\t', 1)
+                        mode, sha, stage = meta.split()
+                        if mode not in ('160000', '120000'):
+                            self.entries[path] = (None, None, sha, int(stage))
+        return True
+    
+    def is_dirty(self, path, entry):
+        size, mtime_ns, sha, stage = entry
+        if stage:
+            return True
+        full = self.repo_root / path
+        try:
+            stat = full.stat()
+        except OSError:
+            return True
+        # Racily clean entries (written in the same tick as the index) are hashed
+        if size == stat.st_size and mtime_ns == stat.st_mtime_ns and mtime_ns < self.index_mtime_ns:
+            return False
+        try:
+            return sha not in self.hashes.digest(full).split()
+        except OSError:
+            return True
+    
+    def scan(self, paths=None):
+        """Recheck `paths` (repo-relative; None = every tracked file) and return the dirty list."""
+        with self.lock:
+            if self.load_index() or paths is None:
+                dirty = {path for path, entry in self.entries.items() if self.is_dirty(path, entry)}
+            else:
+                dirty = set(self.dirty)
+                for path in paths:
+                    dirty.discard(path)
+                    entry = self.entries.get(path)
+                    if entry and self.is_dirty(path, entry):
+                        dirty.add(path)
+            self.hashes.save()
+            dirty = sorted(dirty)
+            changed = dirty != self.dirty
+            self.dirty = dirty
+        if changed:
+            for listener in list(self.listeners):
+                listener(dirty)
+        return dirty
+    
+    # -- watching -----------------------------------------------------------
+    
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            Observer = None
+        if Observer is not None and (self.repo_root / self.prefix).is_dir():
+            detector = self
+            
+            class Handler(FileSystemEventHandler):
+                def on_any_event(self, event):
+                    for path in (event.src_path, getattr(event, 'dest_path', '')):
+                        if path:
+                            detector.notify(path, event.is_directory)
+            
+            try:
+                self.observer = Observer()
+                self.observer.schedule(Handler(), str(self.repo_root / self.prefix), recursive=True)
+                self.observer.schedule(Handler(), str(self.repo_root / '.git'), recursive=False)
+                self.observer.start()
+            except OSError:
+                self.observer = None
+        self.thread = threading.Thread(target=self.run, name="change-detector", daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        self.wake.set()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer = None
+    
+    def notify(self, path, is_directory=False):
+        """Queue a filesystem event; the rescan runs once events stop for `debounce` seconds."""
+        try:
+            relative = Path(os.fsdecode(path)).relative_to(self.repo_root).as_posix()
+        except ValueError:
+            return
+        if relative.startswith('.git/'):
+            if relative != '.git/index':
+                return
+        elif '/node_modules/' in relative:
+            return
+        with self.lock:
+            if is_directory:
+                self.full_rescan = True
+            else:
+                self.pending.add(relative)
+        self.wake.set()
+    
+    def run(self):
+        self.scan()
+        while not self.stop_event.is_set():
+            triggered = self.wake.wait(None if self.observer else self.poll_interval)
+            # Debounce: editors and git write in bursts
+            while triggered and not self.stop_event.is_set():
+                self.wake.clear()
+                if self.stop_event.wait(self.debounce) or not self.wake.is_set():
+                    break
+            if self.stop_event.is_set():
+                break
+            with self.lock:
+                paths = None if self.full_rescan or not self.observer else self.pending
+                self.pending = set()
+                self.full_rescan = False
+            try:
+                self.scan(paths)
+            except Exception:
+                pass
+
+
+class UpdateChecker:
+    """Work out how far HEAD is behind its upstream as cheaply as possible.
+    
+    Only the upstream of the current branch is considered. `git ls-remote`
+    of that single ref is compared with the local remote-tracking SHA and
+    the fetch is skipped when they match. Results are cached on disk for
+    ttl seconds (keyed by HEAD and upstream SHA) so repeated launches do
+    not touch the network at all.
+    
+    When a GitRepoReader is given, refs and ahead/behind counts are read
+    in-process; any GitReaderError falls back to the git executable.
+    """
+    
+    def __init__(self, run_git, cache_file, ttl=300, reader=None):
+        self.run_git = run_git
+        self.cache_file = Path(cache_file)
+        self.ttl = ttl
+        self.reader = reader
+    
+    def load(self):
+        try:
+            return json.loads(self.cache_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+    
+    def save(self, data):
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_file.write_text(json.dumps(data, indent=2), encoding='utf-8')
+    
+    def invalidate(self):
+        try:
+            self.cache_file.unlink()
+        except OSError:
+            pass
+    
+    def read_refs(self):
+        """Return (branch, head_sha, remote, remote_ref, tracking_ref, tracking_sha)."""
+        if self.reader:
+            try:
+                return self.read_refs_in_process()
+            except (GitReaderError, OSError):
+                pass
+        return self.read_refs_with_git()
+    
+    def read_refs_in_process(self):
+        reader = self.reader
+        refname = reader.head_branch()
+        if refname is None or not refname.startswith('refs/heads/'):
+            raise GitReaderError("detached HEAD")
+        branch = refname[len('refs/heads/'):]
+        head_sha = reader.read_ref(refname)
+        if head_sha is None:
+            raise GitReaderError("unborn branch")
+        
+        upstream = reader.upstream(branch)
+        if upstream is None:
+            upstream = 'origin', refname, f'refs/remotes/origin/{branch}'
+        remote, remote_ref, tracking = upstream
+        tracking_sha = reader.read_ref(tracking)
+        if tracking_sha is None:
+            return branch, head_sha, None, None, None, None
+        return branch, head_sha, remote, remote_ref, tracking, tracking_sha
+    
+    def read_refs_with_git(self):
+        """Same as read_refs, using a single `git for-each-ref` call."""
+        result = self.run_git([
+            'for-each-ref',
+            '--format=%(HEAD)|%(refname)|%(objectname)|%(upstream:remotename)|%(upstream:remoteref)|%(upstream)',
+            'refs/heads', 'refs/remotes'
+        ])
+        if result.returncode != 0:
+            return None
+        
+        shas = {}
+        head = None
+        for line in result.stdout.splitlines():
+            fields = line.split('|')
+            if len(fields) != 6:
+                continue
+            is_head, refname, sha, remote, remote_ref, tracking = fields
+            shas[refname] = sha
+            if is_head == '*':
+                head = (refname, sha, remote, remote_ref, tracking)
+        if head is None:
+            return None
+        
+        refname, sha, remote, remote_ref, tracking = head
+        branch = refname[len('refs/heads/'):]
+        if not tracking:
+            # No upstream configured: fall back to origin/<branch> like before
+            remote, remote_ref, tracking = 'origin', refname, f'refs/remotes/origin/{branch}'
+            if tracking not in shas:
+                return branch, sha, None, None, None, None
+        return branch, sha, remote, remote_ref, tracking, shas.get(tracking)
+    
+    def check(self, task=None, force=False):
+        """Return (state, message, behind)."""
+        refs = self.read_refs()
+        if refs is None:
+            return 'error', 'Cannot determine branch', 0
+        branch, head_sha, remote, remote_ref, tracking, tracking_sha = refs
+        if tracking is None:
+            return 'na', 'No upstream configured', 0
+        
+        cached = self.load()
+        if (not force and cached.get('head') == head_sha and cached.get('tracking') == tracking
+                and cached.get('tracking_sha') == tracking_sha
+                and time.time() - cached.get('checked_at', 0) < self.ttl):
+            state, message, behind = cached['result']
+            return state, message, behind
+        
+        # Ask the remote for just this ref; only fetch when it moved
+        ls_remote = self.run_git(['ls-remote', '--quiet', remote, remote_ref])
+        if ls_remote.returncode != 0:
+            return 'error', 'Unable to reach remote', 0
+        remote_sha = ls_remote.stdout.split()[0] if ls_remote.stdout.strip() else None
+        if task:
+            task.check()
+        
+        if remote_sha and remote_sha != tracking_sha:
+            fetch = self.run_git(['fetch', '--quiet', '--no-tags', remote, remote_ref])
+            if fetch.returncode != 0:
+                return 'error', 'Unable to fetch', 0
+            if task:
+                task.check()
+        
+        result = self.count(tracking)
+        if result[0] != 'error':
+            self.save({
+                'head': head_sha,
+                'tracking': tracking,
+                'tracking_sha': remote_sha or tracking_sha,
+                'checked_at': time.time(),
+                'result': list(result)
+            })
+        return result
+    
+    def count(self, tracking):
+        """Count commits ahead/behind the remote-tracking ref."""
+        if self.reader:
+            try:
+                head = self.reader.read_ref('HEAD')
+                tracking_sha = self.reader.read_ref(tracking)
+                if head and tracking_sha:
+                    ahead, behind = self.reader.ahead_behind(head, tracking_sha)
+                    return self.describe(ahead, behind)
+            except (GitReaderError, OSError, IndexError, ValueError):
+                pass
+        
+        sync = self.run_git(['rev-list', '--left-right', '--count', f'HEAD...{tracking}'])
+        if sync.returncode != 0:
+            return 'na', 'No upstream configured', 0
+        
+        try:
+            parts = sync.stdout.strip().split()
+            if len(parts) < 2:
+                raise ValueError("Unexpected output")
+            behind = int(parts[1])
+            ahead = int(parts[0])
+        except ValueError:
+            return 'error', 'Parse error', 0
+        
+        return self.describe(ahead, behind)
+    
+    @staticmethod
+    def describe(ahead, behind):
+        if behind > 0:
+            return 'available', f"{behind} update{'s' if behind > 1 else ''} available", behind
+        elif ahead > 0:
+            return 'uptodate', f"{ahead} commit{'s' if ahead > 1 else ''} ahead", 0
+        else:
+            return 'uptodate', 'Up to date', 0
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task when it has been cancelled."""
+
+
+class Task:
+    """Handle for a unit of background work submitted to a TaskRunner."""
+    
+    def __init__(self, runner, kind, widgets):
+        self.runner = runner
+        self.kind = kind
+        self.widgets = widgets
+        self.cancel_event = threading.Event()
+        self.future = None
+    
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+    
+    def cancel(self):
+        """Request cancellation; the task stops at its next checkpoint."""
+        self.cancel_event.set()
+    
+    def check(self):
+        """Raise TaskCancelled if cancellation was requested."""
+        if self.cancel_event.is_set():
+            raise TaskCancelled(self.kind)
+    
+    def sleep(self, seconds):
+        """Sleep that wakes up early (and raises) when the task is cancelled."""
+        if self.cancel_event.wait(seconds):
+            raise TaskCancelled(self.kind)
+    
+    def post(self, callback):
+        """Run callback on the Tk thread."""
+        self.runner.post(callback)
+
+
+class TaskRunner:
+    """Run blocking work on a worker pool and deliver results on the Tk thread.
+    
+    Only one task per kind may be active at a time; submitting a kind that is
+    already running is a no-op. Widgets passed to submit() are disabled for
+    the lifetime of the task.
+    """
+    
+    def __init__(self, root, max_workers=4, poll_interval=50, tracer=None):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.max_workers = max_workers
+        self.tracer = tracer or TRACER
+        self.executor = None
+        self.results = queue.Queue()
+        self.active = {}
+        self.closed = False
+        self.root.after(self.poll_interval, self.drain)
+    
+    def is_running(self, kind):
+        return kind in self.active
+    
+    def submit(self, kind, func, on_success=None, on_error=None, widgets=()):
+        """Run func(task) in the pool; callbacks run on the Tk thread."""
+        if self.closed or kind in self.active:
+            return None
+        
+        if self.executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="task")
+        
+        task = Task(self, kind, tuple(widgets))
+        self.active[kind] = task
+        for widget in task.widgets:
+            widget.configure(state="disabled")
+        
+        def run():
+            try:
+                with self.tracer.span('task', name=kind):
+                    result = func(task)
+            except TaskCancelled:
+                self.results.put((task, None, None, None))
+            except Exception as e:
+                self.results.put((task, on_error, e, None))
+            else:
+                self.results.put((task, on_success, None, result))
+        
+        task.future = self.executor.submit(run)
+        return task
+    
+    def post(self, callback):
+        """Queue a callable to run on the Tk thread."""
+        self.results.put((None, callback, None, None))
+    
+    def cancel(self, kind):
+        task = self.active.get(kind)
+        if task:
+            task.cancel()
+    
+    def drain(self):
+        """Deliver finished results and posted callbacks on the Tk thread."""
+        while True:
+            try:
+                task, callback, error, result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            
+            if task is None:
+                callback()
+                continue
+            
+            if self.active.get(task.kind) is task:
+                del self.active[task.kind]
+            for widget in task.widgets:
+                try:
+                    widget.configure(state="normal")
+                except tk.TclError:
+                    pass
+            
+            if task.cancelled or callback is None:
+                continue
+            if error is not None:
+                callback(error)
+            else:
+                callback(result)
+        
+        if not self.closed:
+            self.root.after(self.poll_interval, self.drain)
+    
+    def shutdown(self):
+        """Cancel everything and stop accepting work."""
+        self.closed = True
+        for task in list(self.active.values()):
+            task.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class StepGraph:
+    """Run named steps concurrently, each as soon as the steps it depends on have finished.
+    
+    Steps are added in dependency order; a step receives the results of its
+    dependencies as keyword arguments and is skipped when one of them
+    failed. The whole graph takes about as long as its slowest chain of
+    steps rather than the sum of all of them.
+    """
+    
+    def __init__(self, max_workers=8, tracer=None):
+        self.max_workers = max_workers
+        self.tracer = tracer or TRACER
+        self.steps = {}
+    
+    def add(self, name, func, after=()):
+        for dependency in after:
+            if dependency not in self.steps:
+                raise Exception(f"Step {name} depends on unknown step {dependency}")
+        self.steps[name] = (func, tuple(after))
+    
+    def run(self, task=None, on_step=None):
+        """Run every step; return {name: (result, error, seconds)}.
+        
+        on_step(name, result, error, seconds) is called from this thread as
+        each step finishes, in completion order.
+        """
+        from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+        
+        def timed(name, func, inputs):
+            started = time.perf_counter()
+            try:
+                with self.tracer.span('step', name=name):
+                    result = func(**inputs)
+            except Exception as e:
+                return None, e, time.perf_counter() - started
+            return result, None, time.perf_counter() - started
+        
+        def finish(name, outcome):
+            results[name] = outcome
+            if on_step:
+                on_step(name, *outcome)
+        
+        results = {}
+        pending = dict(self.steps)
+        running = {}
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="step")
+        try:
+            while pending or running:
+                for name, (func, after) in list(pending.items()):
+                    if not all(dependency in results for dependency in after):
+                        continue
+                    del pending[name]
+                    failed = next((dependency for dependency in after if results[dependency][1] is not None), None)
+                    if failed:
+                        finish(name, (None, Exception(f"skipped because {failed} failed"), 0.0))
+                        continue
+                    inputs = {dependency: results[dependency][0] for dependency in after}
+                    running[pool.submit(timed, name, func, inputs)] = name
+                
+                if not running:
+                    continue
+                done, _ = wait(running, timeout=0.1, return_when=FIRST_COMPLETED)
+                if task:
+                    task.check()
+                for future in done:
+                    finish(running.pop(future), future.result())
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return results
+
+
+class LogViewer:
+    """Toplevel window that tails a ServerLog incrementally."""
+    
+    def __init__(self, root, log, max_lines=2000, poll_interval=250):
+        self.log = log
+        self.max_lines = max_lines
+        self.poll_interval = poll_interval
+        self.sequence = 0
+        
+        self.window = tk.Toplevel(root)
+        self.window.title(f"{APP_TITLE} - Server Logs")
+        self.window.geometry("720x360")
+        self.window.configure(bg=Colors.BACKGROUND)
+        
+        scrollbar = tk.Scrollbar(self.window)
+        scrollbar.pack(side="right", fill="y")
+        
+        self.text = tk.Text(
+            self.window,
+            font=("Consolas", 9),
+            fg=Colors.FOREGROUND,
+            bg=Colors.CARD_BG,
+            insertbackground=Colors.FOREGROUND,
+            bd=0,
+            wrap="none",
+            yscrollcommand=scrollbar.set
+        )
+        self.text.pack(fill="both", expand=True)
+        scrollbar.configure(command=self.text.yview)
+        
+        self.text.tag_configure('err', foreground=Colors.ERROR)
+        self.text.tag_configure('app', foreground=Colors.INFO)
+        self.text.configure(state="disabled")
+        
+        self.refresh()
+    
+    def is_open(self):
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+    
+    def refresh(self):
+        """Append only lines that arrived since the last refresh."""
+        if not self.is_open():
+            return
+        
+        self.sequence, lines = self.log.since(self.sequence)
+        if lines:
+            at_bottom = self.text.yview()[1] >= 0.999
+            self.text.configure(state="normal")
+            for name, text in lines:
+                self.text.insert("end", text + "\n", name)
+            
+            # Keep the widget bounded like the buffer behind it
+            excess = int(self.text.index("end-1c").split(".")[0]) - 1 - self.max_lines
+            if excess > 0:
+                self.text.delete("1.0", f"{excess + 1}.0")
+            self.text.configure(state="disabled")
+            if at_bottom:
+                self.text.see("end")
+        
+        self.window.after(self.poll_interval, self.refresh)
+
+
+class StatsPanel:
+    """Toplevel window with per-operation timing trends over recent sessions."""
+    
+    def __init__(self, root, metrics, sessions=20, poll_interval=5000):
+        self.metrics = metrics
+        self.sessions = sessions
+        self.poll_interval = poll_interval
+        
+        self.window = tk.Toplevel(root)
+        self.window.title(f"{APP_TITLE} - Stats")
+        self.window.geometry("760x360")
+        self.window.configure(bg=Colors.BACKGROUND)
+        
+        self.text = tk.Text(
+            self.window,
+            font=("Consolas", 9),
+            fg=Colors.FOREGROUND,
+            bg=Colors.CARD_BG,
+            bd=0,
+            wrap="none"
+        )
+        self.text.pack(fill="both", expand=True)
+        self.text.tag_configure('heading', foreground=Colors.INFO)
+        self.text.tag_configure('bad', foreground=Colors.ERROR)
+        
+        self.refresh()
+    
+    def is_open(self):
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+    
+    def refresh(self):
+        if not self.is_open():
+            return
+        
+        self.text.configure(state="normal")
+        self.text.delete("1.0", "end")
+        for line, tag in format_stats(self.metrics, self.sessions):
+            self.text.insert("end", line + "\n", tag)
+        self.text.configure(state="disabled")
+        self.window.after(self.poll_interval, self.refresh)
+
+
+def format_stats(metrics, limit=20):
+    """[(line, tag)] for the Stats panel and `stats`: p50 trend per series, then counters."""
+    sessions, histograms, counters = metrics.trends(limit)
+    if not sessions:
+        return [("No sessions recorded yet.", None)]
+    lines = [(f"Last {len(sessions)} session(s), oldest first; trend is the median per session.", 'heading'), ("", None),
+             (f"{'operation':<44}{'trend':<{limit + 2}}{'p50':>9}{'p95':>9}{'max':>9}{'n':>6}", 'heading')]
+    for key, values, latest in histograms:
+        lines.append((
+            f"{key[:43]:<44}{sparkline(values):<{limit + 2}}"
+            f"{format_seconds(latest['p50']):>9}{format_seconds(latest['p95']):>9}{format_seconds(latest['max']):>9}"
+            f"{latest['count']:>6}", None
+        ))
+    if counters:
+        lines += [("", None), (f"{'counter':<44}{'per session':<{limit + 2}}{'total':>9}", 'heading')]
+        for key, values in counters:
+            lines.append((f"{key[:43]:<44}{sparkline(values):<{limit + 2}}{sum(values):>9}",
+                          'bad' if 'failures' in key and values[-1] else None))
+    return lines
+
+
+def format_seconds(seconds):
+    if seconds < 0.001:
+        return f"{seconds * 1_000_000:.0f}us"
+    return f"{seconds * 1000:.1f}ms" if seconds < 1 else f"{seconds:.2f}s"
+
+
+class SiteDashboard:
+    """Toplevel window with one row per workspace site.
+    
+    The cores (one per site) belong to the app so servers started here
+    outlive the window. Refresh checks every site at once through
+    Workspace.check_all; each row's buttons act on that site only.
+    """
+    
+    HEADINGS = ('Site', 'Port', 'Server', 'Updates', 'npm')
+    
+    def __init__(self, root, tasks, workspace, cores, open_core):
+        self.tasks = tasks
+        self.workspace = workspace
+        self.cores = cores
+        self.open_core = open_core
+        self.rows = {}
+        
+        self.window = tk.Toplevel(root)
+        self.window.title(f"{APP_TITLE} - Sites")
+        self.window.geometry(f"860x{140 + 34 * len(workspace.sites)}")
+        self.window.configure(bg=Colors.BACKGROUND)
+        
+        toolbar = tk.Frame(self.window, bg=Colors.BACKGROUND)
+        toolbar.pack(fill="x", padx=16, pady=(12, 6))
+        self.refresh_btn = self.small_button(toolbar, "⟳ Check All", self.refresh)
+        self.refresh_btn.pack(side="left")
+        self.small_button(toolbar, "＋ Add Site", self.add_site).pack(side="left", padx=(6, 0))
+        self.summary_var = tk.StringVar(value="")
+        tk.Label(
+            toolbar, textvariable=self.summary_var, font=("Segoe UI", 9),
+            fg=Colors.MUTED, bg=Colors.BACKGROUND
+        ).pack(side="left", padx=12)
+        
+        self.table = tk.Frame(self.window, bg=Colors.CARD_BG)
+        self.table.pack(fill="both", expand=True, padx=16, pady=(0, 16))
+        for column, heading in enumerate(self.HEADINGS):
+            tk.Label(
+                self.table, text=heading, font=("Segoe UI Semibold", 9),
+                fg=Colors.MUTED, bg=Colors.CARD_BG, anchor="w"
+            ).grid(row=0, column=column, sticky="w", padx=8, pady=(8, 4))
+        self.table.columnconfigure(2, weight=1)
+        self.table.columnconfigure(3, weight=1)
+        
+        for site in workspace.sites:
+            self.add_row(site)
+        self.refresh()
+    
+    def small_button(self, parent, text, command):
+        return tk.Button(
+            parent, text=text, command=command, font=("Segoe UI", 9),
+            fg=Colors.PRIMARY_TEXT, bg=Colors.BUTTON_PRIMARY, activebackground=Colors.BUTTON_HOVER,
+            activeforeground=Colors.PRIMARY_TEXT, disabledforeground=Colors.MUTED,
+            bd=0, padx=8, pady=2, cursor="hand2"
+        )
+    
+    def is_open(self):
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+    
+    def add_row(self, site):
+        name = site['name']
+        row = len(self.rows) + 1
+        cells = {}
+        for column, key in enumerate(('name', 'port', 'server', 'updates', 'npm')):
+            text = {'name': name, 'port': str(site['port'])}.get(key, "…")
+            cells[key] = tk.Label(
+                self.table, text=text, font=("Segoe UI", 9), anchor="w",
+                fg=Colors.FOREGROUND if key in ('name', 'port') else Colors.MUTED, bg=Colors.CARD_BG
+            )
+            cells[key].grid(row=row, column=column, sticky="w", padx=8, pady=3)
+        
+        actions = tk.Frame(self.table, bg=Colors.CARD_BG)
+        actions.grid(row=row, column=len(self.HEADINGS), sticky="e", padx=8)
+        buttons = {}
+        for label, action in (("▶", self.start), ("■", self.stop), ("📥", self.update), ("🌐", self.open)):
+            buttons[action.__name__] = self.small_button(actions, label, lambda action=action: action(name))
+            buttons[action.__name__].pack(side="left", padx=2)
+        self.rows[name] = (cells, buttons)
+    
+    def set_cell(self, name, key, text, color=None):
+        if not self.is_open() or name not in self.rows:
+            return
+        self.rows[name][0][key].configure(text=text, fg=color or Colors.FOREGROUND)
+    
+    def show_results(self, name, results):
+        """Fill a row from one site's startup_checks results."""
+        server, error = results['server'][0], results['server'][1]
+        if error is not None:
+            self.set_cell(name, 'server', f"error: {error}", Colors.ERROR)
+        elif server[0]:
+            if server[1]:
+                self.set_cell(name, 'server', f"running (PID {server[0]})", Colors.SUCCESS)
+            else:
+                self.set_cell(name, 'server', f"not responding (PID {server[0]})", Colors.WARNING)
+        else:
+            self.set_cell(name, 'server', "stopped", Colors.MUTED)
+        
+        updates, error = results['updates'][0], results['updates'][1]
+        if error is not None:
+            self.set_cell(name, 'updates', str(error)[:40], Colors.ERROR)
+        else:
+            color = {'available': Colors.WARNING, 'uptodate': Colors.SUCCESS}.get(updates[0], Colors.MUTED)
+            self.set_cell(name, 'updates', updates[1], color)
+        
+        dependencies, error = results['dependencies'][0], results['dependencies'][1]
+        if error is not None:
+            self.set_cell(name, 'npm', str(error)[:40], Colors.ERROR)
+        elif dependencies[0]:
+            self.set_cell(name, 'npm', f"{dependencies[0]} needed ({dependencies[1]})", Colors.WARNING)
+        else:
+            self.set_cell(name, 'npm', "ok", Colors.SUCCESS)
+    
+    def refresh(self):
+        """Check every site at once; rows fill in as their sites finish."""
+        started = time.perf_counter()
+        self.summary_var.set(f"Checking {len(self.cores)} sites...")
+        
+        def check(task):
+            return Workspace.check_all(
+                self.cores, task,
+                on_site=lambda name, results: task.post(lambda: self.show_results(name, results))
+            )
+        
+        self.tasks.submit(
+            'sites-check', check,
+            on_success=lambda results: self.summary_var.set(
+                f"Checked {len(results)} sites in {time.perf_counter() - started:.2f}s") if self.is_open() else None,
+            on_error=lambda error: self.summary_var.set(f"Check failed: {error}") if self.is_open() else None,
+            widgets=[self.refresh_btn]
+        )
+    
+    def check_site(self, name):
+        self.tasks.submit(
+            f'site-check:{name}', lambda task: self.cores[name].startup_checks(task),
+            on_success=lambda results: self.show_results(name, results)
+        )
+    
+    def run_action(self, name, action, message, func):
+        """Run one site action in the background, then re-check that site."""
+        self.set_cell(name, 'server', message, Colors.INFO)
+        
+        def on_done(result):
+            self.check_site(name)
+        
+        def on_failed(error):
+            self.set_cell(name, 'server', str(error).splitlines()[0][:60], Colors.ERROR)
+        
+        self.tasks.submit(
+            f'site-{action}:{name}', func, on_success=on_done, on_error=on_failed,
+            widgets=[self.rows[name][1][action]]
+        )
+    
+    def start(self, name):
+        core = self.cores[name]
+        self.run_action(name, 'start', "starting...", lambda task: core.start_server(task))
+    
+    def stop(self, name):
+        core = self.cores[name]
+        self.run_action(name, 'stop', "stopping...", lambda task: core.stop_server())
+    
+    def update(self, name):
+        core = self.cores[name]
+        self.set_cell(name, 'updates', "pulling...", Colors.INFO)
+        self.run_action(name, 'update', "updating...", core.apply_update)
+    
+    def open(self, name):
+        import webbrowser
+        webbrowser.open(self.cores[name].server_url)
+    
+    def add_site(self):
+        from tkinter import filedialog
+        folder = filedialog.askdirectory(parent=self.window, title="Choose the site's repository folder")
+        if not folder:
+            return
+        try:
+            site = self.workspace.add(folder)
+        except Exception as e:
+            messagebox.showerror("Add Site", str(e), parent=self.window)
+            return
+        self.cores[site['name']] = self.open_core(site)
+        self.add_row(site)
+        self.window.geometry(f"860x{140 + 34 * len(self.workspace.sites)}")
+        self.check_site(site['name'])
+
+
+def app_start_path():
+    """Directory of the running script or EXE."""
+    if getattr(sys, 'frozen', False):
+        # Running as compiled EXE
+        return Path(sys.executable).parent
+    # Running as script
+    return Path(__file__).parent
+
+
+def user_state_path():
+    """Per-user file that remembers things between launches."""
+    if os.name == 'nt':
+        base = Path(os.environ.get('LOCALAPPDATA') or Path.home() / 'AppData' / 'Local')
+        return base / 'VideoManager' / 'state.json'
+    base = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache')
+    return base / 'video-manager' / 'state.json'
+
+
+class AppState:
+    """Persisted launch state for one install location.
+    
+    Caches the resolved repo root, tool paths and the last update status
+    so the next launch can skip the directory walk and PATH searches and
+    show something useful before the update check has run.
+    """
+    
+    def __init__(self, path=None, key=None):
+        self.path = Path(path) if path else user_state_path()
+        self.key = key or str(app_start_path())
+        self.lock = threading.Lock()
+        try:
+            self.data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            self.data = {}
+        self.entry = self.data.setdefault(self.key, {})
+    
+    def get(self, name, default=None):
+        return self.entry.get(name, default)
+    
+    def set(self, name, value):
+        """Store a value and write the file if it changed."""
+        with self.lock:
+            if self.entry.get(name) == value:
+                return
+            self.entry[name] = value
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self.path.write_text(json.dumps(self.data, indent=2), encoding='utf-8')
+            except OSError:
+                pass
+
+
+class Workspace:
+    """The sites this app manages together, kept in workspace.json next to the user state.
+    
+    Each site is {"name", "repo", "port"}; ports must be unique because
+    every site's server listens on its own. Without a file the workspace
+    is just default_repo on SERVER_PORT, so single-site installs need no
+    configuration.
+    """
+    
+    def __init__(self, path=None, default_repo=None):
+        self.path = Path(path) if path else user_state_path().with_name('workspace.json')
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            self.sites = [
+                {'name': site.get('name') or Path(site['repo']).name, 'repo': str(site['repo']),
+                 'port': int(site.get('port') or SERVER_PORT)}
+                for site in data.get('sites', [])
+            ]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self.sites = []
+        if not self.sites and default_repo:
+            self.sites = [{'name': Path(default_repo).name, 'repo': str(default_repo), 'port': SERVER_PORT}]
+    
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps({'sites': self.sites}, indent=2), encoding='utf-8')
+    
+    def add(self, repo, name=None, port=None):
+        """Add a repo (by default on the next port that is a multiple of 10) and save; return the new site.
+        
+        Spacing sites by 10 leaves each one room for its proxy backend port.
+        """
+        repo = Path(repo).resolve()
+        if not (repo / 'pr' / 'video-manager-server.js').exists():
+            raise Exception(f"{repo} does not contain pr/video-manager-server.js")
+        if any(Path(site['repo']).resolve() == repo for site in self.sites):
+            raise Exception(f"{repo} is already in the workspace")
+        ports = {site['port'] for site in self.sites}
+        port = port or (max(ports | {SERVER_PORT - 10}) // 10 + 1) * 10
+        if port in ports:
+            raise Exception(f"Port {port} is already used by another site")
+        name = name or repo.name
+        if any(site['name'] == name for site in self.sites):
+            name = f"{name}-{port}"
+        site = {'name': name, 'repo': str(repo), 'port': port}
+        self.sites.append(site)
+        self.save()
+        return site
+    
+    def port_for(self, repo_root):
+        repo_root = Path(repo_root).resolve()
+        for site in self.sites:
+            if Path(site['repo']).resolve() == repo_root:
+                return site['port']
+        return SERVER_PORT
+    
+    @staticmethod
+    def open_core(site, reporter=None, on_progress=None):
+        """A ManagerCore for a site; its launch state lives in the site's own state folder."""
+        state_dir = Path(site['repo']) / STATE_DIR_NAME
+        return ManagerCore(
+            site['repo'], app_state=AppState(path=state_dir / 'launch-state.json'),
+            reporter=reporter, on_progress=on_progress, port=site['port']
+        )
+    
+    @staticmethod
+    def check_all(cores, task=None, max_workers=WORKSPACE_WORKERS, on_site=None):
+        """Run every site's startup checks at once; return {name: StepGraph results}.
+        
+        At most max_workers sites are checked concurrently, so ten sites cost
+        about as much as one as long as they fit in the pool. on_site(name,
+        results) is called from a worker thread as each site finishes.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        def check(name):
+            results = cores[name].startup_checks(task)
+            if on_site:
+                on_site(name, results)
+            return results
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(cores))), thread_name_prefix="site") as pool:
+            return dict(zip(cores, pool.map(check, cores)))
+
+
+class StartupProfiler:
+    """Collect phase timings for `--profile-startup`."""
+    
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = []
+        self.last = STARTUP_T0
+        self.reported = False
+    
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last, now - STARTUP_T0))
+        self.last = now
+    
+    def report(self, state_dir=None):
+        """Print the breakdown (or write it next to the state when there is no console)."""
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        lines = ["Startup profile (ms):", f"{'phase':<28}{'step':>10}{'total':>10}"]
+        for phase, step, total in self.phases:
+            lines.append(f"{phase:<28}{step * 1000:>10.1f}{total * 1000:>10.1f}")
+        text = "\n".join(lines)
+        if sys.stdout is not None:
+            print(text, flush=True)
+        elif state_dir is not None:
+            try:
+                Path(state_dir).mkdir(parents=True, exist_ok=True)
+                (Path(state_dir) / 'startup-profile.txt').write_text(text + "\n", encoding='utf-8')
+            except OSError:
+                pass
+
+
+class Tracer:
+    """Append structured timing events to a JSONL trace file.
+    
+    Does nothing until open() is called. Each line is one JSON object with
+    'ts' (epoch seconds), 'kind' and 'thread' plus the event's own fields;
+    the file is rotated to <name>.1 once it grows past max_bytes.
+    """
+    
+    def __init__(self):
+        self.path = None
+        self.max_bytes = 0
+        self.lock = threading.Lock()
+    
+    @property
+    def enabled(self):
+        return self.path is not None
+    
+    def open(self, path, max_bytes=5_000_000):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+    
+    def close(self):
+        self.path = None
+    
+    def event(self, kind, **fields):
+        if self.path is None:
+            return
+        record = {'ts': round(time.time(), 3), 'kind': kind, 'thread': threading.current_thread().name}
+        record.update(fields)
+        line = json.dumps(record, default=str) + "\n"
+        with self.lock:
+            try:
+                if self.path.exists() and self.path.stat().st_size > self.max_bytes:
+                    os.replace(self.path, self.path.with_name(self.path.name + '.1'))
+                else:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            except OSError:
+                pass
+    
+    @contextmanager
+    def span(self, kind, **fields):
+        """Time the with-block and record it as one event with 'ms' (and 'error' if it raised).
+        
+        The yielded dict is the event's fields, so the block can add results
+        such as a return code.
+        """
+        if self.path is None:
+            yield fields
+            return
+        started = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as e:
+            fields['error'] = f"{type(e).__name__}: {e}"[:300]
+            raise
+        finally:
+            self.event(kind, ms=round((time.perf_counter() - started) * 1000, 2), **fields)
+
+
+# Never opened: the default for code run outside a ManagerCore. Each core
+# owns a Tracer for its own site's trace.jsonl and passes it down.
+TRACER = Tracer()
+
+
+def summarize_trace(trace_file):
+    """Per-kind count/p50/p95/max (ms) and the slowest stalls from a trace and its backup."""
+    trace_file = Path(trace_file)
+    spans = {}
+    stalls = []
+    for path in (trace_file.with_name(trace_file.name + '.1'), trace_file):
+        try:
+            with open(path, encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError:
+            continue
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record['kind'] == 'stall':
+                stalls.append(record)
+            elif 'ms' in record:
+                detail = record.get('name') or (record.get('args') or [None])[0] or record.get('url')
+                name = f"{record['kind']} {detail}" if detail else record['kind']
+                spans.setdefault(name, []).append(record['ms'])
+    
+    rows = []
+    for name, values in sorted(spans.items()):
+        values.sort()
+        rows.append({
+            'name': name,
+            'count': len(values),
+            'p50': values[len(values) // 2],
+            'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+            'max': values[-1],
+        })
+    stalls.sort(key=lambda record: -record['lag_ms'])
+    return {'spans': rows, 'stalls': len(stalls), 'worst_stalls': stalls[:10]}
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on path (created if missing) for the with-block, across processes."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            # LK_LOCK retries for about 10 seconds, then raises OSError
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class Metrics:
+    """Counters and histograms of manager operations, kept across sessions.
+    
+    Running totals live in metrics.json and are written out as a Prometheus
+    textfile that node_exporter's textfile collector can scrape. The app,
+    the CLI and the daemon may run at once, so each flush adds only this
+    process's increments since the last one to the totals on disk, under a
+    lock file. When a
+    session ends, its own summary (count, p50, p95, max per series) is
+    appended to sessions.jsonl, which is rotated past max_bytes. The Stats
+    panel reads trends from that file.
+    """
+    
+    PREFIX = 'video_manager_'
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+    
+    def __init__(self, state_dir, textfile_dir=None, max_bytes=1_000_000, flush_interval=10.0):
+        state_dir = Path(state_dir)
+        self.totals_file = state_dir / 'metrics.json'
+        self.lock_file = state_dir / 'metrics.lock'
+        self.sessions_file = state_dir / 'sessions.jsonl'
+        self.textfile = Path(textfile_dir or state_dir) / 'video_manager.prom'
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        try:
+            totals = json.loads(self.totals_file.read_text(encoding='utf-8'))
+            self.counters = totals['counters']
+            self.histograms = totals['histograms']
+        except (OSError, ValueError, KeyError, TypeError):
+            self.counters = {}
+            self.histograms = {}
+        self.pending_counters = {}      # increments not yet added to metrics.json
+        self.pending_histograms = {}
+        self.started = time.time()
+        self.session = {}               # series -> recent values of this session
+        self.session_counts = {}        # series -> increments in this session
+        self.dirty = False
+        self.last_flush = time.monotonic()
+    
+    @staticmethod
+    def series(name, labels):
+        """'name{a="b"}' (labels sorted), the key used everywhere below."""
+        if not labels:
+            return name
+        return name + '{' + ','.join(f'{key}="{value}"' for key, value in sorted(labels.items())) + '}'
+    
+    def increment(self, name, amount=1, **labels):
+        key = self.series(name, labels)
+        with self.lock:
+            for counters in (self.counters, self.pending_counters, self.session_counts):
+                counters[key] = counters.get(key, 0) + amount
+            self.dirty = True
+        self.maybe_flush()
+    
+    def observe(self, name, seconds, **labels):
+        key = self.series(name, labels)
+        with self.lock:
+            for histograms in (self.histograms, self.pending_histograms):
+                histogram = self.new_histogram(histograms, key)
+                for index, bound in enumerate(self.BUCKETS):
+                    if seconds <= bound:
+                        histogram['buckets'][index] += 1
+                histogram['sum'] += seconds
+                histogram['count'] += 1
+            self.session.setdefault(key, deque(maxlen=2000)).append(seconds)
+            self.dirty = True
+        self.maybe_flush()
+    
+    @contextmanager
+    def timed(self, name, **labels):
+        """Observe the block's duration; an exception counts a failure instead."""
+        started = time.perf_counter()
+        try:
+            yield
+        except TaskCancelled:
+            raise
+        except Exception:
+            self.increment(name.replace('_seconds', '_failures_total'), **labels)
+            raise
+        self.observe(name, time.perf_counter() - started, **labels)
+    
+    def maybe_flush(self):
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+    
+    def new_histogram(self, histograms, key):
+        return histograms.setdefault(key, {'buckets': [0] * len(self.BUCKETS), 'sum': 0.0, 'count': 0})
+    
+    def merge(self, counters, histograms, extra_counters, extra_histograms):
+        """Add extra_counters/extra_histograms into counters/histograms in place."""
+        for key, value in extra_counters.items():
+            counters[key] = counters.get(key, 0) + value
+        for key, extra in extra_histograms.items():
+            histogram = self.new_histogram(histograms, key)
+            histogram['buckets'] = [a + b for a, b in zip(histogram['buckets'], extra['buckets'])]
+            histogram['sum'] += extra['sum']
+            histogram['count'] += extra['count']
+    
+    def flush(self):
+        """Add this process's increments to the totals on disk and rewrite the Prometheus textfile."""
+        with self.lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            self.last_flush = time.monotonic()
+            counters, self.pending_counters = self.pending_counters, {}
+            histograms, self.pending_histograms = self.pending_histograms, {}
+        saved = False
+        try:
+            with file_lock(self.lock_file):
+                # Other processes may have flushed since we last read the totals
+                try:
+                    totals = json.loads(self.totals_file.read_text(encoding='utf-8'))
+                    merged = {'counters': totals['counters'], 'histograms': totals['histograms']}
+                except (OSError, ValueError, KeyError, TypeError):
+                    merged = {'counters': {}, 'histograms': {}}
+                self.merge(merged['counters'], merged['histograms'], counters, histograms)
+                self.write_atomic(self.totals_file, json.dumps(merged))
+                saved = True
+                with self.lock:
+                    # Increments made during this flush are still pending; count them too
+                    self.counters, self.histograms = merged['counters'], merged['histograms']
+                    self.merge(self.counters, self.histograms, self.pending_counters, self.pending_histograms)
+                    text = self.prometheus_text()
+                self.write_atomic(self.textfile, text)
+        except OSError:
+            if not saved:
+                # Keep the increments for the next flush
+                with self.lock:
+                    self.merge(self.pending_counters, self.pending_histograms, counters, histograms)
+                    self.dirty = True
+    
+    @staticmethod
+    def write_atomic(path, content):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(path.name + '.tmp')
+        temp.write_text(content, encoding='utf-8')
+        os.replace(temp, path)
+    
+    def prometheus_text(self):
+        lines = []
+        typed = set()
+        for key, value in sorted(self.counters.items()):
+            name = self.PREFIX + key.split('{', 1)[0]
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{self.PREFIX}{key} {value}")
+        for key, histogram in sorted(self.histograms.items()):
+            name, _, labels = key.partition('{')
+            name = self.PREFIX + name
+            labels = labels.rstrip('}')
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            prefix = labels + ',' if labels else ''
+            for bound, count in zip(self.BUCKETS, histogram['buckets']):
+                lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram["count"]}')
+            suffix = '{' + labels + '}' if labels else ''
+            lines.append(f"{name}_sum{suffix} {histogram['sum']:.6f}")
+            lines.append(f"{name}_count{suffix} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+    
+    def close(self):
+        """Flush the totals and append this session's summary (if it measured anything)."""
+        self.flush()
+        with self.lock:
+            if not (self.session or self.session_counts):
+                return
+            record = self.current()
+            self.session = {}
+            self.session_counts = {}
+        try:
+            if self.sessions_file.exists() and self.sessions_file.stat().st_size > self.max_bytes:
+                os.replace(self.sessions_file, self.sessions_file.with_name(self.sessions_file.name + '.1'))
+            with open(self.sessions_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError:
+            pass
+    
+    def current(self):
+        """Summary record of the session so far, in the sessions.jsonl format."""
+        summary = {}
+        for key, values in list(self.session.items()):
+            values = sorted(values)
+            summary[key] = {
+                'count': len(values),
+                'p50': round(values[len(values) // 2], 4),
+                'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))], 4),
+                'max': round(values[-1], 4),
+            }
+        return {'started': round(self.started, 3), 'ended': round(time.time(), 3),
+                'histograms': summary, 'counters': dict(self.session_counts)}
+    
+    def sessions(self, limit=20):
+        """The last `limit` session summaries, oldest first."""
+        records = []
+        for path in (self.sessions_file.with_name(self.sessions_file.name + '.1'), self.sessions_file):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            continue
+            except OSError:
+                continue
+        return records[-limit:]
+    
+    def trends(self, limit=20):
+        """Per-series trends over the last `limit` sessions (the running one included if it measured anything).
+        
+        Returns (sessions, histogram rows, counter rows): each histogram row is
+        (series, [p50 of each session that recorded it], latest summary); each counter row
+        is (series, [count per session]).
+        """
+        sessions = self.sessions(limit)
+        if self.session or self.session_counts:
+            sessions = (sessions + [self.current()])[-limit:]
+        histograms = []
+        for key in sorted({key for record in sessions for key in record['histograms']}):
+            values = [record['histograms'][key]['p50'] for record in sessions if key in record['histograms']]
+            histograms.append((key, values, next(record['histograms'][key] for record in reversed(sessions)
+                                                 if key in record['histograms'])))
+        counters = [
+            (key, [record['counters'].get(key, 0) for record in sessions])
+            for key in sorted({key for record in sessions for key in record['counters']})
+        ]
+        return sessions, histograms, counters
+
+
+def sparkline(values):
+    """Unicode block sparkline of a series of numbers."""
+    blocks = "▁▂▃▄▅▆▇█"
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    span = (high - low) or 1
+    return "".join(blocks[int((value - low) / span * (len(blocks) - 1))] for value in values)
+
+
+class StallWatchdog:
+    """Measure Tk event-loop lag and capture what the main thread was doing when it stalls.
+    
+    A heartbeat rescheduled with root.after records when it actually ran.
+    A background thread notices when the heartbeat is overdue by more than
+    threshold_ms and snapshots the main thread's stack at that moment, so
+    the trace names the handler that blocked the loop rather than the
+    idle loop after it returned.
+    """
+    
+    # Frames that only dispatch to the real handler
+    DISPATCH = ('<lambda>', 'drain', 'TaskRunner.drain')
+    
+    def __init__(self, root, tracer, interval_ms=100, threshold_ms=250):
+        self.root = root
+        self.tracer = tracer
+        self.interval_ms = interval_ms
+        self.threshold_ms = threshold_ms
+        self.main_ident = threading.get_ident()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.beats = 0
+        self.last_beat = time.perf_counter()
+        self.snapshot = None
+        self.after_id = None
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+    
+    def start(self):
+        self.last_beat = time.perf_counter()
+        self.after_id = self.root.after(self.interval_ms, self.beat)
+        threading.Thread(target=self.watch, name="stall-watchdog", daemon=True).start()
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.after_id is not None:
+            try:
+                self.root.after_cancel(self.after_id)
+            except tk.TclError:
+                pass
+    
+    def beat(self):
+        now = time.perf_counter()
+        lag_ms = (now - self.last_beat) * 1000 - self.interval_ms
+        with self.lock:
+            snapshot = self.snapshot if self.snapshot and self.snapshot[0] == self.beats else None
+            self.snapshot = None
+            self.beats += 1
+            self.last_beat = now
+        
+        if lag_ms >= self.threshold_ms:
+            self.stalls += 1
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            fields = {'lag_ms': round(lag_ms, 1)}
+            if snapshot:
+                fields.update(snapshot[1])
+            self.tracer.event('stall', **fields)
+        
+        if not self.stop_event.is_set():
+            self.after_id = self.root.after(self.interval_ms, self.beat)
+    
+    def watch(self):
+        while not self.stop_event.wait(self.interval_ms / 1000):
+            with self.lock:
+                overdue = (time.perf_counter() - self.last_beat) * 1000 - self.interval_ms
+                if overdue < self.threshold_ms or self.snapshot is not None:
+                    continue
+                beat = self.beats
+            frame = sys._current_frames().get(self.main_ident)
+            if frame is None:
+                continue
+            details = self.describe(frame)
+            details['captured_at_ms'] = round(overdue, 1)
+            with self.lock:
+                if self.beats == beat:
+                    self.snapshot = (beat, details)
+    
+    @classmethod
+    def describe(cls, frame):
+        """Return the running handler and a compact stack (outermost first) for a frame."""
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()
+        
+        def name(frame):
+            code = frame.f_code
+            return getattr(code, 'co_qualname', code.co_name)
+        
+        # The handler is the first frame after the last Tk callback dispatch
+        start = 0
+        for index, frame in enumerate(frames):
+            if Path(frame.f_code.co_filename).parent.name == 'tkinter' and frame.f_code.co_name in ('__call__', 'callit'):
+                start = index + 1
+        def where(frame):
+            return f"{Path(frame.f_code.co_filename).name}:{frame.f_lineno} {name(frame)}"
+        
+        handler = next((name(frame) for frame in frames[start:] if name(frame) not in cls.DISPATCH), None)
+        if handler is None and start < len(frames):
+            handler = where(frames[start])
+        return {'handler': handler, 'stack': [where(frame) for frame in frames[-20:]]}
+
+
+def find_repo_root(cached=None):
+    """Find the git repository root directory."""
+    # A root remembered from the last launch only needs one stat to validate
+    if cached and (Path(cached) / '.git').exists():
+        return Path(cached)
+    
+    # Start from the script's directory or executable location
+    start_path = app_start_path()
+    
+    # Search for .git folder
+    current = start_path
+    while current != current.parent:
+        if (current / '.git').exists():
+            return current
+        current = current.parent
+    
+    # Fallback to parent of start_path
+    return start_path.parent
+
+
+def run_git(repo_root, args, tracer=None, **subprocess_kwargs):
+    """Run a git command in repo_root and return the CompletedProcess."""
+    # Security: shell=False to prevent command injection
+    try:
+        with (tracer or TRACER).span('git', args=args[:3], cwd=str(repo_root)) as span:
+            result = subprocess.run(
+                ['git'] + args,
+                cwd=str(repo_root),
+                capture_output=True,
+                text=True,
+                shell=False,
+                **subprocess_kwargs
+            )
+            span['returncode'] = result.returncode
+        return result
+    except FileNotFoundError:
+        # Fallback if git is not found (though ensure_tools checks it)
+        return subprocess.CompletedProcess(args, 1, "", "Git executable not found")
+
+
+def git_progress(line):
+    """Parse a `git --progress` line such as 'Receiving objects:  45% (450/1000)'."""
+    match = re.match(r'(?:remote: )?([A-Z][A-Za-z ]+):\s+(\d+)%', line)
+    if match:
+        return match.group(1), int(match.group(2)) / 100
+    return None
+
+
+class NpmProgress:
+    """Turn `npm --loglevel=http` output into (label, fraction) updates.
+    
+    npm prints no percentage when it is not on a terminal, so progress is
+    the number of package tarballs fetched (or found in the cache) against
+    the package count in package-lock.json.
+    """
+    
+    def __init__(self, action, lockfile):
+        self.action = action
+        self.fetched = 0
+        try:
+            packages = json.loads(Path(lockfile).read_text(encoding='utf-8')).get('packages', {})
+            self.total = max(1, len(packages) - 1)   # the '' entry is the project itself
+        except (OSError, ValueError, AttributeError):
+            self.total = None
+    
+    def __call__(self, line):
+        if 'http fetch' not in line or '.tgz' not in line:
+            return None
+        self.fetched += 1
+        if self.total is None:
+            return f"npm {self.action}: {self.fetched} packages", None
+        # The lockfile count is an estimate; never claim to be done before exit
+        return f"npm {self.action}: {self.fetched}/{self.total} packages", min(0.99, self.fetched / self.total)
+
+
+def run_streaming(args, cwd, task=None, progress=None, parse=None, log_dir=None, tail_lines=200,
+                  tracer=None, **subprocess_kwargs):
+    """Run a command, reading its output as it arrives; return a CompletedProcess.
+    
+    Output lines that parse(line) recognises as progress are passed on to
+    progress(label, fraction) instead of being kept. The other lines are
+    kept only as a bounded tail: stdout holds the last tail_lines, and on
+    failure stderr holds the last 20. The full output goes to a spooled
+    temporary file that stays in memory while small. When the command
+    fails it is saved to log_dir and its path is set as `log_file`.
+    """
+    import tempfile
+    tail = deque(maxlen=tail_lines)
+    name = Path(args[0]).stem.lower()
+    label = f"{name} {args[1]}" if len(args) > 1 else name
+    
+    def pump(stream, spool):
+        partial = b''
+        shown = None
+        while True:
+            chunk = stream.read1(65536)
+            if not chunk:
+                break
+            spool.write(chunk)
+            # Progress meters redraw with \r; treat it as a line break
+            lines = (partial + chunk).replace(b'\r\n', b'\n').replace(b'\r', b'\n').split(b'\n')
+            partial = lines.pop()
+            for raw in lines:
+                line = raw.decode('utf-8', 'replace').rstrip()
+                update = parse(line) if parse and line else None
+                if update is None:
+                    if line:
+                        tail.append(line)
+                    continue
+                # Only pass on visible changes (whole percents or a new stage)
+                key = (update[0], None if update[1] is None else int(update[1] * 100))
+                if progress and key != shown:
+                    shown = key
+                    progress(*update)
+        if partial.strip():
+            tail.append(partial.decode('utf-8', 'replace').rstrip())
+    
+    with (tracer or TRACER).span(name, args=args[1:3]) as span, \
+            tempfile.SpooledTemporaryFile(max_size=1_000_000) as spool:
+        if progress:
+            progress(label, None)
+        try:
+            process = subprocess.Popen(
+                args,
+                cwd=str(cwd),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                shell=False,
+                **subprocess_kwargs
+            )
+        except FileNotFoundError:
+            if progress:
+                progress(None, None)
+            return subprocess.CompletedProcess(args, 1, "", f"{args[0]} executable not found")
+        
+        reader = threading.Thread(target=pump, args=(process.stdout, spool), name=f"{name}-output", daemon=True)
+        reader.start()
+        try:
+            # Block on the process itself; a cancellable task wakes every 50ms to check
+            while True:
+                try:
+                    process.wait(timeout=0.05 if task else None)
+                    break
+                except subprocess.TimeoutExpired:
+                    task.check()
+        except BaseException:
+            # Children of the command (npm's scripts, git's remote helpers) hold the
+            # output pipe too, so the reader below only finishes once they are gone
+            kill_tree(process.pid, process)
+            raise
+        finally:
+            reader.join()
+            process.stdout.close()
+            if progress:
+                progress(None, None)
+        span['returncode'] = process.returncode
+        
+        result = subprocess.CompletedProcess(args, process.returncode, "\n".join(tail), "")
+        result.log_file = None
+        if process.returncode != 0:
+            result.stderr = "\n".join(list(tail)[-20:])
+            if log_dir is not None:
+                try:
+                    log_dir = Path(log_dir)
+                    log_dir.mkdir(parents=True, exist_ok=True)
+                    log_file = log_dir / f"{name}-{args[1] if len(args) > 1 else 'run'}-{time.strftime('%Y%m%d-%H%M%S')}.log"
+                    spool.seek(0)
+                    with open(log_file, 'wb') as f:
+                        shutil.copyfileobj(spool, f)
+                    result.log_file = log_file
+                    result.stderr += f"\nFull log: {log_file}"
+                except OSError:
+                    pass
+        return result
+
+
+def benchmark_update_check(repo_root, iterations=20):
+    """Print the local cost of one update check: git subprocesses vs in-process reader.
+    
+    Network steps (ls-remote/fetch) are excluded; this times resolving HEAD
+    and its upstream plus the ahead/behind count.
+    """
+    def run(args):
+        return run_git(repo_root, args)
+    
+    reader = open_git_reader(repo_root)
+    checkers = [('git subprocess', UpdateChecker(run, os.devnull))]
+    if reader:
+        checkers.append(('in-process', UpdateChecker(run, os.devnull, reader=reader)))
+    else:
+        print("In-process reader unavailable for this repository; only timing git.")
+    
+    for label, checker in checkers:
+        timings = []
+        result = None
+        for _ in range(iterations):
+            started = time.perf_counter()
+            refs = checker.read_refs()
+            if refs and refs[4]:
+                result = checker.count(refs[4])
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        print(
+            f"{label:>15}: median {timings[len(timings) // 2]:.2f} ms, "
+            f"min {timings[0]:.2f} ms, max {timings[-1]:.2f} ms  -> {result}"
+        )
+
+
+def get_subprocess_kwargs(hide_window=False):
+    """Return Windows-only subprocess kwargs; no-op on other OSes."""
+    if os.name != 'nt':
+        return {}
+    
+    kwargs = {
+        "creationflags": subprocess.CREATE_NO_WINDOW
+    }
+    
+    if hide_window:
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        startupinfo.wShowWindow = subprocess.SW_HIDE
+        kwargs["startupinfo"] = startupinfo
+    
+    return kwargs
+
+
+def pid_alive(pid):
+    """Return True if a process with this PID exists."""
+    if os.name == 'nt':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+            return code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # An exited process nobody has reaped yet still answers signal 0
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            return f.read().rsplit(b')', 1)[1].split()[0] != b'Z'
+    except (OSError, IndexError):
+        return True
+
+
+def child_pids(pid):
+    """PIDs of every descendant of pid (POSIX; empty where the table cannot be read)."""
+    parents = {}
+    if os.path.isdir('/proc'):
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat', 'rb') as f:
+                    # The command name may contain spaces; ppid follows its closing paren
+                    fields = f.read().rsplit(b')', 1)[1].split()
+                parents.setdefault(int(fields[1]), []).append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    else:
+        try:
+            output = subprocess.run(['ps', '-A', '-o', 'pid=,ppid='], capture_output=True, text=True).stdout
+        except OSError:
+            return []
+        for line in output.splitlines():
+            try:
+                child, parent = map(int, line.split())
+            except ValueError:
+                continue
+            parents.setdefault(parent, []).append(child)
+    found = []
+    stack = [pid]
+    while stack:
+        for child in parents.get(stack.pop(), ()):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def kill_tree(pid, process=None, timeout=5.0):
+    """Terminate pid and all of its descendants; return True if none needed a hard kill.
+    
+    Servers are started as process-group leaders, so the group is signalled
+    as well as each descendant found up front (one that started its own
+    session would escape the group). `process` (our Popen) is reaped while
+    waiting, so its zombie does not count as alive.
+    """
+    if os.name == 'nt':
+        # taskkill /T walks the tree; a windowless node ignores a polite close, so it has to be /F
+        subprocess.run(['taskkill', '/PID', str(pid), '/T', '/F'],
+                       capture_output=True, **get_subprocess_kwargs(hide_window=True))
+        pids = [pid]
+    else:
+        import signal
+        pids = [pid] + child_pids(pid)
+        send_signal_tree(pid, pids, signal.SIGTERM)
+    
+    def alive(member):
+        if process is not None and member == process.pid:
+            return process.poll() is None
+        return pid_alive(member)
+    
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        pids = [member for member in pids if alive(member)]
+        if not pids:
+            return True
+        time.sleep(0.02)
+    if os.name == 'nt':
+        return False
+    send_signal_tree(pid, pids, signal.SIGKILL)
+    if process is not None:
+        try:
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+    return False
+
+
+def send_signal_tree(leader, pids, signum):
+    try:
+        if os.getpgid(leader) == leader:
+            os.killpg(leader, signum)
+    except OSError:
+        pass
+    for member in pids:
+        try:
+            os.kill(member, signum)
+        except OSError:
+            pass
+
+
+def port_owner(port):
+    """PID of the process listening on a local TCP port, or None if free or unknown."""
+    if os.name == 'nt':
+        try:
+            output = subprocess.run(['netstat', '-ano', '-p', 'TCP'], capture_output=True, text=True,
+                                    **get_subprocess_kwargs(hide_window=True)).stdout
+            output += subprocess.run(['netstat', '-ano', '-p', 'TCPv6'], capture_output=True, text=True,
+                                     **get_subprocess_kwargs(hide_window=True)).stdout
+        except OSError:
+            return None
+        for line in output.splitlines():
+            fields = line.split()
+            if len(fields) == 5 and fields[3] == 'LISTENING' and fields[1].rsplit(':', 1)[-1] == str(port):
+                return int(fields[4])
+        return None
+    
+    if not os.path.isdir('/proc'):
+        try:
+            output = subprocess.run(['lsof', '-nP', f'-iTCP:{port}', '-sTCP:LISTEN', '-t'],
+                                    capture_output=True, text=True).stdout.split()
+        except OSError:
+            return None
+        return int(output[0]) if output else None
+    
+    inodes = set()
+    for table in ('/proc/net/tcp', '/proc/net/tcp6'):
+        try:
+            with open(table) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    if fields[3] == '0A' and int(fields[1].rsplit(':', 1)[1], 16) == port:
+                        inodes.add(f'socket:[{fields[9]}]')
+        except (OSError, StopIteration, IndexError, ValueError):
+            continue
+    if not inodes:
+        return None
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            for fd in os.listdir(f'/proc/{entry}/fd'):
+                if os.readlink(f'/proc/{entry}/fd/{fd}') in inodes:
+                    return int(entry)
+        except OSError:
+            continue
+    return None
+
+
+def process_command_line(pid):
+    """Command line of a process as one string (with its working directory where /proc has it).
+    
+    None where it cannot be read (Windows).
+    """
+    if os.name == 'nt':
+        return None
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            command = f.read().replace(b'\0', b' ').decode('utf-8', 'replace').strip()
+        # Empty while a just-forked child is still exec'ing
+        if not command:
+            return None
+        try:
+            command += f" (in {os.readlink(f'/proc/{pid}/cwd')})"
+        except OSError:
+            pass
+        return command
+    except OSError:
+        pass
+    try:
+        return subprocess.run(['ps', '-o', 'command=', '-p', str(pid)],
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def process_start_time(pid):
+    """When a process started, as an opaque string that only needs to compare equal.
+    
+    A PID reused by a later process gets a different value. None where it
+    cannot be read.
+    """
+    if os.name == 'nt':
+        import ctypes
+        from ctypes import wintypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return None
+        try:
+            created, exited, kernel, user = (wintypes.FILETIME() for _ in range(4))
+            if not kernel32.GetProcessTimes(handle, ctypes.byref(created), ctypes.byref(exited),
+                                            ctypes.byref(kernel), ctypes.byref(user)):
+                return None
+            return f"filetime:{(created.dwHighDateTime << 32) | created.dwLowDateTime}"
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            # Field 22 (starttime, in clock ticks since boot); the name may contain spaces
+            return 'ticks:' + f.read().rsplit(b')', 1)[1].split()[19].decode()
+    except (OSError, IndexError):
+        pass
+    try:
+        started = subprocess.run(['ps', '-o', 'lstart=', '-p', str(pid)],
+                                 capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+    return f"lstart:{started}" if started else None
+
+
+def free_port():
+    """Return a TCP port on 127.0.0.1 that is free right now."""
+    import socket
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def sample_process(pid):
+    """Return (rss_bytes, cpu_seconds) for a process, or None if unavailable.
+    
+    Uses psutil when installed, otherwise /proc (Linux only).
+    """
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            times = process.cpu_times()
+            return process.memory_info().rss, times.user + times.system
+        except psutil.Error:
+            return None
+    
+    try:
+        with open(f"/proc/{pid}/stat", 'rb') as f:
+            # Fields after "(comm)" start at field 3 (state); utime/stime are 14/15
+            fields = f.read().rsplit(b')', 1)[1].split()
+        with open(f"/proc/{pid}/statm", 'rb') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    return resident_pages * os.sysconf('SC_PAGE_SIZE'), cpu_seconds
+
+
+class ServerSupervisor:
+    """Watch the core's server process: restart it when it dies and sample its resources.
+    
+    An exit the core did not ask for counts as a crash. Restarts back off
+    exponentially (1s, 2s, 4s... up to max_backoff); crash_limit crashes
+    within crash_window seconds is a crash loop and the supervisor gives up.
+    While the server runs, its RSS and CPU are sampled every sample_interval
+    seconds into `samples` and listeners are called after each sample or
+    state change.
+    """
+    
+    def __init__(self, core, sample_interval=5.0, history=720, restart=True,
+                 max_backoff=30.0, crash_limit=5, crash_window=60.0):
+        self.core = core
+        self.sample_interval = sample_interval
+        self.restart = restart
+        self.max_backoff = max_backoff
+        self.crash_limit = crash_limit
+        self.crash_window = crash_window
+        self.samples = deque(maxlen=history)   # (timestamp, rss_bytes, cpu_percent or None)
+        self.crashes = deque()
+        self.state = 'idle'                     # idle | running | restarting | crashloop
+        self.listeners = []
+        self.last_cpu = None
+        self.wake = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    def watch(self):
+        """Start (or wake) supervision of the core's server once it has answered /health."""
+        self.state = 'running'
+        self.last_cpu = None
+        if not (self.thread and self.thread.is_alive()):
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name="server-supervisor", daemon=True)
+            self.thread.start()
+        self.wake.set()
+    
+    def cancel(self):
+        """Forget the current server (it is being stopped on purpose)."""
+        self.state = 'idle'
+        self.notify()
+    
+    def stop(self):
+        self.stop_event.set()
+        self.wake.set()
+    
+    def notify(self):
+        for listener in list(self.listeners):
+            listener()
+    
+    def run(self):
+        while not self.stop_event.is_set():
+            process = self.core.server_process
+            if process is None or self.state != 'running':
+                self.wake.wait()
+                self.wake.clear()
+                continue
+            
+            try:
+                process.wait(timeout=self.sample_interval)
+            except subprocess.TimeoutExpired:
+                self.sample(process)
+                continue
+            self.handle_exit(process)
+    
+    def sample(self, process):
+        sample = sample_process(process.pid)
+        if sample is None:
+            return
+        rss, cpu_seconds = sample
+        now = time.monotonic()
+        percent = None
+        if self.last_cpu is not None:
+            elapsed = now - self.last_cpu[0]
+            if elapsed > 0:
+                percent = 100.0 * (cpu_seconds - self.last_cpu[1]) / elapsed
+        self.last_cpu = (now, cpu_seconds)
+        self.samples.append((time.time(), rss, percent))
+        self.notify()
+    
+    def handle_exit(self, process):
+        """Decide what to do about a server that exited."""
+        core = self.core
+        with core.lock:
+            if core.server_process is not process:
+                return  # stopped or replaced on purpose
+            core.server_process = None
+            core.clear_pid_file()
+        
+        code = process.returncode
+        core.server_log.append('app', f"--- server exited (code {code}) ---")
+        now = time.monotonic()
+        self.crashes.append(now)
+        while self.crashes and now - self.crashes[0] > self.crash_window:
+            self.crashes.popleft()
+        
+        if not self.restart:
+            self.state = 'idle'
+            core.report(f"Server exited unexpectedly (code {code}).", 'error')
+        elif len(self.crashes) >= self.crash_limit:
+            self.state = 'crashloop'
+            core.report(
+                f"Server crashed {len(self.crashes)} times in {self.crash_window:.0f}s; not restarting.", 'error'
+            )
+        else:
+            delay = min(2 ** (len(self.crashes) - 1), self.max_backoff)
+            self.state = 'restarting'
+            core.report(f"Server exited (code {code}); restarting in {delay:.0f}s...", 'warning')
+            self.notify()
+            if not self.stop_event.wait(delay):
+                self.restart_server()
+            return
+        self.notify()
+    
+    def restart_server(self):
+        core = self.core
+        with core.lock:
+            # Stopped during the backoff, or started again by someone else
+            if self.state != 'restarting' or core.server_pid():
+                return
+            started = time.perf_counter()
+            try:
+                process = core.spawn_server()
+            except Exception as e:
+                self.state = 'idle'
+                core.report(str(e), 'error')
+                self.notify()
+                return
+            # A restart that dies while starting counts towards the crash loop
+            self.watch()
+        
+        try:
+            elapsed = core.wait_for_server(process, started)
+        except Exception as e:
+            # An exit is picked up (and counted) by the watch loop
+            core.report(f"Restarted server is not healthy: {e}", 'warning')
+            return
+        core.report(f"Server restarted (PID {process.pid}) - healthy in {elapsed:.2f}s", 'success')
+
+
+class CachingProxy:
+    """In-memory caching reverse proxy on the public port with Node behind it.
+    
+    GET/HEAD responses for /videos and static files are cached with a
+    strong ETag (If-None-Match answers 304) and a gzip variant for
+    compressible types. POSTs to the editing endpoints clear the cache, as
+    does invalidate() after a git pull; entries also expire after ttl
+    seconds (0 = never) so files edited on disk are picked up.
+    """
+    
+    INVALIDATING_PATHS = ('/add-video', '/add-videos', '/delete-video', '/update-order')
+    UNCACHED_PATHS = ('/health',)
+    HOP_HEADERS = {'connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'te',
+                   'trailer', 'upgrade', 'proxy-authorization', 'proxy-authenticate'}
+    COMPRESSIBLE = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+    
+    def __init__(self, port, backend_port, max_bytes=32_000_000, ttl=300, tracer=None):
+        self.port = port
+        self.backend_port = backend_port
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.tracer = tracer or TRACER
+        self.entries = OrderedDict()   # key -> entry dict, least recently used first
+        self.size = 0
+        self.generation = 0
+        self.counters = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.server = None
+        self.thread = None
+    
+    def start(self):
+        """Bind the public port and serve in a background thread."""
+        if self.thread and self.thread.is_alive():
+            return
+        import http.server
+        proxy = self
+        
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_GET(self):
+                proxy.handle_read(self)
+            
+            def do_HEAD(self):
+                proxy.handle_read(self)
+            
+            def do_POST(self):
+                proxy.handle_write(self)
+            
+            def do_PUT(self):
+                proxy.handle_write(self)
+            
+            def do_DELETE(self):
+                proxy.handle_write(self)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        try:
+            self.server = http.server.ThreadingHTTPServer(('', self.port), Handler)
+        except OSError as e:
+            raise Exception(f"Cache proxy could not listen on port {self.port}: {e}")
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="cache-proxy", daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+    
+    def switch_backend(self, port):
+        """Send new requests to another Node instance (after a hot restart)."""
+        self.backend_port = port
+        self.invalidate()
+    
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.generation += 1
+            self.counters['invalidations'] += 1
+    
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self.entries)
+            stats['bytes'] = self.size
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else None
+        return stats
+    
+    # -- upstream -------------------------------------------------------------
+    
+    def forward(self, method, path, headers, body=None):
+        """Send one request to Node over this thread's keep-alive connection."""
+        import http.client
+        for attempt in range(2):
+            connection = getattr(self.local, 'connection', None)
+            if connection is not None and connection.port != self.backend_port:
+                self.drop_connection()
+                connection = None
+            reused = connection is not None
+            if not reused:
+                connection = http.client.HTTPConnection('127.0.0.1', self.backend_port, timeout=30)
+                self.local.connection = connection
+            try:
+                with self.tracer.span('http', method=method, url=path, upstream=True, reused=reused) as span:
+                    connection.request(method, path, body=body, headers=headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                    span['status'] = response.status
+                if response.will_close:
+                    self.drop_connection()
+                return response.status, response.reason, response.getheaders(), data
+            except (http.client.HTTPException, OSError):
+                self.drop_connection()
+                # Idempotent requests may retry once on a fresh connection
+                if not reused or method == 'POST':
+                    raise
+        raise OSError("upstream unavailable")
+    
+    def drop_connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
+    
+    def request_headers(self, handler, cacheable):
+        headers = {}
+        for name, value in handler.headers.items():
+            lower = name.lower()
+            if lower in self.HOP_HEADERS or lower == 'host':
+                continue
+            # Cached fetches must return the full, uncompressed body
+            if cacheable and lower in ('accept-encoding', 'if-none-match', 'if-modified-since', 'range'):
+                continue
+            headers[name] = value
+        headers['Host'] = f"127.0.0.1:{self.backend_port}"
+        return headers
+    
+    # -- handlers ---------------------------------------------------------------
+    
+    def handle_read(self, handler):
+        import http.client
+        path = handler.path
+        if path.split('?', 1)[0] in self.UNCACHED_PATHS or 'range' in (k.lower() for k in handler.headers):
+            self.relay(handler, handler.command, self.request_headers(handler, False))
+            return
+        
+        entry = self.lookup(path)
+        if entry is None:
+            with self.lock:
+                generation = self.generation
+                self.counters['misses'] += 1
+            try:
+                status, reason, headers, body = self.forward('GET', path, self.request_headers(handler, True))
+            except (http.client.HTTPException, OSError) as e:
+                self.send_error_response(handler, e)
+                return
+            if status != 200:
+                self.send(handler, status, reason, self.response_headers(headers), body)
+                return
+            entry = self.store(path, headers, body, generation)
+        else:
+            with self.lock:
+                self.counters['hits'] += 1
+        
+        if entry['etag'] in (handler.headers.get('If-None-Match') or ''):
+            with self.lock:
+                self.counters['not_modified'] += 1
+            self.send(handler, 304, 'Not Modified', [('ETag', entry['etag'])], b'')
+            return
+        
+        headers = list(entry['headers']) + [('ETag', entry['etag']), ('Vary', 'Accept-Encoding')]
+        body = entry['body']
+        if entry['gzip'] is not None and 'gzip' in (handler.headers.get('Accept-Encoding') or ''):
+            headers.append(('Content-Encoding', 'gzip'))
+            body = entry['gzip']
+        self.send(handler, 200, 'OK', headers, body)
+    
+    def handle_write(self, handler):
+        path = handler.path.split('?', 1)[0]
+        length = int(handler.headers.get('Content-Length') or 0)
+        body = handler.rfile.read(length) if length else None
+        status = self.relay(handler, handler.command, self.request_headers(handler, False), body)
+        if path in self.INVALIDATING_PATHS and status is not None:
+            self.invalidate()
+    
+    def relay(self, handler, method, headers, body=None):
+        """Pass a request straight through; return the upstream status."""
+        import http.client
+        try:
+            status, reason, response_headers, data = self.forward(method, handler.path, headers, body)
+        except (http.client.HTTPException, OSError) as e:
+            self.send_error_response(handler, e)
+            return None
+        self.send(handler, status, reason, self.response_headers(response_headers), data)
+        return status
+    
+    def lookup(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if self.ttl and time.monotonic() - entry['stored'] > self.ttl:
+                self.evict(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry
+    
+    def store(self, key, headers, body, generation):
+        import hashlib
+        import gzip
+        headers = [(name, value) for name, value in self.response_headers(headers)
+                   if name.lower() not in ('etag', 'content-encoding', 'vary', 'last-modified')]
+        content_type = next((value for name, value in headers if name.lower() == 'content-type'), '')
+        compressed = None
+        if len(body) > 1024 and content_type.startswith(self.COMPRESSIBLE):
+            compressed = gzip.compress(body, compresslevel=6, mtime=0)
+            if len(compressed) >= len(body):
+                compressed = None
+        entry = {
+            'headers': headers,
+            'body': body,
+            'gzip': compressed,
+            'etag': '"' + hashlib.sha1(body).hexdigest() + '"',
+            'stored': time.monotonic(),
+            'size': len(body) + len(compressed or b''),
+        }
+        with self.lock:
+            # Skip entries fetched before an invalidation; they may be stale
+            if generation == self.generation and entry['size'] <= self.max_bytes // 4:
+                self.evict(key)
+                self.entries[key] = entry
+                self.size += entry['size']
+                while self.size > self.max_bytes:
+                    self.evict(next(iter(self.entries)))
+        return entry
+    
+    def evict(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry['size']
+    
+    def response_headers(self, headers):
+        return [(name, value) for name, value in headers
+                if name.lower() not in self.HOP_HEADERS and name.lower() not in ('content-length', 'date')]
+    
+    def send(self, handler, status, reason, headers, body):
+        handler.send_response(status, reason)
+        for name, value in headers:
+            handler.send_header(name, value)
+        if status != 304:
+            handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        if handler.command != 'HEAD' and status != 304:
+            handler.wfile.write(body)
+    
+    def send_error_response(self, handler, error):
+        body = json.dumps({'success': False, 'error': f"Server unavailable: {error}"}).encode()
+        self.send(handler, 502, 'Bad Gateway', [('Content-Type', 'application/json')], body)
+
+
+class WorkIndexError(Exception):
+    pass
+
+
+class WorkIndex:
+    """In-memory index of the video arrays in pr/src/components/Work.tsx.
+    
+    Mirrors the Node server's parser (projects, reels, entertainmentReels)
+    without running Node. refresh() re-parses only when the file's mtime
+    or size changed, so callers can refresh on every read.
+    """
+    
+    # Work.tsx array -> category name used by the server API
+    SECTIONS = (('projects', 'longform'), ('reels', 'shortform'), ('entertainmentReels', 'entertainment'))
+    
+    def __init__(self, work_file):
+        self.work_file = Path(work_file)
+        self.signature = None
+        self.sections = {}     # array name -> [item dict]
+        self.by_embed = {}     # embedId -> [item dict]
+        self.error = None
+        self.lock = threading.Lock()
+    
+    def refresh(self):
+        """Re-parse if the file changed; return True when the index (or its error) changed."""
+        with self.lock:
+            try:
+                stat = self.work_file.stat()
+            except OSError:
+                changed = self.error != "Work.tsx not found"
+                self.signature = None
+                self.sections, self.by_embed = {}, {}
+                self.error = "Work.tsx not found"
+                return changed
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature == self.signature:
+                return False
+            
+            try:
+                sections = self.parse(self.work_file.read_text(encoding='utf-8'))
+            except (OSError, UnicodeDecodeError, WorkIndexError) as e:
+                self.error = str(e)
+                self.signature = signature
+                return True
+            
+            by_embed = {}
+            for items in sections.values():
+                for item in items:
+                    by_embed.setdefault(item.get('embedId'), []).append(item)
+            self.sections, self.by_embed = sections, by_embed
+            self.signature = signature
+            self.error = None
+            return True
+    
+    def parse(self, text):
+        sections = {}
+        for name, _ in self.SECTIONS:
+            items = parse_js_array(text, name)
+            for order, item in enumerate(items):
+                item['section'] = name
+                item['order'] = order
+            sections[name] = items
+        return sections
+    
+    def counts(self):
+        self.refresh()
+        return {name: len(self.sections.get(name, [])) for name, _ in self.SECTIONS}
+    
+    def lookup(self, embed_id):
+        """All entries (in any section) with this embedId."""
+        self.refresh()
+        return list(self.by_embed.get(embed_id, []))
+    
+    def duplicates(self):
+        """embedIds that appear more than once, with their entries."""
+        self.refresh()
+        return {embed_id: items for embed_id, items in self.by_embed.items() if len(items) > 1}
+    
+    def summary(self):
+        """One-line catalogue description for the status panel."""
+        counts = self.counts()
+        if self.error:
+            return f"Catalogue: {self.error}"
+        total = sum(counts.values())
+        text = (f"Catalogue: {total} videos - {counts['projects']} long-form, "
+                f"{counts['reels']} short-form, {counts['entertainmentReels']} entertainment")
+        duplicates = len(self.duplicates())
+        if duplicates:
+            text += f", {duplicates} duplicate{'s' if duplicates > 1 else ''}"
+        return text
+
+
+def parse_js_array(text, name):
+    """Parse `const <name> = [ {...}, ... ]` from TypeScript source.
+    
+    Only the literal subset Work.tsx uses is supported: objects with
+    identifier or quoted keys and string (including template literals
+    without ${}), number, boolean and null values.
+    """
+    match = re.search(r'(?<![\w])const ' + name + r'\s*=\s*\[', text)
+    if not match:
+        raise WorkIndexError(f"Could not find {name} array in Work.tsx")
+    
+    pos = match.end()
+    items = []
+    
+    def skip(pos):
+        while pos < len(text):
+            if text[pos].isspace() or text[pos] == ',':
+                pos += 1
+            elif text.startswith('//', pos):
+                end = text.find('\n', pos)
+                pos = len(text) if end < 0 else end
+            elif text.startswith('/*', pos):
+                end = text.find('*/', pos)
+                pos = len(text) if end < 0 else end + 2
+            else:
+                break
+        return pos
+    
+    def read_string(pos):
+        quote = text[pos]
+        chars = []
+        pos += 1
+        while pos < len(text):
+            char = text[pos]
+            if char == '\\':
+                escaped = text[pos + 1:pos + 2]
+                chars.append({'n': '\n', 't': '\t', 'r': '\r'}.get(escaped, escaped))
+                pos += 2
+            elif char == quote:
+                return ''.join(chars), pos + 1
+            elif quote == '`' and text.startswith('${', pos):
+                raise WorkIndexError(f"Template expressions are not supported in {name}")
+            else:
+                chars.append(char)
+                pos += 1
+        raise WorkIndexError(f"Unterminated string in {name} array")
+    
+    while True:
+        pos = skip(pos)
+        if pos >= len(text):
+            raise WorkIndexError(f"Could not find closing bracket for {name} array in Work.tsx")
+        if text[pos] == ']':
+            return items
+        if text[pos] != '{':
+            raise WorkIndexError(f"Unexpected {text[pos]!r} in {name} array")
+        
+        pos += 1
+        item = {}
+        while True:
+            pos = skip(pos)
+            if pos < len(text) and text[pos] == '}':
+                pos += 1
+                break
+            if pos < len(text) and text[pos] in '"\'':
+                key, pos = read_string(pos)
+            else:
+                key_match = re.compile(r'[A-Za-z_$][\w$]*').match(text, pos)
+                if not key_match:
+                    raise WorkIndexError(f"Unexpected {text[pos:pos + 1]!r} in {name} array")
+                key, pos = key_match.group(), key_match.end()
+            pos = skip(pos)
+            if text[pos:pos + 1] != ':':
+                raise WorkIndexError(f"Expected ':' after {key} in {name} array")
+            pos = skip(pos + 1)
+            
+            if text[pos:pos + 1] in ('"', "'", '`'):
+                value, pos = read_string(pos)
+            else:
+                value_match = re.compile(r'-?\d+(?:\.\d+)?|true|false|null').match(text, pos)
+                if not value_match:
+                    raise WorkIndexError(f"Unsupported value for {key} in {name} array")
+                literal = value_match.group()
+                value = {'true': True, 'false': False, 'null': None}.get(literal)
+                if literal not in ('true', 'false', 'null'):
+                    value = float(literal) if '.' in literal else int(literal)
+                pos = value_match.end()
+            item[key] = value
+        items.append(item)
+
+
+class BulkImporter:
+    """Validate a CSV/JSON manifest of videos and add them through the server.
+    
+    Items go to the server's batch endpoint (/add-videos), which rewrites
+    Work.tsx once and commits once per batch. Servers without it get one
+    /add-video request per item, spread over `concurrency` keep-alive
+    connections.
+    """
+    
+    CATEGORIES = ('longform', 'shortform', 'entertainment')
+    FIELDS = ('category', 'title', 'videoUrl', 'embedId', 'videoCategory', 'thumbnail')
+    ALIASES = {'video_url': 'videoUrl', 'url': 'videoUrl', 'embed_id': 'embedId',
+               'video_category': 'videoCategory', 'project_type': 'videoCategory'}
+    
+    def __init__(self, base_url, work_index, concurrency=4, batch_size=250, timeout=120, tracer=None):
+        from urllib.parse import urlsplit
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.work_index = work_index
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.tracer = tracer or TRACER
+        self.local = threading.local()
+    
+    def load(self, path):
+        """Read manifest rows from a .csv or .json file."""
+        path = Path(path)
+        try:
+            if path.suffix.lower() == '.csv':
+                import csv
+                with open(path, newline='', encoding='utf-8-sig') as f:
+                    rows = list(csv.DictReader(f))
+            else:
+                data = json.loads(path.read_text(encoding='utf-8-sig'))
+                rows = data.get('videos') if isinstance(data, dict) else data
+        except (OSError, ValueError) as e:
+            raise Exception(f"Could not read {path.name}: {e}")
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise Exception(f"{path.name} must contain a list of video objects")
+        return [self.normalize(row) for row in rows]
+    
+    def normalize(self, row):
+        video = {}
+        for key, value in row.items():
+            if key is None:
+                continue
+            key = self.ALIASES.get(key.strip(), key.strip())
+            if key in self.FIELDS and value not in (None, ''):
+                video[key] = str(value).strip()
+        # Streamable links carry the embed id as their last path segment
+        if 'embedId' not in video and 'streamable.com/' in video.get('videoUrl', ''):
+            video['embedId'] = video['videoUrl'].rstrip('/').rsplit('/', 1)[-1]
+        return video
+    
+    def validate(self, videos):
+        """Split videos into (valid, errors); errors are {row, embedId, error} dicts."""
+        self.work_index.refresh()
+        valid, errors, seen = [], [], {}
+        for row, video in enumerate(videos, start=1):
+            embed_id = video.get('embedId')
+            missing = [field for field in ('category', 'title', 'videoUrl', 'embedId') if not video.get(field)]
+            if missing:
+                error = f"missing {', '.join(missing)}"
+            elif video['category'] not in self.CATEGORIES:
+                error = f"category must be one of {', '.join(self.CATEGORIES)}"
+            elif video['category'] == 'longform' and not video.get('videoCategory'):
+                error = "videoCategory (project type) required for longform"
+            elif embed_id in seen:
+                error = f"duplicate of row {seen[embed_id]}"
+            elif self.work_index.lookup(embed_id):
+                existing = self.work_index.lookup(embed_id)[0]
+                error = f"already in Work.tsx ({existing['section']}[{existing['order']}])"
+            else:
+                error = None
+            
+            if error:
+                errors.append({'row': row, 'embedId': embed_id, 'error': error})
+            else:
+                seen[embed_id] = row
+                valid.append((row, video))
+        return valid, errors
+    
+    def post(self, path, payload):
+        """POST JSON over this thread's keep-alive connection; return (status, body)."""
+        import http.client
+        body = json.dumps(payload).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        for attempt in range(2):
+            connection = getattr(self.local, 'connection', None)
+            reused = connection is not None
+            if not reused:
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                self.local.connection = connection
+            try:
+                with self.tracer.span('http', method='POST', url=path, bytes=len(body), reused=reused) as span:
+                    connection.request('POST', path, body=body, headers=headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                    span['status'] = response.status
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                self.local.connection = None
+                # Only a stale reused connection is worth one retry
+                if not reused:
+                    raise
+                continue
+            if response.will_close:
+                connection.close()
+                self.local.connection = None
+            try:
+                return response.status, json.loads(data or b'{}')
+            except ValueError:
+                return response.status, {'error': data[:200].decode('utf-8', 'replace')}
+        raise OSError("server connection failed")
+    
+    def run(self, valid, task=None, progress=None):
+        """Submit validated (row, video) pairs; return per-item result dicts."""
+        results = []
+        
+        def report(done):
+            if progress:
+                progress(done, len(valid))
+        
+        start = 0
+        while start < len(valid):
+            if task:
+                task.check()
+            chunk = valid[start:start + self.batch_size]
+            try:
+                status, body = self.post('/add-videos', {'videos': [video for _, video in chunk]})
+            except OSError as e:
+                # Keep what earlier batches added; this and every later row were not imported
+                results.extend({'row': row, 'embedId': video['embedId'], 'success': False, 'error': str(e),
+                                'push_error': None} for row, video in valid[start:])
+                report(len(valid))
+                break
+            if status == 404 and start == 0:
+                return self.run_individually(valid, task, report)
+            item_results = body.get('results') or []
+            # fileUpdated: Work.tsx was written but the commit or push failed
+            written = status == 200 or bool(body.get('fileUpdated'))
+            push_error = None if status == 200 else body.get('error') or f"HTTP {status}"
+            for i, (row, video) in enumerate(chunk):
+                item = item_results[i] if i < len(item_results) and item_results[i] else {}
+                success = bool(item.get('success')) and written
+                error = None if success else item.get('error') or body.get('error') or f"HTTP {status}"
+                results.append({'row': row, 'embedId': video['embedId'], 'success': success, 'error': error,
+                                'push_error': push_error if success else None})
+            start += len(chunk)
+            report(start)
+        return results
+    
+    def run_individually(self, valid, task, report):
+        from concurrent.futures import ThreadPoolExecutor
+        done = [0]
+        lock = threading.Lock()
+        
+        def add(pair):
+            row, video = pair
+            if task and task.cancel_event.is_set():
+                return {'row': row, 'embedId': video['embedId'], 'success': False, 'error': 'cancelled'}
+            try:
+                status, body = self.post('/add-video', video)
+                success = status == 200 and body.get('success') or bool(body.get('fileUpdated'))
+                error = None if success else body.get('error') or f"HTTP {status}"
+                push_error = (body.get('error') or f"HTTP {status}") if success and status != 200 else None
+            except OSError as e:
+                success, error, push_error = False, str(e), None
+            with lock:
+                done[0] += 1
+                report(done[0])
+            return {'row': row, 'embedId': video['embedId'], 'success': bool(success), 'error': error,
+                    'push_error': push_error}
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="import") as pool:
+            return list(pool.map(add, valid))
+
+
+class ManagerCore:
+    """Server, git and npm operations with no UI attached.
+    
+    The Tk app, the command line and the daemon all drive the same core.
+    Progress goes to reporter(message, level), where level is one of
+    'info', 'success', 'warning', 'error', 'muted' or None, and git/npm
+    progress to on_progress(label, fraction or None); label None means
+    the operation finished. Long-running methods accept an optional Task
+    so the Tk app can cancel them.
+    """
+    
+    # Files (under pr/) whose change needs a server restart. Work.tsx and
+    # the static pages are read from disk per request, so a pull only has
+    # to clear the proxy cache for them.
+    RELOAD_FILES = ('video-manager-server.js', 'package.json', 'package-lock.json')
+    
+    def __init__(self, repo_root=None, app_state=None, reporter=None, on_progress=None, port=None):
+        self.app_state = app_state or AppState()
+        self.reporter = reporter
+        self.on_progress = on_progress
+        self.tools = dict(self.app_state.get('tools', {}))
+        if repo_root:
+            self.repo_root = Path(repo_root).resolve()
+        else:
+            self.repo_root = find_repo_root(self.app_state.get('repo_root'))
+            self.app_state.set('repo_root', str(self.repo_root))
+        self.pr_path = self.repo_root / 'pr'
+        self.state_dir = self.repo_root / STATE_DIR_NAME
+        self.pid_file = self.state_dir / 'server.pid'
+        self.settings = load_settings(self.state_dir)
+        self.port = port or Workspace().port_for(self.repo_root)
+        self.server_url = f"http://localhost:{self.port}/manage-videos.html"
+        self.health_url = f"http://localhost:{self.port}/health"
+        self.tracer = Tracer()
+        if self.settings['trace']:
+            self.tracer.open(self.state_dir / 'trace.jsonl', self.settings['trace_max_bytes'])
+        self.metrics = None
+        if self.settings['metrics']:
+            self.metrics = Metrics(self.state_dir, textfile_dir=self.settings['metrics_textfile_dir'] or None)
+        self.server_process = None
+        self.lock = threading.RLock()
+        
+        self.server_log = ServerLog(
+            max_lines=self.settings['log_buffer_lines'],
+            log_file=self.state_dir / 'logs' / 'server.log' if self.settings['log_to_file'] else None,
+            max_bytes=self.settings['log_file_max_bytes'],
+            backup_count=self.settings['log_file_backups']
+        )
+        self.update_checker = UpdateChecker(
+            self.run_git_command, self.state_dir / 'update-check.json',
+            ttl=self.settings['update_check_ttl'],
+            reader=open_git_reader(self.repo_root)
+        )
+        self.dependencies = DependencyCache(
+            self.pr_path, self.state_dir,
+            get_subprocess_kwargs(hide_window=True),
+            tools=self.tools, tracer=self.tracer
+        )
+        self.supervisor = ServerSupervisor(
+            self,
+            sample_interval=self.settings['resource_interval'],
+            history=self.settings['resource_history'],
+            restart=self.settings['restart_on_crash'],
+            max_backoff=self.settings['restart_max_backoff'],
+            crash_limit=self.settings['crash_loop_limit'],
+            crash_window=self.settings['crash_loop_window']
+        )
+        self.build_cache = BuildCache(
+            self.pr_path, self.state_dir, self.dependencies,
+            get_subprocess_kwargs(hide_window=True), tracer=self.tracer
+        )
+        self.image_optimizer = ImageOptimizer(
+            self.pr_path / 'public', self.pr_path / 'dist', self.state_dir,
+            widths=self.settings['image_widths'],
+            quality=self.settings['image_quality'],
+            workers=self.settings['image_workers']
+        )
+        self.compressor = DistCompressor(
+            self.pr_path / 'dist', self.state_dir,
+            min_bytes=self.settings['precompress_min_bytes'],
+            brotli=self.settings['precompress_brotli']
+        )
+        self.work_index = WorkIndex(self.pr_path / 'src' / 'components' / 'Work.tsx')
+        self.changes = ChangeDetector(
+            self.repo_root, self.state_dir / 'worktree-hashes.json',
+            prefix=f"{self.pr_path.name}/",
+            debounce=self.settings['change_debounce_ms'] / 1000,
+            run_git=self.run_git_command
+        )
+        self.proxy = None
+        if self.settings['proxy_enabled']:
+            self.proxy = CachingProxy(
+                # Sites on other ports shift the backend port by the same amount
+                self.port, self.settings['proxy_backend_port'] + self.port - SERVER_PORT,
+                max_bytes=self.settings['proxy_cache_max_bytes'],
+                ttl=self.settings['proxy_cache_ttl'],
+                tracer=self.tracer
+            )
+    
+    def report(self, message, level=None):
+        if self.reporter:
+            self.reporter(message, level)
+    
+    def progress(self, label, fraction=None):
+        if self.on_progress:
+            self.on_progress(label, fraction)
+    
+    # -- tools and dependencies --------------------------------------------
+    
+    def resolve_tool(self, name):
+        """Return the full path of a tool, reusing the path cached from a previous launch."""
+        cached = self.tools.get(name)
+        if cached and os.path.isfile(cached):
+            return cached
+        path = shutil.which(name)
+        if path:
+            self.tools[name] = path
+            self.app_state.set('tools', dict(self.tools))
+        return path
+    
+    def check_command(self, name):
+        """Check if a command is available."""
+        return self.resolve_tool(name) is not None
+    
+    def ensure_tools(self):
+        """Verify required tools are installed."""
+        if not self.resolve_tool('node'):
+            raise Exception("Node.js is not installed. Please install Node.js 18+ and restart.")
+        if not self.resolve_tool('npm'):
+            raise Exception("npm is not available. Please verify Node.js installation.")
+        if not self.resolve_tool('git'):
+            raise Exception("Git is not installed. Please install Git and restart.")
+    
+    def startup_checks(self, task=None, on_step=None):
+        """Resolve tools, probe the server, check updates, dependencies and the catalogue at once.
+        
+        Independent steps overlap, so the git fetch, the health probe of an
+        already running server and the npm state check cost the slowest of
+        them rather than their sum. Returns StepGraph.run() results.
+        
+        Only reads state, so the Sites panel, `sites` and the benchmark can
+        call it freely; freeing a port held by a stale server is left to
+        reclaim_port (on app launch and in start_server).
+        """
+        def server():
+            pid = self.server_pid()
+            return pid, bool(pid and self.probe_health(timeout=1))
+        
+        def dependencies(node, npm):
+            action, reason, state = self.dependencies.plan()
+            return action, reason
+        
+        graph = StepGraph(tracer=self.tracer)
+        graph.add('node', lambda: self.resolve_tool('node'))
+        graph.add('npm', lambda: self.resolve_tool('npm'))
+        graph.add('git', lambda: self.resolve_tool('git'))
+        graph.add('server', server)
+        graph.add('catalogue', self.work_index.refresh)
+        graph.add('updates', lambda node, npm, git: self.check_updates(task), after=('node', 'npm', 'git'))
+        graph.add('dependencies', dependencies, after=('node', 'npm'))
+        return graph.run(task, on_step)
+    
+    def ensure_dependencies(self, task=None):
+        """Ensure npm dependencies match the lockfile; return the reason shown."""
+        action, reason, state = self.dependencies.plan()
+        
+        if action is None:
+            message = f"npm skipped: {reason}"
+            self.report(message, 'muted')
+            if self.metrics:
+                self.metrics.increment('npm_install_skipped_total')
+            return message
+        
+        self.report(f"Running npm {action} ({reason})...", 'info')
+        with self.timed('npm_install_seconds', action=action):
+            self.dependencies.install(action, state, task, self.progress)
+        return f"npm {action}: {reason}"
+    
+    def timed(self, name, **labels):
+        """Metrics.timed when metrics are enabled, otherwise a no-op context."""
+        from contextlib import nullcontext
+        return self.metrics.timed(name, **labels) if self.metrics else nullcontext()
+    
+    def run_git_command(self, args):
+        """Run a git command and return result."""
+        started = time.perf_counter()
+        result = run_git(self.repo_root, args, tracer=self.tracer, **get_subprocess_kwargs(hide_window=True))
+        if self.metrics:
+            if result.returncode == 0:
+                self.metrics.observe('git_command_seconds', time.perf_counter() - started, command=args[0])
+            else:
+                self.metrics.increment('git_command_failures_total', command=args[0])
+        return result
+    
+    def stream_git_command(self, args, task=None):
+        """Run a long git command (pull/fetch) with --progress, streaming its output."""
+        started = time.perf_counter()
+        result = run_streaming(
+            [self.tools.get('git', 'git')] + args + ['--progress'], self.repo_root, task, self.progress,
+            parse=git_progress, log_dir=self.state_dir / 'logs', tracer=self.tracer,
+            **get_subprocess_kwargs(hide_window=True)
+        )
+        # A failed pull or fetch returns normally with a non-zero code
+        if self.metrics:
+            if result.returncode == 0:
+                self.metrics.observe('git_command_seconds', time.perf_counter() - started, command=args[0])
+            else:
+                self.metrics.increment('git_command_failures_total', command=args[0])
+        return result
+    
+    # -- server -------------------------------------------------------------
+    
+    def server_pid(self):
+        """PID of the running server, whether started here or by another instance.
+        
+        A recorded PID counts only while it is alive and still has the
+        command line and start time written with it; otherwise the PID has
+        been reused by another program and the stale file is removed.
+        """
+        process = self.server_process
+        if process is not None and process.poll() is None:
+            return process.pid
+        try:
+            record = json.loads(self.pid_file.read_text(encoding='utf-8'))
+            pid = record['pid']
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if pid_alive(pid) and self.is_recorded_server(pid, record):
+            return pid
+        self.clear_pid_file()
+        return None
+    
+    @staticmethod
+    def is_recorded_server(pid, record):
+        """True if pid is still the process server.pid was written for.
+        
+        Windows has no command line to read here, so there the creation time
+        alone decides. A process that can be checked neither way is not
+        trusted: stopping it would kill whatever now has the PID.
+        """
+        command = process_command_line(pid)
+        started = process_start_time(pid)
+        if command is None and started is None:
+            return False
+        if command is not None:
+            # Files written before the command line was recorded only have the PID
+            if command != (record.get('command') or command) or 'video-manager-server.js' not in command:
+                return False
+        if started is not None:
+            if record.get('process_started') is None:
+                return command is not None
+            if started != record['process_started']:
+                return False
+        return True
+    
+    def write_pid_file(self, pid):
+        try:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+            record = {'pid': pid, 'started_at': time.time(), 'command': process_command_line(pid),
+                      'process_started': process_start_time(pid)}
+            self.pid_file.write_text(json.dumps(record), encoding='utf-8')
+        except OSError:
+            pass
+    
+    def clear_pid_file(self):
+        try:
+            self.pid_file.unlink()
+        except OSError:
+            pass
+    
+    def spawn_server(self, detach=False, port=None):
+        """Launch node (on port, if given); detached servers log to a file and outlive this process."""
+        kwargs = get_subprocess_kwargs(hide_window=True)
+        # Its own process group, so stopping it reaches anything node spawns too
+        if os.name == 'nt':
+            kwargs['creationflags'] = kwargs.get('creationflags', 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs['start_new_session'] = True
+        if detach:
+            log_dir = self.state_dir / 'logs'
+            log_dir.mkdir(parents=True, exist_ok=True)
+            output = open(log_dir / 'server.out', 'ab')
+            stdout = stderr = output
+        else:
+            output = None
+            stdout = stderr = subprocess.PIPE
+        
+        # Behind the proxy Node moves to the backend port; detached servers
+        # outlive this process (and its proxy) so they keep the public port
+        if port is None and self.proxy is not None and not detach:
+            self.proxy.start()
+            port = self.proxy.backend_port
+        env = dict(os.environ, PORT=str(port or self.port))
+        
+        try:
+            process = subprocess.Popen(
+                [self.tools.get('node', 'node'), 'video-manager-server.js'],
+                cwd=str(self.pr_path),
+                stdin=subprocess.DEVNULL,
+                stdout=stdout,
+                stderr=stderr,
+                env=env,
+                **kwargs
+            )
+        except Exception as e:
+            raise Exception(f"Failed to start server: {e}")
+        finally:
+            if output:
+                output.close()
+        
+        self.server_process = process
+        self.write_pid_file(process.pid)
+        if not detach:
+            self.server_log.attach(process)
+        return process
+    
+    def server_port(self, detach=False):
+        """Port node listens on: the proxy's backend port while the proxy fronts it."""
+        if self.proxy is not None and not detach:
+            return self.proxy.backend_port
+        return self.port
+    
+    def start_server(self, task=None, on_spawned=None, detach=False):
+        """Install dependencies, launch the server and wait for /health.
+        
+        The supervisor only takes the server over once it is healthy; a
+        server that dies while starting is a failed start, not a crash.
+        Returns (process, seconds from start to healthy).
+        """
+        with self.lock:
+            pid = self.server_pid()
+            if pid:
+                raise Exception(f"Server is already running (PID {pid}).")
+            
+            started = time.perf_counter()
+            try:
+                self.ensure_tools()
+                self.ensure_dependencies(task)
+                if task:
+                    task.check()
+                
+                reclaimed = self.reclaim_port(self.server_port(detach))
+                if reclaimed:
+                    if reclaimed[1] == 'error':
+                        raise Exception(reclaimed[0])
+                    self.report(*reclaimed)
+                    pid = self.server_pid()
+                    if pid:
+                        raise Exception(f"Server is already running (PID {pid}).")
+                process = self.spawn_server(detach=detach)
+            except BaseException:
+                self.supervisor.cancel()
+                raise
+            if on_spawned:
+                on_spawned(process)
+        
+        try:
+            with self.timed('server_start_seconds'):
+                elapsed = self.wait_for_server(process, started, task)
+        except BaseException as e:
+            self.supervisor.cancel()
+            if isinstance(e, TaskCancelled):
+                self.terminate_process(process)
+            with self.lock:
+                if self.server_process is process and process.poll() is not None:
+                    self.server_process = None
+                    self.clear_pid_file()
+            raise
+        if not detach:
+            self.supervisor.watch()
+        return process, elapsed
+    
+    def wait_for_server(self, process, started, task=None, timeout=SERVER_START_TIMEOUT, url=None):
+        """Poll the health endpoint until it answers; return seconds since start."""
+        import urllib.request
+        import urllib.error
+        url = url or self.health_url
+        delay = PROBE_INITIAL_DELAY
+        while True:
+            if process.poll() is not None:
+                self.server_log.wait_drained()
+                detail = self.server_log.last_line('err')
+                message = f"Server exited during startup (code {process.returncode})"
+                if detail:
+                    message += f":\n{detail}"
+                raise Exception(message)
+            
+            try:
+                with self.tracer.span('http', method='GET', url=url) as span, \
+                        urllib.request.urlopen(url, timeout=1) as response:
+                    span['status'] = response.status
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, OSError):
+                pass
+            
+            if time.perf_counter() - started > timeout:
+                raise Exception(f"Server did not respond on /health within {timeout:.0f}s")
+            
+            if task:
+                task.sleep(delay)
+            else:
+                time.sleep(delay)
+            delay = min(delay * 1.5, PROBE_MAX_DELAY)
+    
+    def stop_server(self):
+        """Stop the server (ours or one recorded in the PID file); return (message, level)."""
+        with self.lock:
+            self.supervisor.cancel()
+            process = self.server_process
+            if process is not None and process.poll() is None:
+                result = self.terminate_process(process)
+            else:
+                pid = self.server_pid()
+                if pid is None:
+                    self.server_process = None
+                    return "Server is not running.", 'muted'
+                result = self.terminate_pid(pid)
+            
+            self.server_process = None
+            self.clear_pid_file()
+            if self.proxy is not None:
+                self.proxy.stop()
+            return result
+    
+    def hot_restart(self, task=None):
+        """Load updated server files into our running server; return (message, level).
+        
+        Behind the proxy the new instance starts on a spare port and must
+        pass /health before the proxy is pointed at it and the old process is
+        stopped, so the public port never goes dark. When Node holds the port
+        itself it is a plain stop and start, and the port is down in between.
+        Returns None when no server is running.
+        """
+        with self.lock:
+            old = self.server_process
+            if old is None or old.poll() is not None:
+                if self.server_pid():
+                    return "Server files changed; restart the server to load them.", 'warning'
+                return None
+            # Without the proxy Node holds the public port, so nothing else can take it over
+            direct = self.proxy is None
+            if direct:
+                self.supervisor.cancel()
+                self.terminate_process(old)
+                self.server_process = None
+                self.clear_pid_file()
+                stopped = time.perf_counter()
+        
+        if direct:
+            try:
+                process, _ = self.start_server(task)
+            except TaskCancelled:
+                raise
+            except Exception as e:
+                return f"Server stopped to load the update, but it failed to start again: {e}", 'error'
+            return (f"Server restarted (PID {process.pid}) - port {self.port} was down for "
+                    f"{time.perf_counter() - stopped:.2f}s"), 'success'
+        
+        with self.lock:
+            port = free_port()
+            started = time.perf_counter()
+            # Neither instance is supervised until one of them is the server for good
+            self.supervisor.cancel()
+            process = self.spawn_server(port=port)
+        
+        try:
+            elapsed = self.wait_for_server(process, started, task, url=f"http://127.0.0.1:{port}/health")
+        except BaseException as e:
+            with self.lock:
+                if self.server_process is process:
+                    self.server_process = old
+                    self.write_pid_file(old.pid)
+                    if old.poll() is None:
+                        self.supervisor.watch()
+            self.terminate_process(process)
+            if isinstance(e, TaskCancelled):
+                raise
+            return f"Kept the running server; the updated one failed to start: {e}", 'error'
+        
+        with self.lock:
+            if self.server_process is not process:
+                return None  # stopped while the new instance was starting
+            self.proxy.switch_backend(port)
+            self.supervisor.watch()
+        
+        # Requests already sent to the old instance get a moment to finish
+        time.sleep(0.5)
+        self.terminate_process(old)
+        return f"Server reloaded (PID {process.pid}) - healthy in {elapsed:.2f}s", 'success'
+    
+    def reload_for_changes(self, old_head, task=None):
+        """Hot-restart the server if a pull since old_head touched server files; return (message, level) or None."""
+        if not (old_head and self.settings['reload_on_update']):
+            return None
+        diff = self.run_git_command(['diff', '--name-only', old_head, 'HEAD'])
+        if diff.returncode != 0:
+            return None
+        prefix = self.pr_path.relative_to(self.repo_root).as_posix() + '/'
+        server_files = {prefix + name for name in self.RELOAD_FILES}
+        if not server_files.intersection(diff.stdout.splitlines()):
+            return None
+        return self.hot_restart(task)
+    
+    def terminate_process(self, process):
+        """Terminate a server process and its children; return a (status message, level) pair."""
+        if kill_tree(process.pid, process):
+            return "Server stopped.", 'muted'
+        return "Server force stopped.", 'warning'
+    
+    def terminate_pid(self, pid):
+        """Terminate a server we only know by PID (started by another instance)."""
+        if kill_tree(pid):
+            return "Server stopped.", 'muted'
+        return "Server force stopped.", 'warning'
+    
+    def reclaim_port(self, port=None):
+        """Free a port held by a server no instance is tracking; return (message, level) or None.
+        
+        A crashed manager can leave node (or a child of it) holding the port
+        with no PID file pointing at it. If the holder answers /health like
+        our server on the public port it is adopted (recorded in the PID
+        file); a hung or backend-port one is stopped with its process tree.
+        Other programs are left alone and reported at level 'error'.
+        """
+        import urllib.request
+        port = port or self.port
+        owner = port_owner(port)
+        if owner is None or owner == os.getpid():
+            return None
+        recorded = self.server_pid()
+        if recorded is not None and (owner == recorded or owner in child_pids(recorded)):
+            return None
+        
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                healthy = json.loads(response.read()).get('message') == 'Video Manager Server is running!'
+        except Exception:
+            healthy = False
+        command = process_command_line(owner) or ''
+        if not healthy and 'video-manager-server.js' not in command and f"(in {self.pr_path})" not in command:
+            return f"Port {port} is in use by another program (PID {owner}).", 'error'
+        if recorded is None and healthy and port == self.port and self.proxy is None:
+            self.write_pid_file(owner)
+            return f"Found a running server on port {port} (PID {owner}).", 'info'
+        kill_tree(owner, timeout=2.0)
+        return f"Reclaimed port {port} from a stale server (PID {owner}).", 'warning'
+    
+    def probe_health(self, timeout=2):
+        """Single /health request: True if OK, False on a bad status, None if unreachable."""
+        import urllib.request
+        started = time.perf_counter()
+        with self.tracer.span('http', method='GET', url=self.health_url) as span:
+            try:
+                with urllib.request.urlopen(self.health_url, timeout=timeout) as response:
+                    span['status'] = response.status
+                    healthy = response.status == 200
+            except Exception as e:
+                span['error'] = str(e)[:300]
+                healthy = None
+        if self.metrics:
+            if healthy:
+                self.metrics.observe('health_check_seconds', time.perf_counter() - started, path='/health')
+            else:
+                self.metrics.increment('health_check_failures_total', path='/health')
+        return healthy
+    
+    # -- updates ------------------------------------------------------------
+    
+    def check_updates(self, task=None, force=False):
+        """Compare HEAD with its upstream; return (state, message, behind)."""
+        self.ensure_tools()
+        
+        git_folder = self.repo_root / '.git'
+        if not git_folder.exists():
+            return 'na', 'Not a git repository', 0
+        
+        result = self.update_checker.check(task, force=force)
+        self.app_state.set('last_update', [result[0], result[1]])
+        return result
+    
+    def head_sha(self):
+        result = self.run_git_command(['rev-parse', 'HEAD'])
+        return result.stdout.strip() if result.returncode == 0 else None
+    
+    def local_changes(self, allow_dirty=False):
+        """Tracked files under pr/ with uncommitted changes; raise unless allow_dirty if there are any.
+        
+        Checked before a pull so one that git would refuse fails before the fetch.
+        """
+        dirty = self.changes.scan()
+        if dirty and not allow_dirty:
+            listing = "\n".join(f"  {path}" for path in dirty[:10])
+            if len(dirty) > 10:
+                listing += f"\n  ... and {len(dirty) - 10} more"
+            raise Exception(
+                f"{len(dirty)} file(s) have uncommitted changes and may block the pull:\n{listing}\n"
+                "Commit or stash them first, or pull anyway (update --force)."
+            )
+        return dirty
+    
+    def apply_update(self, task=None, allow_dirty=False):
+        """Pull updates, refresh npm dependencies and reload the server if needed; return a summary."""
+        self.local_changes(allow_dirty)
+        old_head = self.head_sha()
+        result = self.stream_git_command(['pull'], task)
+        if result.returncode != 0:
+            raise Exception(f"Failed to pull updates:\n{result.stderr}")
+        self.update_checker.invalidate()
+        if self.proxy is not None:
+            self.proxy.invalidate()
+        if task:
+            task.check()
+        
+        # Update npm dependencies if the lockfile changed
+        message = self.ensure_dependencies(task)
+        reload = self.reload_for_changes(old_head, task)
+        if reload:
+            message += f"; {reload[0]}"
+        return message
+    
+    def update_from_github(self, task=None, allow_dirty=False):
+        """Fetch and pull everything; return git's output."""
+        self.ensure_tools()
+        
+        git_folder = self.repo_root / '.git'
+        if not git_folder.exists():
+            raise Exception("This folder is not a git repository.")
+        self.local_changes(allow_dirty)
+        
+        # Fetch all
+        fetch = self.stream_git_command(['fetch', '--all', '--prune'], task)
+        if fetch.returncode != 0:
+            raise Exception(f"git fetch failed:\n{fetch.stderr}")
+        if task:
+            task.check()
+        
+        # Pull
+        old_head = self.head_sha()
+        pull = self.stream_git_command(['pull'], task)
+        if pull.returncode != 0:
+            raise Exception(f"git pull failed:\n{pull.stderr}")
+        self.update_checker.invalidate()
+        if self.proxy is not None:
+            self.proxy.invalidate()
+        output = pull.stdout.strip()
+        reload = self.reload_for_changes(old_head, task)
+        if reload:
+            output += f"\n\n{reload[0]}"
+        return output
+    
+    def import_videos(self, path, task=None, dry_run=False):
+        """Validate a CSV/JSON manifest and add its videos through the server; return a summary."""
+        importer = BulkImporter(
+            self.server_url, self.work_index,
+            concurrency=self.settings['import_concurrency'],
+            batch_size=self.settings['import_batch_size'],
+            tracer=self.tracer
+        )
+        videos = importer.load(path)
+        valid, failed = importer.validate(videos)
+        self.report(f"Import: {len(valid)} of {len(videos)} rows are valid", 'info')
+        
+        results = []
+        if valid and not dry_run:
+            if not self.probe_health():
+                raise Exception("Start the server before importing videos.")
+            results = importer.run(
+                valid, task,
+                progress=lambda done, total: self.report(f"Importing videos... {done}/{total}", 'info')
+            )
+        added = sum(1 for result in results if result['success'])
+        failed = sorted(failed + [result for result in results if not result['success']], key=lambda item: item['row'])
+        # Added to Work.tsx, but the server's commit or push failed afterwards
+        unpushed = [result for result in results if result['success'] and result.get('push_error')]
+        
+        summary = {
+            'source': str(path),
+            'rows': len(videos),
+            'valid': len(valid),
+            'added': added,
+            'failed': failed,
+            'not_pushed': len(unpushed),
+            'push_error': unpushed[0]['push_error'] if unpushed else None,
+            'dry_run': dry_run,
+        }
+        report_file = self.state_dir / 'imports' / time.strftime('import-%Y%m%d-%H%M%S.json')
+        try:
+            report_file.parent.mkdir(parents=True, exist_ok=True)
+            report_file.write_text(json.dumps(summary, indent=2), encoding='utf-8')
+            summary['report'] = str(report_file)
+        except OSError:
+            summary['report'] = None
+        
+        if dry_run:
+            summary['message'] = f"Dry run: {len(valid)} of {len(videos)} videos would be imported, {len(failed)} rejected."
+        else:
+            summary['message'] = f"Imported {added} of {len(videos)} videos, {len(failed)} failed."
+            if unpushed:
+                summary['message'] += (f"\n{len(unpushed)} of them are in Work.tsx but were not pushed: "
+                                       f"{summary['push_error']}")
+        return summary
+    
+    def optimize_images(self, task=None):
+        """Recompress public/ images into dist; return the per-file report and a summary line."""
+        report = self.image_optimizer.run(task)
+        saved = sum(item['saved'] for item in report)
+        original = sum(item['original'] for item in report) or 1
+        processed = sum(1 for item in report if not item['cached'])
+        variants = sum(len(item['variants']) for item in report)
+        message = (f"Images: {len(report)} optimised ({processed} processed, {len(report) - processed} cached), "
+                   f"saved {saved / 1048576:.2f} MB ({saved / original:.0%}), {variants} variants")
+        return {'images': report, 'saved': saved, 'message': message}
+    
+    def compress_dist(self, task=None):
+        """Write precompressed siblings for dist text assets; return the report and a summary line."""
+        report = self.compressor.run(task)
+        original = sum(item['original'] for item in report)
+        compressed = sum(item['gzip'] or item['original'] for item in report)
+        fresh = sum(1 for item in report if not item['cached'])
+        ratio = compressed / original if original else 1
+        message = (f"Precompressed {len(report)} assets ({fresh} new, {len(report) - fresh} cached): "
+                   f"{original / 1024:.0f} KB -> {compressed / 1024:.0f} KB gzip ({ratio:.0%})")
+        return {'assets': report, 'message': message}
+    
+    def post_build(self, summary, task=None):
+        """Run the asset stages on a fresh or reused dist and fold them into the build summary."""
+        stages = (('optimize_images', 'images', self.optimize_images),
+                  ('precompress', 'assets', self.compress_dist))
+        for setting, key, stage in stages:
+            if not self.settings[setting]:
+                continue
+            try:
+                result = stage(task)
+            except TaskCancelled:
+                raise
+            except Exception as e:
+                summary['message'] += f"\n{e}"
+                continue
+            summary[key] = result[key]
+            summary['message'] += f"\n{result['message']}"
+        return summary
+    
+    def build_site(self, task=None, force=False):
+        """Run the Vite build unless its inputs are unchanged; return a summary."""
+        self.ensure_tools()
+        needed, reason, input_hash = self.build_cache.plan(force)
+        if not needed:
+            message = f"Build skipped: {reason}; reusing dist."
+            return self.post_build({'skipped': True, 'reason': reason, 'input_hash': input_hash, 'message': message}, task)
+        
+        self.ensure_dependencies(task)
+        if task:
+            task.check()
+        self.report(f"Building site ({reason})...", 'info')
+        previous = [record['duration'] for record in self.build_cache.history(10)]
+        record = self.build_cache.build(self.tools.get('npm', 'npm'), input_hash, task)
+        
+        message = (f"Built in {record['duration']:.1f}s, dist {record['output_bytes'] / 1048576:.2f} MB "
+                   f"in {record['output_files']} files")
+        if previous:
+            previous.sort()
+            median = previous[len(previous) // 2]
+            message += f" (median of last {len(previous)}: {median:.1f}s)"
+        return self.post_build(dict(record, skipped=False, reason=reason, message=message), task)
+    
+    def status(self):
+        """Snapshot of server and update state for the CLI and daemon."""
+        pid = self.server_pid()
+        samples = self.supervisor.samples
+        return {
+            'repo_root': str(self.repo_root),
+            'server_running': pid is not None,
+            'pid': pid,
+            'healthy': bool(pid and self.probe_health(timeout=1)),
+            'supervisor': self.supervisor.state,
+            'rss_bytes': samples[-1][1] if samples else None,
+            'cpu_percent': samples[-1][2] if samples else None,
+            'proxy': self.proxy.stats() if self.proxy is not None else None,
+            'catalogue': self.work_index.counts(),
+            'duplicates': len(self.work_index.duplicates()),
+            'last_update': self.app_state.get('last_update'),
+            'local_changes': self.changes.scan(),
+        }
+    
+    def close(self, stop_server=True):
+        """Stop our own server (if asked) and release resources."""
+        self.supervisor.stop()
+        self.changes.stop()
+        if stop_server and self.server_process is not None and self.server_process.poll() is None:
+            self.stop_server()
+        if self.proxy is not None:
+            self.proxy.stop()
+        if self.metrics:
+            self.metrics.close()
+        self.server_log.close()
+
+
+def run_core_command(core, command, args=None):
+    """Execute one CLI/daemon command against a core; return a JSON-able dict."""
+    args = args or {}
+    if command == 'status':
+        return core.status()
+    if command == 'check':
+        state, message, behind = core.check_updates(force=bool(args.get('force')))
+        return {'state': state, 'message': message, 'behind': behind}
+    if command == 'update':
+        return {'message': f"Updates applied ({core.apply_update(allow_dirty=bool(args.get('force')))})"}
+    if command == 'serve':
+        process, elapsed = core.start_server(detach=bool(args.get('detach')))
+        return {'pid': process.pid, 'elapsed': round(elapsed, 3),
+                'message': f"Server running (PID {process.pid}) - healthy in {elapsed:.2f}s"}
+    if command == 'stop':
+        message, level = core.stop_server()
+        return {'message': message, 'level': level}
+    if command == 'build':
+        if args.get('history'):
+            records = core.build_cache.history()
+            return {'history': records, 'message': "\n".join(
+                f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(record['built_at']))}  "
+                f"{record['duration']:7.1f}s  {record['output_bytes'] / 1048576:6.2f} MB  {record['input_hash'][:10]}"
+                for record in records
+            ) or "No builds recorded yet."}
+        return core.build_site(force=bool(args.get('force')))
+    if command == 'images':
+        result = core.optimize_images()
+        result['message'] = "\n".join(
+            [f"{item['path']:<40} {item['original'] / 1024:8.0f} KB -> {item['optimized'] / 1024:6.0f} KB"
+             f"  saved {item['saved'] / 1024:6.0f} KB  {'cached' if item['cached'] else 'processed'}"
+             + (f"  +{', '.join(f'{w}w' for w in item['variants'])}" if item['variants'] else "")
+             for item in result['images']] + [result['message']]
+        )
+        return result
+    if command == 'compress':
+        result = core.compress_dist()
+        lines = []
+        for item in sorted(result['assets'], key=lambda item: -item['original']):
+            line = f"{item['path']:<48} {item['original'] / 1024:8.1f} KB"
+            for encoding in ('gzip', 'br'):
+                if encoding in item:
+                    size = item[encoding]
+                    line += f"  {encoding} {size / item['original']:4.0%}" if size else f"  {encoding}    -"
+            lines.append(line)
+        result['message'] = "\n".join(lines + [result['message']])
+        return result
+    if command == 'import':
+        return core.import_videos(args['manifest'], dry_run=bool(args.get('dry_run')))
+    if command == 'videos':
+        index = core.work_index
+        if args.get('find'):
+            items = index.lookup(args['find'])
+            if index.error:
+                raise Exception(index.error)
+            return {'embedId': args['find'], 'items': items,
+                    'message': "\n".join(f"{item['section']}[{item['order']}]: {item.get('title', '')}"
+                                         for item in items) or f"{args['find']} is not in Work.tsx"}
+        if args.get('duplicates'):
+            duplicates = index.duplicates()
+            if index.error:
+                raise Exception(index.error)
+            return {'duplicates': duplicates,
+                    'message': "\n".join(
+                        f"{embed_id}: " + ", ".join(f"{item['section']}[{item['order']}]" for item in items)
+                        for embed_id, items in duplicates.items()
+                    ) or "No duplicate embedIds."}
+        summary = index.summary()
+        if index.error:
+            raise Exception(index.error)
+        return {'counts': index.counts(), 'duplicates': len(index.duplicates()), 'message': summary}
+    if command == 'changes':
+        dirty = core.local_changes(allow_dirty=True)
+        return {'files': dirty, 'message': "\n".join(dirty) or "No uncommitted changes under pr/."}
+    if command == 'stats':
+        if core.metrics is None:
+            raise Exception('Metrics are disabled ("metrics": false in settings.json)')
+        return {'sessions': core.metrics.sessions(core.settings['metrics_sessions']),
+                'prometheus': str(core.metrics.textfile),
+                'message': "\n".join(line for line, tag in format_stats(core.metrics, core.settings['metrics_sessions']))}
+    if command == 'trace':
+        result = summarize_trace(core.state_dir / 'trace.jsonl')
+        lines = [f"{'span':<40}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+        for row in result['spans']:
+            lines.append(f"{row['name'][:39]:<40}{row['count']:>7}{row['p50']:>10.1f}{row['p95']:>10.1f}{row['max']:>10.1f}")
+        lines.append(f"\n{result['stalls']} UI stalls recorded")
+        for stall in result['worst_stalls']:
+            when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stall['ts']))
+            lines.append(f"  {when}  {stall['lag_ms']:8.0f} ms  {stall.get('handler') or 'unknown handler'}")
+        result['message'] = "\n".join(lines)
+        return result
+    raise Exception(f"Unknown command: {command}")
+
+
+class ManagerDaemon:
+    """Expose a ManagerCore to local clients over a loopback TCP socket.
+    
+    The protocol is one JSON object per line in each direction:
+    {"token": ..., "command": "check", "args": {...}} answered by
+    {"ok": true, "result": {...}} or {"ok": false, "error": "..."}.
+    A connection may carry any number of requests. The port and a random
+    token are published in <state_dir>/daemon.json so only users who can
+    read the repo's state folder can drive it.
+    """
+    
+    def __init__(self, core, port=0):
+        self.core = core
+        self.port = port
+        self.token = os.urandom(16).hex()
+        self.info_file = core.state_dir / 'daemon.json'
+        self.server = None
+    
+    def serve_forever(self):
+        import socketserver
+        daemon = self
+        
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    response = daemon.handle_line(line)
+                    self.wfile.write(json.dumps(response).encode() + b"\n")
+                    self.wfile.flush()
+                    if response.get('shutdown'):
+                        threading.Thread(target=daemon.server.shutdown, daemon=True).start()
+                        return
+        
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.core.state_dir.mkdir(parents=True, exist_ok=True)
+        self.info_file.write_text(json.dumps({
+            'port': self.port, 'pid': os.getpid(), 'token': self.token
+        }), encoding='utf-8')
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            try:
+                self.info_file.unlink()
+            except OSError:
+                pass
+            self.core.close()
+    
+    def handle_line(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {'ok': False, 'error': 'invalid JSON'}
+        if request.get('token') != self.token:
+            return {'ok': False, 'error': 'invalid token'}
+        
+        command = request.get('command')
+        if command == 'shutdown':
+            return {'ok': True, 'result': {'message': 'Daemon stopping.'}, 'shutdown': True}
+        try:
+            return {'ok': True, 'result': run_core_command(self.core, command, request.get('args'))}
+        except Exception as e:
+            return {'ok': False, 'error': str(e)}
+
+
+class DaemonClient:
+    """Talk to a running ManagerDaemon for a repository."""
+    
+    def __init__(self, state_dir, timeout=None):
+        import socket
+        info = json.loads((Path(state_dir) / 'daemon.json').read_text(encoding='utf-8'))
+        self.token = info['token']
+        self.sock = socket.create_connection(('127.0.0.1', info['port']), timeout=2)
+        self.sock.settimeout(timeout)
+        self.rfile = self.sock.makefile('rb')
+    
+    @classmethod
+    def connect(cls, state_dir, timeout=None):
+        """Return a client, or None when no daemon is running for this repo."""
+        try:
+            return cls(state_dir, timeout)
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def request(self, command, args=None):
+        message = {'token': self.token, 'command': command, 'args': args or {}}
+        self.sock.sendall(json.dumps(message).encode() + b"\n")
+        line = self.rfile.readline()
+        if not line:
+            raise ConnectionError("daemon closed the connection")
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise Exception(response.get('error', 'daemon error'))
+        return response['result']
+    
+    def close(self):
+        self.rfile.close()
+        self.sock.close()
+
+
+def build_parser():
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog='video_manager.py',
+        description=f"{APP_TITLE}. Run without a command to open the desktop app."
+    )
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print a phase-by-phase startup timing breakdown")
+    parser.add_argument('--benchmark-git', action='store_true',
+                        help="time an update check via git vs the in-process reader")
+    
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--repo', help="repository root (default: auto-detect)")
+    common.add_argument('--json', action='store_true', help="print machine-readable JSON")
+    common.add_argument('--no-daemon', action='store_true',
+                        help="run in this process even if a daemon is running")
+    
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    serve = commands.add_parser('serve', parents=[common], help="start the video server")
+    serve.add_argument('--detach', action='store_true',
+                       help="leave the server running in the background and exit")
+    commands.add_parser('stop', parents=[common], help="stop the video server")
+    commands.add_parser('status', parents=[common], help="show server and update status")
+    update = commands.add_parser('update', parents=[common], help="pull updates and refresh dependencies")
+    update.add_argument('--force', action='store_true', help="pull even with uncommitted changes under pr/")
+    commands.add_parser('changes', parents=[common], help="list tracked files under pr/ with uncommitted changes")
+    check = commands.add_parser('check', parents=[common], help="check for updates")
+    check.add_argument('--force', action='store_true', help="ignore the cached result")
+    videos = commands.add_parser('videos', parents=[common], help="show the Work.tsx video catalogue")
+    videos.add_argument('--find', metavar='EMBED_ID', help="show where an embedId is used")
+    videos.add_argument('--duplicates', action='store_true', help="list embedIds used more than once")
+    build = commands.add_parser('build', parents=[common], help="build pr/dist unless its inputs are unchanged")
+    build.add_argument('--force', action='store_true', help="build even if the inputs are unchanged")
+    build.add_argument('--history', action='store_true', help="list recent build times and sizes")
+    commands.add_parser('images', parents=[common], help="recompress public/ images into dist (needs Pillow)")
+    commands.add_parser('compress', parents=[common], help="write .gz/.br siblings for text assets in dist")
+    commands.add_parser('stats', parents=[common], help="show operation timing trends over recent sessions")
+    commands.add_parser('trace', parents=[common], help="summarise recorded git/npm/HTTP timings and UI stalls")
+    bulk = commands.add_parser('import', parents=[common], help="add videos from a CSV or JSON manifest")
+    bulk.add_argument('manifest', help="CSV with a header row, or a JSON list of video objects")
+    bulk.add_argument('--dry-run', action='store_true', help="validate only; do not add anything")
+    sites = commands.add_parser('sites', parents=[common], help="check every workspace site at once")
+    sites.add_argument('--add', metavar='REPO', help="add a repository to the workspace")
+    sites.add_argument('--port', type=int, help="port for the added site (default: next free)")
+    daemon = commands.add_parser('daemon', parents=[common], help="serve commands over a local socket")
+    daemon.add_argument('--port', type=int, default=0, help="TCP port on 127.0.0.1 (default: any free port)")
+    return parser
+
+
+def print_result(result, as_json):
+    if as_json:
+        print(json.dumps(result, indent=2))
+    elif 'message' in result:
+        print(result['message'])
+        failed = result.get('failed') or []
+        for item in failed[:20]:
+            print(f"  row {item['row']} ({item.get('embedId') or '-'}): {item['error']}")
+        if len(failed) > 20:
+            print(f"  ... and {len(failed) - 20} more")
+        if result.get('report'):
+            print(f"Report: {result['report']}")
+    else:
+        for key, value in result.items():
+            print(f"{key}: {value}")
+
+
+def run_cli(args):
+    """Run a headless command; return the process exit code."""
+    def reporter(message, level):
+        if not args.json:
+            print(message, file=sys.stderr)
+    
+    def on_progress(label, fraction):
+        # Redraw one line in place on a terminal; stay quiet in pipes and logs
+        if args.json or not sys.stderr.isatty():
+            return
+        text = "" if label is None else f"{label} {fraction:.0%}" if fraction is not None else f"{label}..."
+        print(f"\r{text:<60}", end="" if label is not None else "\r", file=sys.stderr, flush=True)
+    
+    repo_root = Path(args.repo) if args.repo else None
+    
+    if args.command == 'sites':
+        return run_sites(args, repo_root)
+    
+    if args.command == 'daemon':
+        core = ManagerCore(repo_root, reporter=reporter)
+        daemon = ManagerDaemon(core, port=args.port)
+        print(f"Daemon for {core.repo_root} listening on 127.0.0.1 "
+              f"(details in {daemon.info_file})", file=sys.stderr)
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+    
+    request_args = {
+        'force': getattr(args, 'force', False),
+        'detach': getattr(args, 'detach', False),
+        'find': getattr(args, 'find', None),
+        'duplicates': getattr(args, 'duplicates', False),
+        'manifest': str(Path(args.manifest).resolve()) if getattr(args, 'manifest', None) else None,
+        'dry_run': getattr(args, 'dry_run', False),
+        'history': getattr(args, 'history', False),
+    }
+    
+    # Prefer a running daemon: it keeps caches warm and owns the server
+    if not args.no_daemon:
+        state_dir = (repo_root or find_repo_root(AppState().get('repo_root'))) / STATE_DIR_NAME
+        client = DaemonClient.connect(state_dir)
+        if client:
+            try:
+                result = client.request(args.command, request_args)
+                print_result(result, args.json)
+                return 1 if result.get('failed') or result.get('push_error') else 0
+            except Exception as e:
+                print(f"Error: {e}", file=sys.stderr)
+                return 1
+            finally:
+                client.close()
+    
+    core = ManagerCore(repo_root, reporter=reporter, on_progress=on_progress)
+    try:
+        if args.command == 'serve' and not args.detach:
+            return serve_foreground(core, args)
+        result = run_core_command(core, args.command, request_args)
+        print_result(result, args.json)
+        return 1 if result.get('failed') or result.get('push_error') else 0
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        core.close(stop_server=False)
 
 
-class Colors:
-    """Application color scheme matching the Deep Space website theme."""
-    # Base colors
-    BACKGROUND = "#030b1d"      # Main dark navy background
-    FOREGROUND = "#e1e7ef"      # Primary text color
-    CARD_BG = "#0a1628"         # Slightly lighter for cards/panels
-    SECONDARY = "#1e293b"       # Secondary backgrounds, borders
+def run_sites(args, repo_root=None):
+    """Check all workspace sites in parallel (optionally adding one first); return the exit code."""
+    try:
+        workspace = Workspace(default_repo=repo_root or find_repo_root(AppState().get('repo_root')))
+        if args.add:
+            site = workspace.add(args.add, port=args.port)
+            print(f"Added {site['name']} ({site['repo']}) on port {site['port']}", file=sys.stderr)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
     
-    # Text colors
-    MUTED = "#94a3b8"           # Subtitles, captions
-    PRIMARY_TEXT = "#f8fafc"    # Bright white text
-    DARK_TEXT = "#0f172a"       # Text on light buttons
+    cores = {site['name']: Workspace.open_core(site) for site in workspace.sites}
+    started = time.perf_counter()
+    try:
+        results = Workspace.check_all(cores)
+    finally:
+        for core in cores.values():
+            core.close(stop_server=False)
+    elapsed = time.perf_counter() - started
     
-    # Accent colors
-    PRIMARY = "#f8fafc"         # Main highlights, glows
-    ACCENT = "#1e293b"          # Hover states
-    RING = "#cbd5e1"            # Focus states
+    def value(step):
+        result, error, seconds = step
+        return {'error': str(error)} if error is not None else result
     
-    # Status colors
-    SUCCESS = "#22c55e"         # Green for success
-    WARNING = "#f59e0b"         # Amber for warnings
-    ERROR = "#ef4444"           # Red for errors
-    INFO = "#38bdf8"            # Cyan/sky blue for info
+    sites = []
+    for site in workspace.sites:
+        checks = results[site['name']]
+        sites.append(dict(site, **{name: value(checks[name]) for name in ('server', 'updates', 'dependencies')}))
     
-    # Button colors (with glow effect feel)
-    BUTTON_PRIMARY = "#1e293b"  # Primary button bg
-    BUTTON_STOP = "#7f1d1d"     # Dark red for stop
-    BUTTON_OPEN = "#0c4a6e"     # Dark blue for open
-    BUTTON_HOVER = "#334155"    # Hover state
+    lines = [f"{'site':<20}{'port':>6}  {'server':<22}{'updates':<26}npm"]
+    for site in sites:
+        server = site['server']
+        if isinstance(server, dict):
+            server_text = server['error'][:21]
+        elif server[0]:
+            server_text = f"running ({server[0]})" if server[1] else f"not responding ({server[0]})"
+        else:
+            server_text = "stopped"
+        updates = site['updates']['error'] if isinstance(site['updates'], dict) else site['updates'][1]
+        npm = site['dependencies']
+        npm_text = npm['error'] if isinstance(npm, dict) else f"{npm[0]} needed ({npm[1]})" if npm[0] else "ok"
+        lines.append(f"{site['name'][:19]:<20}{site['port']:>6}  {server_text:<22}{updates[:25]:<26}{npm_text}")
+    lines.append(f"Checked {len(sites)} sites in {elapsed:.2f}s")
+    print_result({'sites': sites, 'elapsed': round(elapsed, 3), 'message': "\n".join(lines)}, args.json)
+    return 0
+
+
+def serve_foreground(core, args):
+    """Run the server attached to this console until Ctrl+C or it stops for good."""
+    process, elapsed = core.start_server()
+    print_result({'pid': process.pid, 'elapsed': round(elapsed, 3),
+                  'message': f"Server running (PID {process.pid}) - healthy in {elapsed:.2f}s"}, args.json)
+    sequence = 0
+    try:
+        # The supervisor restarts crashed servers; leave once it gives up
+        while core.supervisor.state in ('running', 'restarting'):
+            sequence, lines = core.server_log.since(sequence)
+            for name, text in lines:
+                print(text, file=sys.stderr if name == 'err' else sys.stdout, flush=True)
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gave_up = core.supervisor.state == 'crashloop'
+        message, level = core.stop_server()
+        print(message, file=sys.stderr)
+    return 1 if gave_up else 0
 
 
 class VideoManagerApp:
-    def __init__(self, root):
+    WIDTH = 540
+    HEIGHT = 500    # Room for the supervisor and catalogue status lines
+    
+    def __init__(self, root, profiler=None):
         self.root = root
-        self.server_process = None
+        self.profiler = profiler or StartupProfiler()
         self.update_status = "checking"
         self.update_message = "Checking for updates..."
+        self.log_viewer = None
+        self.site_dashboard = None
+        self.stats_panel = None
+        self.site_cores = {}
         
-        # Find repository root
-        self.find_repo_root()
+        # All server/git/npm work lives in the UI-free core
+        self.core = ManagerCore(app_state=AppState(), reporter=self.post_core_status, on_progress=self.post_progress)
+        self.settings = self.core.settings
+        self.profiler.mark('load settings and caches')
         
         # Setup UI
         self.setup_window()
         self.create_widgets()
+        self.profiler.mark('build widgets')
         
-        # Start update check in background
-        self.check_updates_async()
-    
-    def find_repo_root(self):
-        """Find the git repository root directory."""
-        # Start from the script's directory or executable location
-        if getattr(sys, 'frozen', False):
-            # Running as compiled EXE
-            start_path = Path(sys.executable).parent
-        else:
-            # Running as script
-            start_path = Path(__file__).parent
-        
-        # Search for .git folder
-        current = start_path
-        while current != current.parent:
-            if (current / '.git').exists():
-                self.repo_root = current
-                self.pr_path = current / 'pr'
-                return
-            current = current.parent
+        # Background worker pool for every blocking operation
+        self.tasks = TaskRunner(self.root, tracer=self.core.tracer)
         
-        # Try parent of start_path
-        parent = start_path.parent
-        if (parent / '.git').exists():
-            self.repo_root = parent
-            self.pr_path = parent / 'pr'
-            return
+        # Event-loop lag heartbeat; stalls go to the trace with the blocking handler's stack
+        self.watchdog = StallWatchdog(self.root, self.core.tracer, threshold_ms=self.settings['stall_threshold_ms'])
         
-        # Fallback to parent of start_path
-        self.repo_root = start_path.parent
-        self.pr_path = self.repo_root / 'pr'
+        # Continuous health probing of the Node server
+        self.health_monitor = HealthMonitor(self.core.health_url, interval=self.settings['health_interval'],
+                                            metrics=self.core.metrics,
+                                            active=lambda: self.core.server_pid() is not None,
+                                            tracer=self.core.tracer)
+        self.health_monitor.listeners.append(lambda: self.tasks.post(self.draw_health))
+        self.core.supervisor.listeners.append(lambda: self.tasks.post(self.draw_resources))
+        self.health_monitor.listeners.append(lambda: self.tasks.post(self.refresh_catalogue))
+        
+        # Show the last known update status right away; the real check
+        # (and health probing) waits until the first frame is on screen
+        last_update = self.core.app_state.get('last_update')
+        if last_update:
+            self.set_update_indicator(last_update[0], f"{last_update[1]} (last check)")
+        self.root.after_idle(lambda: self.profiler.mark('first paint'))
+        self.root.after(STARTUP_DEFER_MS, lambda: self.root.after_idle(self.start_background_work))
+    
+    def start_background_work(self):
+        """Kick off work deferred until the window is idle after first paint."""
+        self.profiler.mark('deferred start (idle)')
+        self.watchdog.start()
+        self.health_monitor.start()
+        if self.settings['watch_changes']:
+            self.core.changes.listeners.append(lambda dirty: self.tasks.post(lambda: self.show_local_changes(dirty)))
+            self.core.changes.start()
+        self.run_startup_checks()
     
     def setup_window(self):
         """Configure the main window."""
         self.root.title(APP_TITLE)
-        self.root.geometry("540x450")
+        self.root.geometry(f"{self.WIDTH}x{self.HEIGHT}")
         self.root.resizable(False, False)
         self.root.configure(bg=Colors.BACKGROUND)
         
         # Center window on screen
         self.root.update_idletasks()
-        x = (self.root.winfo_screenwidth() - 540) // 2
-        y = (self.root.winfo_screenheight() - 450) // 2
-        self.root.geometry(f"540x450+{x}+{y}")
+        x = (self.root.winfo_screenwidth() - self.WIDTH) // 2
+        y = (self.root.winfo_screenheight() - self.HEIGHT) // 2
+        self.root.geometry(f"{self.WIDTH}x{self.HEIGHT}+{x}+{y}")
         
         # Try to set icon
-        icon_path = self.pr_path / 'public' / 'icons' / 'favicon.ico'
+        icon_path = self.core.pr_path / 'public' / 'icons' / 'favicon.ico'
         if icon_path.exists():
             try:
                 self.root.iconbitmap(str(icon_path))
@@ -138,7 +5416,7 @@ class VideoManagerApp:
             self.canvas, 
             bg=Colors.CARD_BG,
             width=460,
-            height=380,
+            height=430,
             highlightbackground=Colors.SECONDARY,
             highlightthickness=1
         )
@@ -169,6 +5447,15 @@ class VideoManagerApp:
         )
         subtitle_label.pack(anchor="w")
         
+        header_buttons = tk.Frame(header_frame, bg=Colors.CARD_BG)
+        header_buttons.place(relx=1.0, rely=0.0, anchor="ne")
+        for text, command in (("📊 Stats", self.show_stats), ("🗂️ Sites", self.show_sites)):
+            tk.Button(
+                header_buttons, text=text, command=command, font=("Segoe UI", 9),
+                fg=Colors.PRIMARY_TEXT, bg=Colors.SECONDARY, activebackground=Colors.BUTTON_HOVER,
+                activeforeground=Colors.PRIMARY_TEXT, bd=0, padx=8, pady=2, cursor="hand2"
+            ).pack(side="left", padx=(6, 0))
+        
         # Buttons frame
         buttons_frame = tk.Frame(container, bg=Colors.CARD_BG)
         buttons_frame.pack(fill="x", padx=24, pady=(20, 10))
@@ -187,23 +5474,47 @@ class VideoManagerApp:
         )
         self.stop_btn.pack(side="left", expand=True, fill="x", padx=(4, 0))
         
-        # Row 2: Open Manager UI
+        # Row 2: Open Manager UI and server logs
+        row2 = tk.Frame(buttons_frame, bg=Colors.CARD_BG)
+        row2.pack(fill="x", pady=4)
+        
         self.open_btn = self.create_button(
-            buttons_frame, "🌐 Open Manager UI", Colors.BUTTON_OPEN, self.open_browser
+            row2, "🌐 Open Manager UI", Colors.BUTTON_OPEN, self.open_browser
+        )
+        self.open_btn.pack(side="left", expand=True, fill="x", padx=(0, 4))
+        
+        self.logs_btn = self.create_button(
+            row2, "📜 Server Logs", Colors.BUTTON_PRIMARY, self.show_logs
         )
-        self.open_btn.pack(fill="x", pady=4)
+        self.logs_btn.pack(side="left", expand=True, fill="x", padx=(4, 0))
+        
+        # Row 3: Check Health and bulk import
+        row3 = tk.Frame(buttons_frame, bg=Colors.CARD_BG)
+        row3.pack(fill="x", pady=4)
         
-        # Row 3: Check Health
         self.health_btn = self.create_button(
-            buttons_frame, "💓 Check Server Health", Colors.BUTTON_PRIMARY, self.check_health
+            row3, "💓 Check Server Health", Colors.BUTTON_PRIMARY, self.check_health
+        )
+        self.health_btn.pack(side="left", expand=True, fill="x", padx=(0, 4))
+        
+        self.import_btn = self.create_button(
+            row3, "📦 Bulk Import", Colors.BUTTON_PRIMARY, self.import_videos
         )
-        self.health_btn.pack(fill="x", pady=4)
+        self.import_btn.pack(side="left", expand=True, fill="x", padx=(4, 0))
+        
+        # Row 4: Update from GitHub and build
+        row4 = tk.Frame(buttons_frame, bg=Colors.CARD_BG)
+        row4.pack(fill="x", pady=4)
         
-        # Row 4: Update from GitHub
         self.update_btn = self.create_button(
-            buttons_frame, "📥 Update from GitHub", Colors.BUTTON_PRIMARY, self.update_from_github
+            row4, "📥 Update from GitHub", Colors.BUTTON_PRIMARY, self.update_from_github
         )
-        self.update_btn.pack(fill="x", pady=4)
+        self.update_btn.pack(side="left", expand=True, fill="x", padx=(0, 4))
+        
+        self.build_btn = self.create_button(
+            row4, "🏗️ Build Site", Colors.BUTTON_PRIMARY, self.build_site
+        )
+        self.build_btn.pack(side="left", expand=True, fill="x", padx=(4, 0))
         
         # Status label
         self.status_var = tk.StringVar(value="Ready")
@@ -214,17 +5525,58 @@ class VideoManagerApp:
             fg=Colors.FOREGROUND,
             bg=Colors.CARD_BG
         )
-        self.status_label.pack(fill="x", padx=24, pady=(10, 5))
+        self.status_label.pack(fill="x", padx=24, pady=(10, 2))
+        
+        # Thin progress bar for streamed git/npm operations
+        self.progress_canvas = tk.Canvas(
+            container,
+            width=RESOURCE_GRAPH_WIDTH,
+            height=3,
+            bg=Colors.CARD_BG,
+            highlightthickness=0
+        )
+        self.progress_canvas.pack(padx=24, pady=(0, 3))
+        
+        # Server memory/CPU strip fed by the supervisor
+        self.resource_canvas = tk.Canvas(
+            container,
+            width=RESOURCE_GRAPH_WIDTH,
+            height=18,
+            bg=Colors.CARD_BG,
+            highlightthickness=0
+        )
+        self.resource_canvas.pack(padx=24)
+        self.draw_resources()
+        
+        # Video catalogue stats, read straight from Work.tsx
+        self.catalogue_var = tk.StringVar(value="")
+        tk.Label(
+            container,
+            textvariable=self.catalogue_var,
+            font=("Segoe UI", 8),
+            fg=Colors.MUTED,
+            bg=Colors.CARD_BG
+        ).pack(fill="x", padx=24, pady=(2, 0))
+        
+        # Uncommitted changes under pr/, kept current by the change detector
+        self.changes_var = tk.StringVar(value="")
+        tk.Label(
+            container,
+            textvariable=self.changes_var,
+            font=("Segoe UI", 8),
+            fg=Colors.WARNING,
+            bg=Colors.CARD_BG
+        ).pack(fill="x", padx=24)
         
         # Update status panel
         update_panel = tk.Frame(container, bg=Colors.SECONDARY, height=40)
         update_panel.pack(fill="x", padx=24, pady=(5, 20))
         update_panel.pack_propagate(False)
         
-        # Update indicator circle
+        # Update indicator circle followed by the health sparkline
         self.indicator_canvas = tk.Canvas(
             update_panel, 
-            width=14, 
+            width=14 + SPARKLINE_WIDTH,
             height=14, 
             bg=Colors.SECONDARY,
             highlightthickness=0
@@ -269,7 +5621,8 @@ class VideoManagerApp:
             cursor="hand2",
             command=command,
             highlightbackground=Colors.RING,
-            highlightthickness=1
+            highlightthickness=1,
+            disabledforeground=Colors.MUTED
         )
         
         # Hover effect
@@ -304,8 +5657,78 @@ class VideoManagerApp:
     
     def draw_indicator(self, color):
         """Draw the update indicator circle."""
-        self.indicator_canvas.delete("all")
-        self.indicator_canvas.create_oval(0, 0, 12, 12, fill=color, outline=color)
+        self.indicator_canvas.delete("indicator")
+        self.indicator_canvas.create_oval(0, 0, 12, 12, fill=color, outline=color, tags="indicator")
+    
+    def draw_health(self):
+        """Draw recent /health latencies as a sparkline coloured by server state."""
+        canvas = self.indicator_canvas
+        canvas.delete("sparkline")
+        
+        state = self.health_monitor.state(self.settings['health_slow_ms'])
+        color = {'healthy': Colors.SUCCESS, 'degraded': Colors.WARNING}.get(state, Colors.MUTED)
+        samples = self.health_monitor.histograms['/health'].recent((SPARKLINE_WIDTH - 6) // 2)
+        
+        left, top, bottom = 20, 1, 13
+        if not samples:
+            canvas.create_line(left, bottom, left + SPARKLINE_WIDTH - 6, bottom, fill=color, tags="sparkline")
+            return
+        
+        peak = max([s for s in samples if s is not None] + [0.001])
+        points = []
+        for i, sample in enumerate(samples):
+            x = left + i * 2
+            if sample is None:
+                # Failed probes are drawn as red ticks at full height
+                canvas.create_line(x, top, x, bottom, fill=Colors.ERROR, tags="sparkline")
+                y = bottom
+            else:
+                y = bottom - (bottom - top) * sample / peak
+            points.extend((x, y))
+        if len(points) >= 4:
+            canvas.create_line(*points, fill=color, tags="sparkline")
+    
+    def draw_resources(self):
+        """Draw the server's latest RSS/CPU, its memory history and proxy cache counters."""
+        canvas = self.resource_canvas
+        canvas.delete("all")
+        right = RESOURCE_GRAPH_WIDTH
+        if self.core.proxy is not None:
+            stats = self.core.proxy.stats()
+            rate = f"{stats['hit_rate']:.0%}" if stats['hit_rate'] is not None else "-"
+            canvas.create_text(
+                right, 9, anchor="e", fill=Colors.MUTED, font=("Segoe UI", 8),
+                text=f"Cache {rate} ({stats['hits']}/{stats['hits'] + stats['misses']})"
+            )
+            right -= 110
+        
+        samples = list(self.core.supervisor.samples)
+        if not samples:
+            canvas.create_text(0, 9, anchor="w", text="Server memory: -", fill=Colors.MUTED, font=("Segoe UI", 8))
+            return
+        
+        _, rss, cpu = samples[-1]
+        peak = max(sample[1] for sample in samples)
+        label = f"RSS {rss / 1048576:.1f} MB (peak {peak / 1048576:.1f})"
+        if cpu is not None:
+            label += f"  CPU {cpu:.0f}%"
+        canvas.create_text(0, 9, anchor="w", text=label, fill=Colors.MUTED, font=("Segoe UI", 8))
+        
+        # Scale between the window's min and max so slow growth stands out
+        left, top, bottom = 200, 2, 16
+        values = [sample[1] for sample in samples[-((right - left) // 2):]]
+        low = min(values)
+        span = max(max(values) - low, 1)
+        points = []
+        for i, value in enumerate(values):
+            points.extend((left + i * 2, bottom - (bottom - top) * (value - low) / span))
+        if len(points) >= 4:
+            canvas.create_line(*points, fill=Colors.INFO)
+    
+    def refresh_catalogue(self):
+        """Show catalogue stats; Work.tsx is only re-parsed when it changed on disk."""
+        if self.core.work_index.refresh() or not self.catalogue_var.get():
+            self.catalogue_var.set(self.core.work_index.summary())
     
     def set_status(self, message, color=None):
         """Update the status label."""
@@ -330,220 +5753,351 @@ class VideoManagerApp:
         self.update_label.configure(fg=color)
         self.draw_indicator(color)
     
-    def check_command(self, name):
-        """Check if a command is available."""
-        return shutil.which(name) is not None
-
-    def get_subprocess_kwargs(self, hide_window=False):
-        """Return Windows-only subprocess kwargs; no-op on other OSes."""
-        if os.name != 'nt':
-            return {}
-
-        kwargs = {
-            "creationflags": subprocess.CREATE_NO_WINDOW
-        }
-
-        if hide_window:
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            startupinfo.wShowWindow = subprocess.SW_HIDE
-            kwargs["startupinfo"] = startupinfo
-
-        return kwargs
+    def post_core_status(self, message, level=None):
+        """Show a progress message reported by the core from a worker thread."""
+        self.tasks.post(lambda: self.set_status(message, LEVEL_COLORS.get(level)))
     
-    def ensure_tools(self):
-        """Verify required tools are installed."""
-        if not self.check_command('node'):
-            raise Exception("Node.js is not installed. Please install Node.js 18+ and restart.")
-        if not self.check_command('npm'):
-            raise Exception("npm is not available. Please verify Node.js installation.")
-        if not self.check_command('git'):
-            raise Exception("Git is not installed. Please install Git and restart.")
+    def post_progress(self, label, fraction):
+        """Show git/npm progress reported by the core from a worker thread."""
+        self.tasks.post(lambda: self.draw_progress(label, fraction))
     
-    def ensure_dependencies(self):
-        """Ensure npm dependencies are installed."""
-        node_modules = self.pr_path / 'node_modules'
-        
-        if not node_modules.exists():
-            self.set_status("Installing npm packages (first run)...", Colors.INFO)
-            self.root.update()
-            
-            # Security: Find npm executable to avoid shell=True
-            npm_cmd = shutil.which('npm')
-            if not npm_cmd:
-                # Fallback for Windows if 'npm' not in PATH but 'npm.cmd' is
-                npm_cmd = shutil.which('npm.cmd')
-            
-            if not npm_cmd:
-                raise Exception("npm executable not found")
-
-            result = subprocess.run(
-                [npm_cmd, 'install'],
-                cwd=str(self.pr_path),
-                capture_output=True,
-                text=True,
-                shell=False,
-                **self.get_subprocess_kwargs(hide_window=True)
-            )
-            
-            if result.returncode != 0:
-                raise Exception(f"npm install failed: {result.stderr}")
+    def draw_progress(self, label, fraction):
+        """Fill the progress bar (a full muted bar when the total is unknown) and show the stage."""
+        canvas = self.progress_canvas
+        canvas.delete("all")
+        if label is None:
+            return
+        if fraction is None:
+            canvas.create_rectangle(0, 0, RESOURCE_GRAPH_WIDTH, 3, fill=Colors.MUTED, width=0)
+            self.set_status(f"{label}...", Colors.INFO)
+        else:
+            canvas.create_rectangle(0, 0, RESOURCE_GRAPH_WIDTH * fraction, 3, fill=Colors.INFO, width=0)
+            self.set_status(f"{label} {fraction:.0%}", Colors.INFO)
+    
+    def post_update_indicator(self, state, message):
+        """Update the update indicator from a worker thread."""
+        self.tasks.post(lambda: self.set_update_indicator(state, message))
     
     def start_server(self):
         """Start the Node.js video server."""
-        try:
-            self.ensure_tools()
-            self.ensure_dependencies()
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
-            return
-        
-        # Check if already running
-        if self.server_process and self.server_process.poll() is None:
+        # Check if already running (here or started from the command line)
+        if self.core.server_pid():
             self.set_status("Server already running. Opening browser...", Colors.INFO)
             self.open_browser()
             return
         
         self.set_status("Starting server...", Colors.INFO)
-        self.root.update()
         
-        try:
-            self.server_process = subprocess.Popen(
-                ['node', 'video-manager-server.js'],
-                cwd=str(self.pr_path),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                **self.get_subprocess_kwargs(hide_window=True)
+        def start(task):
+            return self.core.start_server(
+                task, on_spawned=lambda process: task.post(lambda: self.on_server_spawned(process))
             )
-            
-            # Wait a moment for server to start
-            time.sleep(2)
-            
-            # Open browser
-            self.open_browser()
-            
-            pid = self.server_process.pid
-            self.set_status(f"Server running (PID {pid})", Colors.SUCCESS)
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to start server: {e}")
-            self.set_status("Ready")
+        
+        self.tasks.submit(
+            'start', start,
+            on_success=lambda result: self.on_server_ready(*result),
+            on_error=self.on_server_failed,
+            widgets=[self.start_btn]
+        )
+    
+    def on_server_spawned(self, process):
+        """Report a freshly launched server process."""
+        self.set_status(f"Waiting for server (PID {process.pid})...", Colors.INFO)
+    
+    def on_server_ready(self, process, elapsed):
+        """Report a healthy server and open the browser."""
+        if self.core.server_process is not process:
+            return
+        
+        self.open_browser()
+        self.set_status(f"Server running (PID {process.pid}) - healthy in {elapsed:.2f}s", Colors.SUCCESS)
+    
+    def on_server_failed(self, error):
+        """Report a server that could not start, exited or never became healthy."""
+        process = self.core.server_process
+        if process is not None and process.poll() is None:
+            self.set_status("Server started but is not responding.", Colors.WARNING)
+        else:
+            self.core.server_process = None
+            self.core.clear_pid_file()
+            self.set_status("Server failed to start.", Colors.ERROR)
+        messagebox.showerror("Error", str(error))
     
     def stop_server(self):
         """Stop the Node.js server."""
-        if self.server_process is None or self.server_process.poll() is not None:
-            self.set_status("Server is not running.", Colors.MUTED)
-            return
+        self.tasks.cancel('start')
         
-        try:
-            self.server_process.terminate()
-            self.server_process.wait(timeout=5)
-            self.set_status("Server stopped.", Colors.MUTED)
-        except subprocess.TimeoutExpired:
-            self.server_process.kill()
-            self.set_status("Server force stopped.", Colors.WARNING)
-        except Exception as e:
-            self.set_status(f"Error stopping server: {e}", Colors.ERROR)
+        if not self.core.server_pid():
+            if self.core.supervisor.state == 'restarting':
+                self.core.supervisor.cancel()
+                self.set_status("Restart cancelled. Server is not running.", Colors.MUTED)
+            else:
+                self.set_status("Server is not running.", Colors.MUTED)
+            return
         
-        self.server_process = None
+        self.set_status("Stopping server...", Colors.INFO)
+        self.tasks.submit(
+            'stop', lambda task: self.core.stop_server(),
+            on_success=lambda result: self.set_status(result[0], LEVEL_COLORS.get(result[1])),
+            on_error=lambda e: self.set_status(f"Error stopping server: {e}", Colors.ERROR),
+            widgets=[self.stop_btn]
+        )
+    
+    def show_logs(self):
+        """Open (or raise) the live server log window."""
+        if self.log_viewer and self.log_viewer.is_open():
+            self.log_viewer.window.lift()
+            return
+        self.log_viewer = LogViewer(self.root, self.core.server_log, max_lines=self.settings['log_buffer_lines'])
+    
+    def show_stats(self):
+        """Open (or raise) the timing trends window."""
+        if self.stats_panel and self.stats_panel.is_open():
+            self.stats_panel.window.lift()
+            return
+        if self.core.metrics is None:
+            self.set_status("Metrics are disabled (\"metrics\": false in settings.json)", Colors.MUTED)
+            return
+        self.stats_panel = StatsPanel(self.root, self.core.metrics, sessions=self.settings['metrics_sessions'])
+    
+    def show_sites(self):
+        """Open (or raise) the workspace dashboard; this window's core serves its own repo's row."""
+        if self.site_dashboard and self.site_dashboard.is_open():
+            self.site_dashboard.window.lift()
+            return
+        workspace = Workspace(default_repo=self.core.repo_root)
+        for site in workspace.sites:
+            if site['name'] in self.site_cores:
+                continue
+            if Path(site['repo']).resolve() == self.core.repo_root.resolve():
+                self.site_cores[site['name']] = self.core
+            else:
+                self.site_cores[site['name']] = Workspace.open_core(site)
+        self.site_dashboard = SiteDashboard(self.root, self.tasks, workspace, self.site_cores, Workspace.open_core)
     
     def open_browser(self):
         """Open the manager UI in default browser."""
         try:
-            webbrowser.open(SERVER_URL)
+            import webbrowser
+            webbrowser.open(self.core.server_url)
         except Exception:
             pass
     
     def check_health(self):
-        """Check if the server is responding."""
-        try:
-            import urllib.request
-            with urllib.request.urlopen(HEALTH_URL, timeout=2) as response:
-                if response.status == 200:
-                    messagebox.showinfo("Health Check", "Server responded: OK")
-                else:
-                    messagebox.showwarning("Health Check", "Server returned unexpected response")
-        except Exception:
-            messagebox.showwarning("Health Check", "Server is not reachable on localhost:3000")
+        """Check if the server is responding and summarise recent latency."""
+        def report(ok):
+            lines = []
+            for path, histogram in self.health_monitor.histograms.items():
+                summary = histogram.summary()
+                if summary['p50'] is None:
+                    continue
+                lines.append(
+                    f"{path}: p50 {summary['p50']:.0f} ms, p95 {summary['p95']:.0f} ms, "
+                    f"p99 {summary['p99']:.0f} ms, errors {summary['error_rate']:.0%} "
+                    f"({summary['count']} probes)"
+                )
+            stats = "\n\nRecent latency:\n" + "\n".join(lines) if lines else ""
+            if self.core.proxy is not None:
+                cache = self.core.proxy.stats()
+                stats += (
+                    f"\n\nCache proxy: {cache['hits']} hits ({cache['not_modified']} not modified), "
+                    f"{cache['misses']} misses, {cache['invalidations']} invalidations, "
+                    f"{cache['entries']} entries / {cache['bytes'] / 1024:.0f} KB"
+                )
+            if self.watchdog.stalls:
+                stats += (f"\n\nUI stalls: {self.watchdog.stalls} over {self.watchdog.threshold_ms} ms "
+                          f"(worst {self.watchdog.max_lag_ms:.0f} ms), see .video-manager/trace.jsonl")
+            
+            if ok:
+                messagebox.showinfo("Health Check", "Server responded: OK" + stats)
+            elif ok is None:
+                messagebox.showwarning("Health Check", f"Server is not reachable on localhost:{self.core.port}" + stats)
+            else:
+                messagebox.showwarning("Health Check", "Server returned unexpected response" + stats)
+        
+        self.tasks.submit('health', lambda task: self.core.probe_health(), on_success=report, widgets=[self.health_btn])
     
-    def run_git_command(self, args):
-        """Run a git command and return result."""
-        # Security: shell=False to prevent command injection
-        # On Windows, git is usually in PATH, so we can call it directly
-        try:
-            result = subprocess.run(
-                ['git'] + args,
-                cwd=str(self.repo_root),
-                capture_output=True,
-                text=True,
-                shell=False,
-                **self.get_subprocess_kwargs(hide_window=True)
-            )
-            return result
-        except FileNotFoundError:
-            # Fallback if git is not found (though ensure_tools checks it)
-            return subprocess.CompletedProcess(args, 1, "", "Git executable not found")
+    def build_site(self):
+        """Build pr/dist in the background (skipped when nothing changed)."""
+        self.set_status("Checking build inputs...", Colors.INFO)
+        
+        def on_built(summary):
+            self.set_status(summary['message'], Colors.MUTED if summary['skipped'] else Colors.SUCCESS)
+        
+        def on_failed(error):
+            self.set_status("Build failed", Colors.ERROR)
+            messagebox.showerror("Build Failed", str(error))
+        
+        self.tasks.submit(
+            'build', lambda task: self.core.build_site(task),
+            on_success=on_built,
+            on_error=on_failed,
+            widgets=[self.build_btn]
+        )
     
-    def check_updates_async(self):
-        """Check for updates in background thread."""
-        def check():
-            try:
-                self.ensure_tools()
-            except Exception as e:
-                self.root.after(0, lambda: self.set_update_indicator('error', str(e)[:30]))
-                return
-            
-            git_folder = self.repo_root / '.git'
-            if not git_folder.exists():
-                self.root.after(0, lambda: self.set_update_indicator('na', 'Not a git repository'))
-                return
-            
-            # Fetch from remote
-            fetch = self.run_git_command(['fetch', '--all', '--quiet'])
-            if fetch.returncode != 0:
-                self.root.after(0, lambda: self.set_update_indicator('error', 'Unable to fetch'))
-                return
-            
-            # Get current branch
-            branch = self.run_git_command(['rev-parse', '--abbrev-ref', 'HEAD'])
-            if branch.returncode != 0:
-                self.root.after(0, lambda: self.set_update_indicator('error', 'Cannot determine branch'))
-                return
-            
-            current_branch = branch.stdout.strip()
-            
-            # Check sync status
-            sync = self.run_git_command([
-                'rev-list', '--left-right', '--count',
-                f'HEAD...origin/{current_branch}'
-            ])
-            
-            if sync.returncode != 0:
-                self.root.after(0, lambda: self.set_update_indicator('na', 'No upstream configured'))
-                return
+    def import_videos(self):
+        """Pick a CSV/JSON manifest and add its videos in the background."""
+        from tkinter import filedialog
+        path = filedialog.askopenfilename(
+            title="Import videos",
+            filetypes=[("Video manifests", "*.csv *.json"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        
+        self.set_status("Validating manifest...", Colors.INFO)
+        
+        def on_imported(summary):
+            self.refresh_catalogue()
+            color = Colors.WARNING if summary['failed'] or summary['push_error'] else Colors.SUCCESS
+            self.set_status(summary['message'], color)
             
-            try:
-                parts = sync.stdout.strip().split()
-                if len(parts) < 2:
-                    raise ValueError("Unexpected output")
-                behind = int(parts[1])
-                ahead = int(parts[0])
-            except:
-                self.root.after(0, lambda: self.set_update_indicator('error', 'Parse error'))
+            lines = [summary['message']]
+            if summary['failed']:
+                lines.append("")
+                lines.extend(
+                    f"Row {item['row']} ({item.get('embedId') or '-'}): {item['error']}"
+                    for item in summary['failed'][:15]
+                )
+                if len(summary['failed']) > 15:
+                    lines.append(f"... and {len(summary['failed']) - 15} more")
+            if summary.get('report'):
+                lines.append(f"\nFull report: {summary['report']}")
+            show = messagebox.showwarning if summary['failed'] or summary['push_error'] else messagebox.showinfo
+            show("Bulk Import", "\n".join(lines))
+        
+        def on_failed(error):
+            self.set_status("Import failed", Colors.ERROR)
+            messagebox.showerror("Bulk Import", str(error))
+        
+        self.tasks.submit(
+            'import', lambda task: self.core.import_videos(path, task),
+            on_success=on_imported,
+            on_error=on_failed,
+            widgets=[self.import_btn]
+        )
+    
+    def run_startup_checks(self):
+        """Run the launch checks concurrently and show each result as soon as it arrives."""
+        started = time.perf_counter()
+        
+        def on_step(name, result, error, seconds):
+            if name == 'updates':
+                if error is not None:
+                    self.set_update_indicator('error', str(error)[:30])
+                else:
+                    state, message, behind = result
+                    self.set_update_indicator(state, message)
+                    if state == 'available':
+                        self.root.after(100, lambda: self.prompt_update(behind))
+                self.report_startup_profile()
+            elif name == 'catalogue':
+                self.refresh_catalogue()
+            elif name == 'server' and result and result[1]:
+                self.set_status(f"Server already running (PID {result[0]})", Colors.SUCCESS)
+            elif name == 'server' and error is None:
+                self.reclaim_stale_server(result[0])
+        
+        def on_ready(results):
+            self.profiler.mark('startup checks ready')
+            # Leave server results and anything the user started meanwhile on screen
+            if self.status_var.get() != "Ready":
                 return
-            
-            if behind > 0:
-                msg = f"{behind} update{'s' if behind > 1 else ''} available"
-                self.root.after(0, lambda: self.set_update_indicator('available', msg))
-                self.root.after(100, lambda: self.prompt_update(behind))
-            elif ahead > 0:
-                msg = f"{ahead} commit{'s' if ahead > 1 else ''} ahead"
-                self.root.after(0, lambda: self.set_update_indicator('uptodate', msg))
+            action = results['dependencies'][0]
+            if action and action[0]:
+                self.set_status(f"Ready in {time.perf_counter() - started:.2f}s - "
+                                f"Start will run npm {action[0]} ({action[1]})", Colors.INFO)
             else:
-                self.root.after(0, lambda: self.set_update_indicator('uptodate', 'Up to date'))
+                self.set_status(f"Ready in {time.perf_counter() - started:.2f}s", Colors.MUTED)
+        
+        self.set_update_indicator('checking', 'Checking...')
+        self.tasks.submit(
+            'startup',
+            lambda task: self.core.startup_checks(
+                task, on_step=lambda *step: task.post(lambda: on_step(*step))
+            ),
+            on_success=on_ready,
+            on_error=lambda error: self.set_status(f"Startup checks failed: {error}", Colors.ERROR)
+        )
+    
+    def reclaim_stale_server(self, pid):
+        """On launch, adopt or stop a server left on our port by a crashed instance."""
+        def on_reclaimed(reclaimed):
+            if reclaimed:
+                self.set_status(reclaimed[0], LEVEL_COLORS.get(reclaimed[1]))
+            elif pid:
+                self.set_status(f"Server running (PID {pid}) but not responding", Colors.WARNING)
+        
+        def reclaim(task):
+            # Not while a Start click is reclaiming or spawning
+            with self.core.lock:
+                return self.core.reclaim_port(self.core.server_port())
+        
+        self.tasks.submit(
+            'reclaim', reclaim,
+            on_success=on_reclaimed,
+            on_error=lambda error: self.set_status(f"Could not check port {self.core.port}: {error}", Colors.WARNING)
+        )
+    
+    def check_updates_async(self, force=False):
+        """Check for updates in background thread."""
+        def on_checked(result):
+            state, message, behind = result
+            self.set_update_indicator(state, message)
+            self.report_startup_profile()
+            if state == 'available':
+                self.root.after(100, lambda: self.prompt_update(behind))
+        
+        def on_failed(error):
+            self.set_update_indicator('error', str(error)[:30])
+            self.report_startup_profile()
+        
+        self.set_update_indicator('checking', 'Checking...')
+        self.tasks.submit(
+            'update-check', lambda task: self.core.check_updates(task, force),
+            on_success=on_checked,
+            on_error=on_failed
+        )
+    
+    def report_startup_profile(self):
+        self.profiler.mark('first update check')
+        self.profiler.report(self.core.state_dir)
+    
+    def show_local_changes(self, dirty):
+        if not dirty:
+            self.changes_var.set("")
+            return
+        names = ", ".join(Path(path).name for path in dirty[:3]) + (", ..." if len(dirty) > 3 else "")
+        self.changes_var.set(f"✎ {len(dirty)} uncommitted change{'s' if len(dirty) > 1 else ''}: {names}")
+    
+    def confirm_pull(self, dirty):
+        """Warn that local changes may make a pull fail; return True to pull anyway."""
+        listing = "\n".join(dirty[:10]) + (f"\n... and {len(dirty) - 10} more" if len(dirty) > 10 else "")
+        return messagebox.askyesno(
+            "Uncommitted Changes",
+            f"These files have uncommitted changes:\n\n{listing}\n\n"
+            "git will refuse the pull if an update touches them. Pull anyway?"
+        )
+    
+    def check_before_pull(self, pull):
+        """Rescan pr/ for uncommitted changes off the UI thread, confirm any, then call pull().
+        
+        changes.dirty alone may be stale or empty (watch_changes off, or no
+        scan yet), so the list shown is always fresh.
+        """
+        def on_scanned(dirty):
+            if dirty and not self.confirm_pull(dirty):
+                self.set_status("Ready")
+                return
+            pull()
+        
+        def on_failed(error):
+            self.set_status("Ready")
+            messagebox.showerror("Error", str(error))
         
-        thread = threading.Thread(target=check, daemon=True)
-        thread.start()
+        self.set_status("Checking for local changes...", Colors.INFO)
+        self.tasks.submit('update', lambda task: self.core.changes.scan(),
+                          on_success=on_scanned, on_error=on_failed, widgets=[self.update_btn])
     
     def prompt_update(self, count):
         """Ask user if they want to update."""
@@ -557,85 +6111,91 @@ class VideoManagerApp:
     
     def apply_update(self):
         """Pull updates from GitHub."""
+        self.check_before_pull(self.pull_updates)
+    
+    def pull_updates(self):
+        """Pull, refresh npm dependencies and reload the server in the background."""
         self.set_status("Pulling updates...", Colors.INFO)
         self.set_update_indicator('checking', 'Pulling updates...')
-        self.root.update()
         
-        pull = self.run_git_command(['pull', '--quiet'])
-        
-        if pull.returncode == 0:
-            # Update npm dependencies if needed
-            self.set_status("Updating dependencies...", Colors.INFO)
-            self.root.update()
-            
-            # Security: Use shutil.which for npm
-            npm_cmd = shutil.which('npm') or shutil.which('npm.cmd')
-            if npm_cmd:
-                subprocess.run(
-                    [npm_cmd, 'install', '--silent'],
-                    cwd=str(self.pr_path),
-                    capture_output=True,
-                    shell=False,
-                    **self.get_subprocess_kwargs(hide_window=True)
-                )
-            
-            self.set_status("Updates applied successfully!", Colors.SUCCESS)
+        def on_pulled(deps_message):
+            self.set_status(f"Updates applied successfully! ({deps_message})", Colors.SUCCESS)
             self.set_update_indicator('uptodate', 'Updated successfully')
-            
             messagebox.showinfo("Update Complete", "Updates have been applied successfully!")
-        else:
+        
+        def on_failed(error):
             self.set_status("Update failed", Colors.ERROR)
             self.set_update_indicator('error', 'Update failed')
-            messagebox.showerror("Update Failed", f"Failed to pull updates:\n{pull.stderr}")
+            messagebox.showerror("Update Failed", str(error))
+        
+        # Local changes were confirmed by check_before_pull
+        self.tasks.submit('update', lambda task: self.core.apply_update(task, allow_dirty=True),
+                          on_success=on_pulled, on_error=on_failed, widgets=[self.update_btn])
     
     def update_from_github(self):
         """Manual update from GitHub."""
-        try:
-            self.ensure_tools()
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
-            return
-        
-        git_folder = self.repo_root / '.git'
+        git_folder = self.core.repo_root / '.git'
         if not git_folder.exists():
             messagebox.showerror("Error", "This folder is not a git repository.")
             return
-        
+        self.check_before_pull(self.fetch_and_pull)
+    
+    def fetch_and_pull(self):
+        """Fetch and pull in the background and show git's output."""
         self.set_status("Fetching updates from GitHub...", Colors.INFO)
-        self.root.update()
         
-        # Fetch all
-        fetch = self.run_git_command(['fetch', '--all', '--prune'])
-        if fetch.returncode != 0:
-            messagebox.showerror("Error", f"git fetch failed:\n{fetch.stderr}")
-            self.set_status("Ready")
-            return
+        def on_updated(output):
+            self.set_status("Repository is up to date.", Colors.SUCCESS)
+            
+            # Refresh update indicator
+            self.check_updates_async(force=True)
+            
+            if output:
+                messagebox.showinfo("Git Output", output)
         
-        # Pull
-        pull = self.run_git_command(['pull'])
-        if pull.returncode != 0:
-            messagebox.showerror("Error", f"git pull failed:\n{pull.stderr}")
+        def on_failed(error):
             self.set_status("Ready")
-            return
-        
-        self.set_status("Repository is up to date.", Colors.SUCCESS)
-        
-        # Refresh update indicator
-        self.check_updates_async()
+            messagebox.showerror("Error", str(error))
         
-        if pull.stdout.strip():
-            messagebox.showinfo("Git Output", pull.stdout)
+        self.tasks.submit('update', lambda task: self.core.update_from_github(task, allow_dirty=True),
+                          on_success=on_updated, on_error=on_failed, widgets=[self.update_btn])
     
     def on_closing(self):
         """Handle window close event."""
-        self.stop_server()
+        self.watchdog.stop()
+        self.tasks.shutdown()
+        self.health_monitor.stop()
         self.root.destroy()
+        
+        # The window goes away now; stopping the server tree (up to 5s) finishes
+        # on a non-daemon thread, which the interpreter waits for before exiting
+        cores = [self.core] + [core for core in self.site_cores.values() if core is not self.core]
+        
+        def close_cores():
+            for core in cores:
+                core.close()
+        
+        threading.Thread(target=close_cores, name="shutdown").start()
 
 
 def main():
     """Application entry point."""
+    if getattr(sys, 'frozen', False):
+        # The image stage uses a process pool; frozen children must not rerun the app
+        import multiprocessing
+        multiprocessing.freeze_support()
+    args = build_parser().parse_args()
+    if args.benchmark_git:
+        benchmark_update_check(find_repo_root())
+        return
+    if args.command:
+        sys.exit(run_cli(args))
+    
+    profiler = StartupProfiler(enabled=args.profile_startup)
+    profiler.mark('imports')
     root = tk.Tk()
-    app = VideoManagerApp(root)
+    profiler.mark('create Tk root')
+    app = VideoManagerApp(root, profiler)
     root.mainloop()
 
 
@@ -1,6 +1,7 @@
 import { useEffect, useRef } from "react";
 import gsap from "gsap";
 import { ScrollTrigger } from "gsap/ScrollTrigger";
+import { responsiveSrcSet } from "@/lib/images";
 
 gsap.registerPlugin(ScrollTrigger);
 
@@ -125,6 +126,8 @@ const About = () => {
               <div className="relative w-80 h-80 md:w-96 md:h-96 lg:w-[28rem] lg:h-[28rem] rounded-full overflow-hidden border-4 border-primary/30 group-hover:border-primary/50 transition-all duration-500 shadow-2xl">
                 <img 
                   src="/abdo-pfp-refined.webp"
+                  srcSet={responsiveSrcSet("/abdo-pfp-refined.webp", 1254)}
+                  sizes="(min-width: 1024px) 28rem, (min-width: 768px) 24rem, 20rem"
                   alt="Abdo"
                   className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500"
                 />
@@ -1,5 +1,6 @@
 import { useState, useRef, useEffect } from "react";
 import { Play, Pause, Volume2, VolumeX, Maximize, ExternalLink } from "lucide-react";
+import { responsiveSrcSet } from "@/lib/images";
 
 interface CustomVideoPlayerProps {
   videoId: string;
@@ -250,6 +251,8 @@ const CustomVideoPlayer = ({ videoId, thumbnail, title }: CustomVideoPlayerProps
                 <div className="relative w-14 h-14 rounded-full overflow-hidden border-2 border-primary/30 group-hover:border-primary/50 transition-all duration-500 shadow-lg">
                   <img
                     src="/abdo-pfp-refined.webp"
+                    srcSet={responsiveSrcSet("/abdo-pfp-refined.webp", 1254)}
+                    sizes="3.5rem"
                     alt="Abdelraouf Alidrissi"
                     className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500"
                   />
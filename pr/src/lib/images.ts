@@ -0,0 +1,17 @@
+// Widths of the <name>-<width>w variants that the video manager's image stage
+// writes into dist (its `image_widths` setting). The deploy workflow sets this
+// and runs that stage after `npm run build`; a build without it keeps plain
+// `src`, so no srcset ever points at a file that was not generated.
+const VARIANT_WIDTHS = String(import.meta.env.VITE_IMAGE_WIDTHS ?? "")
+  .split(",")
+  .map(Number)
+  .filter((width) => width > 0);
+
+// srcset for an image in public/ whose intrinsic width is `width`
+export function responsiveSrcSet(src: string, width: number): string | undefined {
+  const widths = VARIANT_WIDTHS.filter((variant) => variant < width);
+  if (!widths.length) return undefined;
+  const dot = src.lastIndexOf(".");
+  const variants = widths.map((variant) => `${src.slice(0, dot)}-${variant}w${src.slice(dot)} ${variant}w`);
+  return [...variants, `${src} ${width}w`].join(", ");
+}
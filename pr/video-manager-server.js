@@ -9,7 +9,7 @@ const __filename = fileURLToPath(import.meta.url);
 const __dirname = dirname(__filename);
 
 const app = express();
-const PORT = 3000;
+const PORT = Number(process.env.PORT) || 3000;
 
 const WORK_FILE_PATH = path.join(__dirname, 'src', 'components', 'Work.tsx');
 const WORK_RELATIVE_PATH = path.relative(__dirname, WORK_FILE_PATH).replace(/\\/g, '/');
@@ -223,6 +223,36 @@ const resolveArrayName = ({ category, section }) => {
   );
 };
 
+const buildVideoEntry = ({ category, title, videoUrl, videoCategory, embedId, thumbnail } = {}) => {
+  if (!title || !videoUrl || !embedId || !category) {
+    return { error: 'Missing required fields.' };
+  }
+
+  if (category === 'longform' && !videoCategory) {
+    return { error: 'Project type required for long-form content.' };
+  }
+
+  const arrayName = resolveArrayName({ category });
+
+  if (!arrayName) {
+    return { error: 'Invalid category.' };
+  }
+
+  const entry = {
+    title,
+    videoUrl,
+    embedId,
+    thumbnail: thumbnail || `https://cdn-cf-east.streamable.com/image/${embedId}.jpg`,
+    platform: 'streamable',
+  };
+
+  if (arrayName === 'projects') {
+    entry.category = videoCategory;
+  }
+
+  return { arrayName, entry };
+};
+
 const updateWorkArray = (arrayName, modifier) => {
   const workContent = readWorkFile();
   const { items, fullMatch } = parseWorkArray(workContent, arrayName);
@@ -250,51 +280,86 @@ const getWorkData = () => {
 };
 
 // Middleware
-app.use(express.json());
+app.use(express.json({ limit: '2mb' }));
 
 // Serve the video manager HTML before static assets
 app.get('/', (req, res) => {
   res.sendFile(path.join(__dirname, 'video-manager.html'));
 });
 
-app.use(express.static(__dirname));
+// Built site preview: files from dist (its index.html at /preview), sent as
+// the .br/.gz siblings the manager writes after each build when the client
+// accepts them and the sibling is not older than the file itself
+const DIST_PATH = path.join(__dirname, 'dist');
+const PRECOMPRESSED = [['br', '.br'], ['gzip', '.gz']];
 
-// Add video endpoint
-app.post('/add-video', async (req, res) => {
+const freshSibling = (file, stats, suffix) => {
+  try {
+    const sibling = fs.statSync(file + suffix);
+    return sibling.isFile() && sibling.mtimeMs >= stats.mtimeMs;
+  } catch {
+    return false;
+  }
+};
+
+app.use((req, res, next) => {
+  if (req.method !== 'GET' && req.method !== 'HEAD') {
+    return next();
+  }
+
+  let relative;
   try {
-    const { category, title, videoUrl, videoCategory, embedId, thumbnail } = req.body;
+    relative = req.path === '/preview' ? 'index.html' : decodeURIComponent(req.path).replace(/^\/+/, '');
+  } catch {
+    return next();
+  }
+  // Source files in pr/ keep their own paths; only the preview gets dist's index.html
+  if (!relative || (relative === 'index.html' && req.path !== '/preview')) {
+    return next();
+  }
 
-    if (!title || !videoUrl || !embedId || !category) {
-      return res.status(400).json({ success: false, error: 'Missing required fields.' });
+  const file = path.resolve(DIST_PATH, relative);
+  if (!file.startsWith(DIST_PATH + path.sep)) {
+    return next();
+  }
+
+  fs.stat(file, (error, stats) => {
+    if (error || !stats.isFile()) {
+      return next();
     }
 
-    if (category === 'longform' && !videoCategory) {
-      return res.status(400).json({ success: false, error: 'Project type required for long-form content.' });
+    res.vary('Accept-Encoding');
+    const match = PRECOMPRESSED.find(
+      ([encoding, suffix]) => req.acceptsEncodings(encoding) === encoding && freshSibling(file, stats, suffix),
+    );
+    if (!match) {
+      return res.sendFile(file);
     }
 
-    const arrayName = resolveArrayName({ category });
+    // Content-Type comes from the original name, not the .br/.gz sibling
+    res.type(path.extname(file));
+    res.set('Content-Encoding', match[0]);
+    return res.sendFile(file + match[1]);
+  });
+});
 
-    if (!arrayName) {
-      return res.status(400).json({ success: false, error: 'Invalid category.' });
+app.use(express.static(__dirname));
+
+// Add video endpoint
+app.post('/add-video', async (req, res) => {
+  try {
+    const { title } = req.body;
+    const { error, arrayName, entry: videoEntry } = buildVideoEntry(req.body);
+
+    if (error) {
+      return res.status(400).json({ success: false, error });
     }
 
     const { updatedItems } = updateWorkArray(arrayName, (items) => {
-      if (items.some((item) => item.embedId === embedId)) {
+      if (items.some((item) => item.embedId === videoEntry.embedId)) {
         throw new Error('A video with this embedId already exists.');
       }
 
-      const videoEntry = {
-        title,
-        videoUrl,
-        embedId,
-        thumbnail: thumbnail || `https://cdn-cf-east.streamable.com/image/${embedId}.jpg`,
-        platform: 'streamable',
-      };
-
-      if (arrayName === 'projects') {
-        videoEntry.category = videoCategory;
-      }
-
       items.push(videoEntry);
       return items;
     });
@@ -326,6 +391,82 @@ app.post('/add-video', async (req, res) => {
   }
 });
 
+// Add many videos with a single Work.tsx write and one commit
+app.post('/add-videos', (req, res) => {
+  try {
+    const videos = req.body && Array.isArray(req.body.videos) ? req.body.videos : null;
+
+    if (!videos || videos.length === 0) {
+      return res.status(400).json({ success: false, error: 'videos must be a non-empty array.' });
+    }
+
+    const results = new Array(videos.length);
+    const pendingByArray = {};
+
+    videos.forEach((video, index) => {
+      const { error, arrayName, entry } = buildVideoEntry(video);
+      if (error) {
+        results[index] = { index, success: false, error };
+        return;
+      }
+      if (!pendingByArray[arrayName]) {
+        pendingByArray[arrayName] = [];
+      }
+      pendingByArray[arrayName].push({ index, entry });
+    });
+
+    let workContent = readWorkFile();
+    let added = 0;
+
+    for (const [arrayName, pending] of Object.entries(pendingByArray)) {
+      const { items, fullMatch } = parseWorkArray(workContent, arrayName);
+      const existing = new Set(items.map((item) => item.embedId));
+
+      for (const { index, entry } of pending) {
+        if (existing.has(entry.embedId)) {
+          results[index] = { index, success: false, error: 'A video with this embedId already exists.' };
+          continue;
+        }
+        existing.add(entry.embedId);
+        items.push(entry);
+        results[index] = { index, success: true, category: arrayName };
+        added++;
+      }
+
+      const updatedArray = buildArrayString(arrayName, items);
+      workContent = workContent.replace(fullMatch, () => updatedArray);
+    }
+
+    if (added === 0) {
+      return res.status(400).json({ success: false, error: 'No videos were added.', added, results });
+    }
+
+    fs.writeFileSync(WORK_FILE_PATH, workContent, 'utf8');
+    const gitResult = stageCommitPush(`Add ${added} video${added === 1 ? '' : 's'}`);
+
+    if (!gitResult.success) {
+      return res.status(500).json({
+        success: false,
+        error: `${gitResult.stage === 'repository' ? 'Git repository not found.' : gitResult.error}`,
+        fileUpdated: true,
+        git: gitResult,
+        added,
+        results,
+      });
+    }
+
+    res.json({
+      success: true,
+      message: `${added} video${added === 1 ? '' : 's'} added successfully and pushed to GitHub.`,
+      added,
+      results,
+    });
+  } catch (error) {
+    console.error('Error adding videos:', error);
+    res.status(500).json({ success: false, error: error.message });
+  }
+});
+
 // Get all videos endpoint
 app.get('/videos', (req, res) => {
   try {